@@ -1,17 +1,15 @@
 """
 认证相关API接口
-直接调用中间件的验证密码服务
+登录成功后签发会话令牌，之后的请求携带 Authorization: Bearer <令牌>
 """
 
 import logging
-import os
 from typing import Optional
 
-from fastapi import APIRouter, HTTPException, Header
+from fastapi import APIRouter
 from pydantic import BaseModel
 
-# 导入中间件验证服务
-from app.middleware.auth_middleware import AuthMiddleware
+from app.services.auth_service import auth_service
 from config import get_config
 
 logger = logging.getLogger(__name__)
@@ -29,59 +27,48 @@ class LoginResponse(BaseModel):
     """登录响应模型"""
     success: bool
     message: str
-
-
-# 创建中间件实例用于密码验证
-_auth_middleware = AuthMiddleware(None)
-
-
-def validate_password(password: Optional[str]) -> bool:
-    """
-    直接调用中间件的验证密码服务
-    
-    Args:
-        password: 密码字符串
-        
-    Returns:
-        bool: 验证是否通过
-    """
-    logger.info(f"调用中间件验证服务，接收到的密码为: {password}")
-    
-    # 直接调用中间件的验证方法
-    return _auth_middleware._validate_password(password)
+    token: Optional[str] = None       # 会话令牌
+    expires_at: Optional[int] = None  # 令牌过期时间（Unix时间戳，秒）
 
 
 @router.post("/login", response_model=LoginResponse)
 async def login(login_request: LoginRequest):
     """
-    用户登录接口 - 检查密码是否正确
-    
+    用户登录接口 - 检查密码是否正确，正确时签发会话令牌
+
     Args:
         login_request: 登录请求，包含密码
-        
+
     Returns:
         LoginResponse: 登录结果
     """
 
     # 获取配置
     config = get_config()
-    
+
     # 开发模式下始终返回登录成功
     if config.DEBUG:
-        logger.info(f"开发模式：任意密码登录成功，密码: {login_request.password}")
+        logger.info("开发模式：任意密码登录成功")
+        token, expires_at = auth_service.issue_token()
         return LoginResponse(
             success=True,
-            message="登录成功（开发模式）"
+            message="登录成功（开发模式）",
+            token=token,
+            expires_at=expires_at
         )
-    
+
     # 生产模式需要验证密码
-    if validate_password(login_request.password):
+    if auth_service.verify_password(login_request.password):
+        token, expires_at = auth_service.issue_token()
         return LoginResponse(
             success=True,
-            message="登录成功"
+            message="登录成功",
+            token=token,
+            expires_at=expires_at
         )
     else:
+        logger.warning("登录失败：密码错误")
         return LoginResponse(
             success=False,
             message="密码错误"
-        )
\ No newline at end of file
+        )
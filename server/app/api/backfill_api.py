@@ -0,0 +1,131 @@
+"""
+历史邮件回填相关API接口
+回填任务保存在数据库中，由负责该账户的定时任务进程领取执行（API模式下同样可以创建和管理）
+"""
+
+import logging
+from typing import Optional
+
+from fastapi import APIRouter
+from pydantic import BaseModel, Field
+
+from app.models.email_models import BackfillJob
+from app.repositories.backfill_repository import BackfillRepository
+from app.repositories.email_repository import EmailConfigRepository
+from app.services.email_service import EmailService
+from app.services.schedule_service import schedule_service
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/api/backfill", tags=["历史邮件回填"])
+
+
+class BackfillStart(BaseModel):
+    account: str
+    folder: Optional[str] = Field(None, description="要回填的文件夹，为空时回填邮箱配置中的全部文件夹")
+
+
+class BackfillListQuery(BaseModel):
+    account: Optional[str] = None
+
+
+class BackfillJobQuery(BaseModel):
+    id: int
+
+
+def job_to_dict(job: BackfillJob) -> dict:
+    """回填任务转为字典，附带进度百分比"""
+    data = dict(job.__data__)
+    processed = job.imported + job.skipped
+    data['progress'] = round(min(100.0, processed * 100.0 / job.total), 1) if job.total else (
+        100.0 if job.status == 'completed' else 0.0)
+    data['running_here'] = schedule_service.backfill_service.is_running(job.id)
+    return data
+
+
+@router.post("/start", response_model=dict)
+async def start_backfill(query: BackfillStart):
+    """创建回填任务（每个文件夹一个任务），已有未结束任务的文件夹不会重复创建"""
+    email_config = EmailConfigRepository.get_by_account(query.account)
+    if not email_config:
+        return {
+            "success": False,
+            "message": "邮箱配置不存在"
+        }
+
+    folders = [query.folder.strip()] if query.folder and query.folder.strip() else EmailService.get_folders(email_config)
+    jobs = []
+    for folder in folders:
+        if BackfillRepository.get_active(query.account, folder):
+            continue
+        jobs.append(BackfillRepository.create(query.account, folder))
+
+    if not jobs:
+        return {
+            "success": False,
+            "message": "回填任务已在执行中"
+        }
+
+    logger.info(f"创建回填任务: {query.account}, 文件夹: {[job.folder for job in jobs]}")
+    if schedule_service.is_running:
+        schedule_service.poll_backfill_jobs()
+    return {
+        "success": True,
+        "message": f"已创建 {len(jobs)} 个回填任务",
+        "data": [job_to_dict(job) for job in jobs]
+    }
+
+
+@router.post("/list", response_model=dict)
+async def list_backfill(query: BackfillListQuery):
+    """获取回填任务及进度"""
+    jobs = BackfillRepository.get_all(query.account)
+    return {
+        "success": True,
+        "message": "获取成功",
+        "data": [job_to_dict(job) for job in jobs]
+    }
+
+
+@router.post("/pause", response_model=dict)
+async def pause_backfill(query: BackfillJobQuery):
+    """暂停回填任务，执行中的任务在当前块保存后停止"""
+    if not BackfillRepository.set_status(query.id, 'paused', from_statuses=('pending', 'running')):
+        return {
+            "success": False,
+            "message": "任务不存在或已结束"
+        }
+    return {
+        "success": True,
+        "message": "已暂停"
+    }
+
+
+@router.post("/resume", response_model=dict)
+async def resume_backfill(query: BackfillJobQuery):
+    """从断点继续已暂停或失败的回填任务"""
+    if not BackfillRepository.set_status(query.id, 'pending', from_statuses=('paused', 'failed')):
+        return {
+            "success": False,
+            "message": "任务不存在或不可继续"
+        }
+    if schedule_service.is_running:
+        schedule_service.poll_backfill_jobs()
+    return {
+        "success": True,
+        "message": "已继续"
+    }
+
+
+@router.post("/cancel", response_model=dict)
+async def cancel_backfill(query: BackfillJobQuery):
+    """取消回填任务，已导入的邮件保留"""
+    if not BackfillRepository.set_status(query.id, 'cancelled', from_statuses=('pending', 'running', 'paused', 'failed')):
+        return {
+            "success": False,
+            "message": "任务不存在或已结束"
+        }
+    return {
+        "success": True,
+        "message": "已取消"
+    }
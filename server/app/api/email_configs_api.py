@@ -2,20 +2,24 @@
 邮箱配置相关API接口
 """
 
-from typing import List
+import asyncio
+from typing import List, Optional
 
-from fastapi import APIRouter, HTTPException
-from pydantic import BaseModel
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import ORJSONResponse, Response
+from pydantic import BaseModel, Field
 
 from app.repositories.email_repository import EmailConfigRepository
 from app.repositories.notification_repository import NotificationChannelRepository
+from app.services.catalog_service import mail_server_catalog
 from app.services.email_service import EmailService
+from app.services.schedule_service import schedule_service
 from app.models.email_models import EmailConfig
 import logging
 
 logger = logging.getLogger(__name__)
 
-router = APIRouter(prefix="/api/email-configs", tags=["邮箱配置管理"])
+router = APIRouter(prefix="/api/email-configs", tags=["邮箱配置管理"], default_response_class=ORJSONResponse)
 
 
 # Pydantic模型定义
@@ -34,6 +38,17 @@ class EmailConfigCreate(BaseModel):
     server: str
     server_name: str
     channel_id: int
+    interval_minutes: Optional[int] = Field(None, ge=1, description="检查间隔（分钟）")
+    jitter_seconds: Optional[int] = Field(None, ge=0, description="每次执行的随机抖动（秒）")
+    folders: Optional[str] = Field(None, description="监控的文件夹，多个用英文逗号分隔，默认INBOX")
+
+
+def normalize_folders(folders: Optional[str]) -> Optional[str]:
+    """整理文件夹列表：去除空白与重复项，保持原有顺序；未提供时返回None，提供了空列表时恢复为默认的INBOX"""
+    if folders is None:
+        return None
+    names = list(dict.fromkeys(name.strip() for name in folders.split(',') if name.strip()))
+    return ','.join(names) or 'INBOX'
 
 
 class EmailConfigTest(BaseModel):
@@ -48,22 +63,17 @@ class EmailConfigTest(BaseModel):
 async def get_configs():
     """获取所有邮箱配置"""
     configs = EmailConfigRepository.get_all()
-    return [config.__data__ for config in configs]
+    return ORJSONResponse([config.__data__ for config in configs])
 
+@router.get("/get_servers", response_model=List[str])
 @router.post("/get_servers", response_model=List[str])
-async def get_servers():
-    """获取所有邮箱服务器名称"""
-    import json
-    import os
-    
-    # 读取mail_server.json文件
-    json_file = os.path.join(os.path.dirname(__file__), "..", "mail_server.json")
-    with open(json_file, 'r', encoding='utf-8') as f:
-        data = json.load(f)
-    
-    # 提取所有name属性
-    servers = [item["name"] for item in data]
-    return servers
+async def get_servers(request: Request):
+    """获取所有邮箱服务商名称（来自内存中的服务商目录），请求头If-None-Match与ETag一致时返回304"""
+    servers, etag = mail_server_catalog.names()
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    return ORJSONResponse(servers, headers=headers)
 
 
 @router.post("/add", response_model=dict)
@@ -74,13 +84,17 @@ async def add_config(config_data: EmailConfigCreate):
         config_data.auth_code,
         config_data.server,
         config_data.server_name,
-        config_data.channel_id
+        config_data.channel_id,
+        config_data.interval_minutes,
+        config_data.jitter_seconds,
+        normalize_folders(config_data.folders)
     )
     if not config:
         return {
             "success": False,
             "message": "创建失败"
         }
+    schedule_service.add_account_job(config)
     return {
         "success": True,
         "message": "创建成功",
@@ -94,13 +108,17 @@ async def update_config(config_data: EmailConfigCreate):
         config_data.account,
         config_data.auth_code,
         config_data.server_name,
-        config_data.channel_id
+        config_data.channel_id,
+        config_data.interval_minutes,
+        config_data.jitter_seconds,
+        normalize_folders(config_data.folders)
     )
     if not config:
         return {
             "success": False,
             "message": "配置不存在"
         }
+    schedule_service.reschedule_account_job(config)
     return {
         "success": True,
         "message": "更新成功",
@@ -116,6 +134,7 @@ async def remove_config(query: AccountQuery):
             "success": False,
             "message": "配置不存在"
         }
+    schedule_service.remove_account_job(query.account)
     return {
         "success": True,
         "message": "删除成功"
@@ -137,7 +156,8 @@ async def test_mail_config(config: EmailConfigTest):
     )
     
     try:
-        emails = email_service.fetch_emails(test_config_obj)
+        # IMAP收取是阻塞操作，放到线程中执行，避免阻塞事件循环
+        emails = await asyncio.to_thread(email_service.fetch_emails, test_config_obj)
         
         return {
             "success": True,
@@ -150,41 +170,86 @@ async def test_mail_config(config: EmailConfigTest):
             "message": f"测试失败: {str(e)}"
         }
 
+class RunScheduleRequest(BaseModel):
+    account: Optional[str] = Field(None, description="只执行该邮箱账户，为空时执行全部账户")
+
+
+class RunJobQuery(BaseModel):
+    id: int
+
+
 @router.post("/run_schedule", response_model=dict)
-async def run_schedule():
-    """立即运行一次定时任务"""
-    logger.info("=== 开始执行手动邮件收取任务 ===")
-    
-    try:
-        # 导入定时任务服务
-        from app.services.schedule_service import run_once
-        
-        # 执行一次定时任务
-        results = await run_once()
-        
-        # 统计汇总
-        total_new_emails = sum(r.get('new_emails', 0) for r in results)
-        total_notifications = sum(r.get('notifications_sent', 0) for r in results)
-        total_errors = sum(len(r.get('errors', [])) for r in results)
-        
-        logger.info("=== 手动任务执行完成 ===")
-        logger.info(f"总新邮件数: {total_new_emails}")
-        logger.info(f"总通知发送数: {total_notifications}")
-        logger.info(f"总错误数: {total_errors}")
-        
+async def run_schedule(query: Optional[RunScheduleRequest] = None):
+    """
+    提交手动执行任务（全部账户或单个账户），立即返回任务ID，在后台执行
+    已有手动执行任务在进行中时不会重复执行，返回进行中的任务；进度通过 /run_job 轮询或 /api/events 的 runs.progress 事件获取
+    """
+    if not schedule_service.is_running:
+        return {
+            "success": False,
+            "message": "当前进程未运行定时任务（API模式），邮件收取由独立工作进程执行"
+        }
+
+    account = query.account.strip() if query and query.account and query.account.strip() else None
+    active = schedule_service.manual_runs.active
+    if active is not None:
         return {
             "success": True,
-            "message": f"定时任务执行完成，发现{total_new_emails}封新邮件，发送{total_notifications}条通知",
-            "data": {
-                "total_new_emails": total_new_emails,
-                "total_notifications": total_notifications,
-                "total_errors": total_errors,
-                "results": results
-            }
+            "message": "已有手动执行任务在进行中",
+            "data": active.to_dict(include_results=False)
         }
-    except Exception as e:
-        logger.error(f"执行定时任务失败: {str(e)}")
+
+    if account:
+        email_config = EmailConfigRepository.get_by_account(account)
+        if not email_config:
+            return {
+                "success": False,
+                "message": "邮箱配置不存在"
+            }
+        email_configs = [email_config]
+    else:
+        email_configs = EmailConfigRepository.get_all()
+        if not email_configs:
+            return {
+                "success": False,
+                "message": "未找到邮箱配置"
+            }
+
+    job, _ = schedule_service.manual_runs.submit(email_configs, account)
+    return {
+        "success": True,
+        "message": f"已提交手动执行任务，共 {len(email_configs)} 个邮箱",
+        "data": job.to_dict(include_results=False)
+    }
+
+
+@router.post("/run_job", response_model=dict)
+async def get_run_job(query: RunJobQuery):
+    """获取手动执行任务的状态与各账户的进度、处理结果"""
+    job = schedule_service.manual_runs.get(query.id)
+    if job is None:
         return {
             "success": False,
-            "message": f"定时任务执行失败: {str(e)}"
-        }
\ No newline at end of file
+            "message": "任务不存在或已过期"
+        }
+    return {
+        "success": True,
+        "data": job.to_dict()
+    }
+
+
+@router.post("/run_jobs", response_model=dict)
+async def list_run_jobs():
+    """获取最近的手动执行任务（不含各账户的处理结果）"""
+    return {
+        "success": True,
+        "data": [job.to_dict(include_results=False) for job in schedule_service.manual_runs.list()]
+    }
+
+@router.post("/schedule_stats", response_model=dict)
+async def get_schedule_stats():
+    """获取定时任务运行统计（执行、跳过、超时次数等）"""
+    return {
+        "success": True,
+        "data": schedule_service.get_stats()
+    }
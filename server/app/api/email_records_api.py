@@ -4,12 +4,21 @@
 
 import logging
 from typing import List, Optional
-from fastapi import APIRouter, HTTPException, Query
+from urllib.parse import quote
+from anyio import from_thread
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import ORJSONResponse, StreamingResponse
 from pydantic import BaseModel
 from datetime import datetime
 
+from app.repositories.attachment_repository import AttachmentRepository
 from app.repositories.email_record_repository import EmailRecordRepository
+from app.services import record_archive_service
+from app.services.attachment_service import AttachmentService, format_attachments
+from app.services.event_service import event_service
 from app.services.notification_service import NotificationService
+from app.services.schedule_service import schedule_service
 from app.repositories.notification_repository import NotificationChannelRepository
 from app.repositories.email_repository import EmailConfigRepository
 
@@ -20,7 +29,7 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-router = APIRouter(prefix="/api/email-records", tags=["邮件记录管理"])
+router = APIRouter(prefix="/api/email-records", tags=["邮件记录管理"], default_response_class=ORJSONResponse)
 
 
 # Pydantic模型定义
@@ -45,23 +54,44 @@ class EmailRecordUpdate(BaseModel):
     # 移除sent字段 - 发送状态应由系统自动设置，不能手动修改
 
 
+class AttachmentResponse(BaseModel):
+    """附件元数据响应模型"""
+    part: str
+    filename: str
+    content_type: str
+    size: int
+
+
 class EmailRecordResponse(EmailRecordBase):
     """邮件记录响应模型"""
     id: int
+    truncated: bool = False
     reception_time: datetime
+    attachments: List[AttachmentResponse] = []
     
     class Config:
         from_attributes = True
 
+def attachment_to_dict(attachment) -> dict:
+    """附件元数据转为响应字典"""
+    return {
+        'part': attachment.part,
+        'filename': attachment.filename,
+        'content_type': attachment.content_type,
+        'size': attachment.size
+    }
+
+
 @router.get("/", response_model=List[EmailRecordResponse])
 async def get_all_emails(
     limit: int = Query(100, ge=1, le=1000, description="每页数量"),
     offset: int = Query(0, ge=0, description="偏移量")
 ):
-    """获取所有邮件记录"""
+    """获取所有邮件记录（数据来自数据库，直接用orjson序列化，不再经过响应模型校验）"""
     try:
         emails = EmailRecordRepository.get_all(limit=limit, offset=offset)
-        return [
+        attachments_by_email = AttachmentRepository.get_for_emails(emails)
+        return ORJSONResponse([
             {
                 'id': email.id,
                 'sender': email.sender,
@@ -69,15 +99,100 @@ async def get_all_emails(
                 'subject': email.subject,
                 'reception_time': email.reception_time,
                 'body_text': email.body_text,
-                'sent': email.sent
+                'truncated': email.truncated,
+                'sent': email.sent,
+                'attachments': [attachment_to_dict(attachment) for attachment in attachments_by_email[email.id]]
             }
             for email in emails
-        ]
+        ])
     except Exception as e:
         logger.error(f"获取邮件记录失败: {str(e)}")
         raise HTTPException(status_code=500, detail=f"获取邮件记录失败: {str(e)}")
 
 
+@router.get("/export")
+async def export_emails(
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$", description="导出格式: ndjson 或 csv"),
+    account: Optional[str] = Query(None, description="只导出该邮箱账户的邮件"),
+    since: Optional[datetime] = Query(None, description="收件时间下限（包含）"),
+    until: Optional[datetime] = Query(None, description="收件时间上限（不包含）")
+):
+    """流式导出邮件记录（NDJSON每行一封邮件并包含附件元数据，CSV不含附件），按ID分批读取，不在内存中缓存全部记录"""
+    media_type, extension = record_archive_service.FORMATS[format]
+    filename = f"email_records_{datetime.now():%Y%m%d%H%M%S}.{extension}"
+    logger.info(f"开始导出邮件记录: 格式 {format}，账户 {account or '全部'}，时间 {since} ~ {until}")
+    return StreamingResponse(
+        record_archive_service.export_records(format, account, since, until),
+        media_type=media_type,
+        headers={'Content-Disposition': f'attachment; filename="{filename}"'}
+    )
+
+
+@router.post("/import", response_model=dict)
+async def import_emails(
+    request: Request,
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$", description="导入格式: ndjson 或 csv（与导出格式相同）")
+):
+    """
+    流式导入邮件记录：请求体为导出的NDJSON或CSV文件，边接收边解析，按批在事务中写入，已存在的邮件跳过
+    导入的邮件标记为回填导入的历史邮件，不会推送通知
+    """
+    body = request.stream().__aiter__()
+
+    def chunks():
+        # 在线程池中逐块读取请求体
+        while True:
+            try:
+                yield from_thread.run(body.__anext__)
+            except StopAsyncIteration:
+                return
+
+    try:
+        result = await run_in_threadpool(record_archive_service.import_records, format, chunks())
+    except Exception as e:
+        logger.error(f"导入邮件记录失败: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"导入邮件记录失败: {str(e)}")
+    return {"success": True, "message": "导入完成", "data": result}
+
+
+@router.get("/{email_id}/attachments", response_model=List[AttachmentResponse])
+async def get_email_attachments(email_id: int):
+    """获取邮件的附件列表（只有元数据）"""
+    email = EmailRecordRepository.get_by_id(email_id)
+    if not email:
+        raise HTTPException(status_code=404, detail="邮件记录不存在")
+    return ORJSONResponse([attachment_to_dict(attachment) for attachment in AttachmentRepository.get_for_email(email)])
+
+
+@router.get("/{email_id}/attachments/{part}")
+async def download_email_attachment(email_id: int, part: str):
+    """从IMAP分块收取单个附件并以流的形式返回，附件内容不经过数据库，也不在内存中完整保存"""
+    email = EmailRecordRepository.get_by_id(email_id)
+    if not email:
+        raise HTTPException(status_code=404, detail="邮件记录不存在")
+    attachment = AttachmentRepository.get_part(email, part)
+    if not attachment:
+        raise HTTPException(status_code=404, detail="附件不存在")
+    email_config = EmailConfigRepository.get_by_account(email.recipient)
+    if not email_config:
+        raise HTTPException(status_code=404, detail=f"未找到邮箱配置: {email.recipient}")
+
+    attachment_service = AttachmentService(schedule_service.email_service)
+    try:
+        # 连接与登录在线程池中完成，失败时仍可返回错误状态码
+        chunks = await run_in_threadpool(attachment_service.stream, email_config, attachment)
+    except Exception as e:
+        logger.error(f"下载附件失败: {email.recipient} UID {email.uid} 段 {part}，错误: {str(e)}")
+        raise HTTPException(status_code=502, detail=f"连接邮箱服务器失败: {str(e)}")
+
+    logger.info(f"开始下载附件: {attachment.filename}，邮箱: {email.recipient}")
+    return StreamingResponse(
+        chunks,
+        media_type=attachment.content_type or 'application/octet-stream',
+        headers={'Content-Disposition': f"attachment; filename*=UTF-8''{quote(attachment.filename)}"}
+    )
+
+
 @router.delete("/{email_id}")
 async def delete_email(email_id: int):
     """删除邮件记录 - 仅用于管理员手动清理不必要的邮件记录"""
@@ -85,6 +200,7 @@ async def delete_email(email_id: int):
         success = EmailRecordRepository.delete(email_id)
         if not success:
             raise HTTPException(status_code=404, detail="邮件记录不存在")
+        event_service.publish_deleted([email_id])
         
         return {"message": "删除成功"}
     except HTTPException:
@@ -129,7 +245,9 @@ async def send_email_manual(request: SendManualRequest):
                  f"收件人：{email.recipient}\n" \
                  f"收件时间：{email.reception_time}\n" \
                  f"主题：{content}\n" \
-                 f"正文：\n{email.body_text if email.body_text else '无正文内容'}\n"
+                 f"正文：\n{email.body_text if email.body_text else '无正文内容'}\n" \
+                 f"{'（正文过长，已截断）' if email.truncated else ''}" \
+                 f"{format_attachments(AttachmentRepository.get_for_email(email))}"
         
         # 发送通知
         result = await NotificationService.send(
@@ -145,6 +263,7 @@ async def send_email_manual(request: SendManualRequest):
             # 发送成功，更新sent字段为True
             email.sent = True
             email.save()
+            event_service.publish_sent([email.id])
             
             logger.info(f"手动发送邮件通知成功: {email.sender} -> {email.recipient}, 主题: {content[:20]}...")
             return {
@@ -0,0 +1,65 @@
+"""
+事件推送API接口
+以SSE（text/event-stream）推送邮件的新增、已通知与删除事件，网页据此实时更新列表，不再轮询
+浏览器的EventSource不能设置请求头，该接口可通过查询参数 ?token=<会话令牌> 鉴权
+"""
+
+import asyncio
+import logging
+
+import orjson
+from fastapi import APIRouter, Request
+from fastapi.responses import StreamingResponse
+
+from app.services.event_service import event_service
+from config import get_config
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/api/events", tags=["事件推送"])
+
+
+def _format_event(event: dict) -> bytes:
+    """按SSE格式编码事件"""
+    return (f"id: {event['id']}\nevent: {event['type']}\ndata: ".encode()
+            + orjson.dumps(event['data']) + b"\n\n")
+
+
+@router.get("")
+async def stream_events(request: Request):
+    """
+    订阅邮件事件（SSE）
+
+    事件类型:
+        emails.created: 保存了新邮件，data.emails为邮件摘要列表（不含正文）
+        emails.sent: 邮件已发送通知，data.ids为邮件ID列表
+        emails.deleted: 邮件已删除，data.ids为邮件ID列表
+        overflow: 客户端消费过慢被断开，应重新加载列表后重连
+    """
+    config = get_config()
+    subscriber = event_service.subscribe()
+
+    async def events():
+        try:
+            # 告知浏览器断开后的重连间隔
+            yield f"retry: {config.EVENTS_RETRY_MILLISECONDS}\n\n".encode()
+            while True:
+                try:
+                    event = await asyncio.wait_for(subscriber.queue.get(), timeout=config.EVENTS_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    if await request.is_disconnected():
+                        return
+                    # 心跳注释，保持连接并让代理不超时
+                    yield b": ping\n\n"
+                    continue
+                yield _format_event(event)
+                if subscriber.dropped:
+                    return
+        finally:
+            event_service.unsubscribe(subscriber)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
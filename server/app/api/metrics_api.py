@@ -0,0 +1,18 @@
+"""
+运行指标API接口
+以Prometheus文本格式输出本进程的运行指标，供Prometheus等监控系统抓取。
+路径不在 /api/ 下，不需要登录；部署在公网时应由反向代理限制访问，或设置 METRICS_ENABLED = False 关闭
+"""
+
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from app.services.metrics_service import CONTENT_TYPE, registry
+
+router = APIRouter(tags=["运行指标"])
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    """获取运行指标（Prometheus文本格式）"""
+    return PlainTextResponse(registry.render(), media_type=CONTENT_TYPE)
@@ -4,12 +4,14 @@
 
 from typing import List, Optional
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import ORJSONResponse, Response
 from pydantic import BaseModel
 
 from app.repositories.notification_repository import NotificationChannelRepository
+from app.services.catalog_service import notice_server_catalog
 
-router = APIRouter(prefix="/api/notification-channels", tags=["通知渠道管理"])
+router = APIRouter(prefix="/api/notification-channels", tags=["通知渠道管理"], default_response_class=ORJSONResponse)
 
 
 # Pydantic模型定义
@@ -43,7 +45,7 @@ class UpdateChannelRequest(ChannelIdQuery, NotificationChannelUpdate):
 async def get_all_channels():
     """获取所有通知渠道"""
     channels = NotificationChannelRepository.get_all()
-    return [channel.__data__ for channel in channels]
+    return ORJSONResponse([channel.__data__ for channel in channels])
 
 
 @router.post("/add", response_model=dict)
@@ -105,19 +107,14 @@ async def test_channel(channel: NotificationChannelCreate):
         raise HTTPException(status_code=400, detail=f"测试失败: {str(e)}")
 
 
+@router.get("/get_servers", response_model=List[str])
 @router.post("/get_servers", response_model=List[str])
-async def get_servers():
-    """获取所有邮箱服务器名称"""
-    import json
-    import os
-
-    # 读取mail_server.json文件
-    json_file = os.path.join(os.path.dirname(__file__), "..", "notice_server.json")
-    with open(json_file, 'r', encoding='utf-8') as f:
-        data = json.load(f)
-
-    # 提取所有name属性
-    servers = [item["name"] for item in data]
-    return servers
+async def get_servers(request: Request):
+    """获取所有通知服务商名称（来自内存中的服务商目录），请求头If-None-Match与ETag一致时返回304"""
+    servers, etag = notice_server_catalog.names()
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    return ORJSONResponse(servers, headers=headers)
 
 
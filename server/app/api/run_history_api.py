@@ -0,0 +1,59 @@
+"""
+处理历史API接口
+每个邮箱账户每次处理（定时或手动）的各阶段耗时、数量与错误，以及按账户或服务商统计的耗时分位数趋势
+"""
+
+import logging
+from typing import Optional
+
+from fastapi import APIRouter, Query
+from fastapi.responses import ORJSONResponse
+
+from app.models.email_models import RunHistory
+from app.repositories.run_history_repository import RunHistoryRepository
+from app.services import run_history_service
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/api/run-history", tags=["处理历史"], default_response_class=ORJSONResponse)
+
+
+def history_to_dict(history: RunHistory) -> dict:
+    """处理历史转为字典，错误信息拆分为列表"""
+    data = dict(history.__data__)
+    data['errors'] = history.errors.split('\n') if history.errors else []
+    return data
+
+
+@router.get("/list")
+async def list_run_history(
+    account: Optional[str] = Query(None, description="只返回该邮箱账户的记录"),
+    status: Optional[str] = Query(None, pattern="^(success|error|timeout)$", description="只返回该状态的记录"),
+    limit: int = Query(50, ge=1, le=500, description="每页数量"),
+    offset: int = Query(0, ge=0, description="偏移量")
+):
+    """分页获取处理历史（新的在前）"""
+    rows, total = RunHistoryRepository.get_page(account, status, limit, offset)
+    return {
+        "success": True,
+        "message": "获取成功",
+        "data": {
+            "total": total,
+            "items": [history_to_dict(row) for row in rows]
+        }
+    }
+
+
+@router.get("/stats")
+async def run_history_stats(
+    hours: int = Query(24, ge=1, le=24 * 90, description="统计最近多少小时"),
+    account: Optional[str] = Query(None, description="只统计该邮箱账户"),
+    group_by: str = Query("account", pattern="^(account|server_name)$", description="按邮箱账户或服务商分组"),
+    bucket_minutes: int = Query(60, ge=1, le=24 * 60, description="趋势的时间分桶（分钟）")
+):
+    """按账户（或服务商）统计总耗时与各阶段耗时的分位数（p50/p90/p99，毫秒）及分位数趋势，最慢的在前"""
+    return {
+        "success": True,
+        "message": "获取成功",
+        "data": run_history_service.summarize(hours, account, bucket_minutes, group_by)
+    }
@@ -1,15 +1,16 @@
 """
 鉴权中间件
-提供简单的API请求拦截和鉴权功能
+纯ASGI中间件，拦截 /api/ 请求并校验会话令牌或密码，不为每个请求创建额外的任务和响应流
 """
 
 import logging
-import os
 from typing import Optional
-from fastapi import Request, HTTPException
+from urllib.parse import parse_qs
+
 from fastapi.responses import JSONResponse
-from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.types import ASGIApp, Receive, Scope, Send
 
+from app.services.auth_service import auth_service
 from config import get_config
 
 # 配置日志
@@ -20,172 +21,78 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
-class AuthMiddleware(BaseHTTPMiddleware):
+class AuthMiddleware:
     """鉴权中间件"""
-    
-    def __init__(self, app):
-        super().__init__(app)
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
         self.config = get_config()
-        # 从.password文件读取密码
-        self.password_file = os.path.join(os.path.dirname(__file__), "..", "..", "data", ".password")
-        
+
         # 不需要鉴权的路径
         self.excluded_paths = {
             "/docs",
-            "/redoc", 
+            "/redoc",
             "/openapi.json",
             "/api/login",  # 添加API登录路径
             "/favicon.ico"
         }
 
-    def _read_password_file(self) -> str:
-        """
-        从.password文件读取密码，如果文件不存在则自动创建并生成随机密码
-        
-        Returns:
-            str: 存储的密码
-            如果密码文件不存在，会自动创建并生成随机密码
-        """
-        try:
-            if os.path.exists(self.password_file):
-                with open(self.password_file, 'r', encoding='utf-8') as f:
-                    password = f.read().strip()
-                    
-                    if not password:
-                        logger.warning("密码文件存在但内容为空，将重新生成密码")
-                        return self._create_password_file()
-                    
-                    return password
-            else:
-                logger.info(f"密码文件不存在，将自动创建密码文件: {self.password_file}")
-                return self._create_password_file()
-        except Exception as e:
-            logger.error(f"读取.password文件异常: {str(e)}")
-            return ""
-    
-    def _create_password_file(self) -> str:
-        """
-        创建密码文件并生成随机密码
-        
-        Returns:
-            str: 生成的随机密码
-        """
-        import secrets
-        import string
-        
-        # 生成16位随机密码（包含字母、数字和特殊字符）
-        alphabet = string.ascii_letters + string.digits + "!@#$%^&*"
-        password = ''.join(secrets.choice(alphabet) for _ in range(16))
-        
-        try:
-            # 确保目录存在
-            os.makedirs(os.path.dirname(self.password_file), exist_ok=True)
-            
-            # 写入密码文件
-            with open(self.password_file, 'w', encoding='utf-8') as f:
-                f.write(password)
-            
-            logger.info(f"生成的随机密码: {password}")
-
-            return password
-        except Exception as e:
-            logger.error(f"创建密码文件失败: {str(e)}")
-            return ""
-
-    
-    async def dispatch(self, request: Request, call_next):
+        # 允许通过查询参数 ?token= 携带会话令牌的路径（浏览器EventSource不能设置请求头）
+        self.query_token_paths = {
+            "/api/events"
+        }
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
         """
-        处理请求
-        
-        Args:
-            request: 请求对象
-            call_next: 下一个中间件或路由处理函数
-            
-        Returns:
-            Response: 响应对象
+        处理请求：只有 /api/ 下的HTTP请求需要鉴权，开发模式下直接放行
         """
-        # 检查是否在排除路径中
-        if request.url.path in self.excluded_paths:
-            return await call_next(request)
-
-        
-        # 检查是否为API路径
-        if request.url.path.startswith("/api/"):
-            # 开发模式下不需要密码验证，直接放行
-            if self.config.DEBUG:
-                response = await call_next(request)
-                return response
-            
-            # 生产模式需要进行密码验证
-            try:
-                # 获取密码（从Header中获取）
-                password = self._extract_password(request)
-                
-                # 验证密码
-                if not self._validate_password(password):
-                    return JSONResponse(
-                        status_code=401,
-                        content={
-                            "error": "Unauthorized",
-                            "message": "无效的密码或缺少密码"
-                        }
-                    )
-            except FileNotFoundError as e:
-                return JSONResponse(
-                    status_code=500,
-                    content={"detail": "系统配置错误: 密码文件不存在"}
-                )
-            except Exception as e:
-                logger.error(f"密码验证异常: {str(e)}")
-                return JSONResponse(
-                    status_code=500,
-                    content={"detail": "系统配置错误: 无法读取密码文件"}
-                )
-        
-        # 继续处理请求
-        response = await call_next(request)
-        return response
-    
-    def _extract_password(self, request: Request) -> str:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        path = scope["path"]
+        if path in self.excluded_paths or not path.startswith("/api/") or self.config.DEBUG:
+            await self.app(scope, receive, send)
+            return
+
+        if not self._authenticate(scope, path):
+            response = JSONResponse(
+                status_code=401,
+                content={
+                    "error": "Unauthorized",
+                    "message": "无效的令牌或密码"
+                }
+            )
+            await response(scope, receive, send)
+            return
+
+        await self.app(scope, receive, send)
+
+    @staticmethod
+    def _header(scope: Scope, name: bytes) -> Optional[str]:
+        """从ASGI scope中获取请求头（name为小写）"""
+        for key, value in scope["headers"]:
+            if key == name:
+                return value.decode("latin-1")
+        return None
+
+    def _authenticate(self, scope: Scope, path: str) -> bool:
         """
-        从请求中提取密码
-        
-        Args:
-            request: 请求对象
-            
-        Returns:
-            str: 密码
+        校验请求凭据：优先使用 Authorization: Bearer <会话令牌>，
+        兼容直接携带密码的 X-Password 请求头（脚本等调用方）；
+        事件推送等路径还接受查询参数中的会话令牌（不接受密码，避免密码出现在URL与访问日志中）
         """
-        # 从Header中获取（使用X-Password头）
-        password = request.headers.get("X-Password")
+        authorization = self._header(scope, b"authorization")
+        if authorization and authorization[:7].lower() == "bearer ":
+            return auth_service.verify_token(authorization[7:].strip())
+
+        password = self._header(scope, b"x-password")
         if password:
-            return password
-        
-        return ""
-    
-    def _validate_password(self, password: Optional[str]) -> bool:
-        """
-        验证密码
-        
-        Args:
-            password: 密码字符串
-            
-        Returns:
-            bool: 验证是否通过
-        """
-        # 每次都从文件读取密码
-        stored_password = self._read_password_file()
-        logger.info(f"存储的密码: {stored_password}，输入密码: {password}")
-        
-        # 如果存储的密码为空，任何密码都不会验证通过
-        if not stored_password:
-            return False
-            
-        if not password:
-            return False
-        
-        # 检查密码是否与存储的密码一致
-        if password == stored_password:
-            return True
-        else:
-            return False
\ No newline at end of file
+            return auth_service.verify_password(password)
+
+        if path in self.query_token_paths:
+            token = parse_qs(scope.get("query_string", b"").decode("latin-1")).get("token")
+            if token:
+                return auth_service.verify_token(token[0])
+
+        return False
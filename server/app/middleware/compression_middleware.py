@@ -0,0 +1,161 @@
+"""
+响应压缩中间件
+纯ASGI中间件，按请求头Accept-Encoding协商brotli或gzip，压缩超过 COMPRESSION_MIN_BYTES 的文本类响应；
+流式响应（如导出）每攒够 COMPRESSION_MIN_BYTES 压缩并刷新一次，不等待整个响应生成
+"""
+
+import zlib
+from typing import List, Optional
+
+import brotli
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from config import get_config
+
+# 可压缩的内容类型（text/event-stream需要逐条实时推送，不压缩）
+_COMPRESSIBLE_TYPES = (
+    "application/json",
+    "application/x-ndjson",
+    "application/javascript",
+    "application/xml",
+    "image/svg+xml",
+)
+
+
+def choose_encoding(accept_encoding: str) -> Optional[str]:
+    """根据Accept-Encoding选择压缩算法，优先brotli，q=0表示不接受"""
+    accepted = set()
+    for item in accept_encoding.lower().split(","):
+        coding, _, params = item.strip().partition(";")
+        params = params.replace(" ", "")
+        if params.startswith("q="):
+            try:
+                if float(params[2:]) <= 0:
+                    continue
+            except ValueError:
+                continue
+        accepted.add(coding.strip())
+    if "br" in accepted:
+        return "br"
+    if "gzip" in accepted:
+        return "gzip"
+    return None
+
+
+def _is_compressible(headers: Headers) -> bool:
+    """已编码的响应和非文本类响应不压缩"""
+    if "content-encoding" in headers:
+        return False
+    content_type = headers.get("content-type", "").split(";")[0].strip().lower()
+    if content_type == "text/event-stream":
+        return False
+    return content_type.startswith("text/") or content_type in _COMPRESSIBLE_TYPES
+
+
+class _Compressor:
+    """gzip/brotli增量压缩器，每次compress都会刷新已压缩的数据"""
+
+    def __init__(self, encoding: str, gzip_level: int, brotli_quality: int):
+        self.encoding = encoding
+        if encoding == "br":
+            self._brotli = brotli.Compressor(quality=brotli_quality)
+        else:
+            self._zlib = zlib.compressobj(gzip_level, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes) -> bytes:
+        if self.encoding == "br":
+            return self._brotli.process(data) + self._brotli.flush()
+        return self._zlib.compress(data) + self._zlib.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        if self.encoding == "br":
+            return self._brotli.finish()
+        return self._zlib.flush(zlib.Z_FINISH)
+
+
+class CompressionMiddleware:
+    """响应压缩中间件"""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+        self.config = get_config()
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not self.config.COMPRESSION_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        encoding = choose_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        responder = _CompressionResponder(send, encoding, self.config)
+        await self.app(scope, receive, responder.send)
+
+
+class _CompressionResponder:
+    """包装send：暂存响应头，收到第一块响应体后决定是否压缩"""
+
+    def __init__(self, send: Send, encoding: str, config):
+        self._send = send
+        self.encoding = encoding
+        self.min_bytes = config.COMPRESSION_MIN_BYTES
+        self.gzip_level = config.COMPRESSION_GZIP_LEVEL
+        self.brotli_quality = config.COMPRESSION_BROTLI_QUALITY
+        self.start_message: Optional[Message] = None
+        self.compressor: Optional[_Compressor] = None
+        self.passthrough = False
+        # 流式响应中尚未压缩的数据，攒够COMPRESSION_MIN_BYTES再压缩并刷新，避免每个小块单独刷新
+        self.pending = bytearray()
+
+    async def send(self, message: Message) -> None:
+        message_type = message["type"]
+        if message_type == "http.response.start":
+            self.start_message = message
+            return
+        if message_type != "http.response.body" or self.passthrough:
+            await self._send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+
+        if self.compressor is None:
+            # 第一块响应体：决定是否压缩并发送响应头
+            headers = MutableHeaders(raw=self.start_message["headers"])
+            if not _is_compressible(headers) or self.start_message["status"] in (204, 304):
+                await self._start_passthrough(message)
+                return
+            headers.add_vary_header("Accept-Encoding")
+            if not more_body and len(body) < self.min_bytes:
+                await self._start_passthrough(message)
+                return
+
+            self.compressor = _Compressor(self.encoding, self.gzip_level, self.brotli_quality)
+            headers["Content-Encoding"] = self.encoding
+            if more_body:
+                # 流式响应：长度未知，改为分块传输
+                del headers["Content-Length"]
+            else:
+                body = self.compressor.compress(body) + self.compressor.finish()
+                headers["Content-Length"] = str(len(body))
+                await self._send(self.start_message)
+                await self._send({"type": "http.response.body", "body": body})
+                return
+            await self._send(self.start_message)
+
+        self.pending += body
+        if more_body and len(self.pending) < self.min_bytes:
+            return
+        chunks: List[bytes] = [self.compressor.compress(bytes(self.pending))] if self.pending else []
+        self.pending.clear()
+        if not more_body:
+            chunks.append(self.compressor.finish())
+        await self._send({"type": "http.response.body", "body": b"".join(chunks), "more_body": more_body})
+
+    async def _start_passthrough(self, message: Message) -> None:
+        self.passthrough = True
+        await self._send(self.start_message)
+        await self._send(message)
@@ -0,0 +1,164 @@
+"""
+前端单页应用静态文件中间件
+纯ASGI中间件，位于最外层：静态文件与前端路由的GET/HEAD请求直接在这里返回，不再经过压缩、CORS、鉴权中间件与路由匹配。
+首次请求时扫描一次静态目录（构建产物部署后不再变化），index.html及其压缩版本常驻内存；
+其他文件按扫描时的stat直接返回，客户端接受时优先返回预压缩的 .br/.gz 同名文件（见 python -m app.precompress）。
+/assets/ 下的文件名带内容哈希，设置一年有效期的immutable缓存；其他文件每次按ETag协商
+"""
+
+import gzip
+import hashlib
+import logging
+import mimetypes
+import os
+from typing import Dict, List, Optional, Tuple
+
+import brotli
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse, Response
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from app.middleware.compression_middleware import choose_encoding
+from config import get_config
+
+logger = logging.getLogger(__name__)
+
+# 预压缩文件的扩展名: 内容编码 -> 扩展名
+_VARIANT_SUFFIXES = {"br": ".br", "gzip": ".gz"}
+
+# 交给应用处理的路径
+_APP_PATH_PREFIXES = ("/api/", "/docs", "/redoc", "/openapi.json", "/metrics")
+
+
+class _StaticFile:
+    """扫描得到的静态文件: 路径、stat、ETag以及预压缩版本"""
+
+    def __init__(self, path: str, stat: os.stat_result, cache_control: str):
+        self.path = path
+        self.stat = stat
+        self.cache_control = cache_control
+        self.media_type = mimetypes.guess_type(path)[0] or "application/octet-stream"
+        self.etag = f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+        # 内容编码 -> (文件路径, stat)
+        self.variants: Dict[str, Tuple[str, os.stat_result]] = {}
+
+
+class _MemoryFile:
+    """常驻内存的文件（index.html）: 原始内容与压缩版本"""
+
+    def __init__(self, body: bytes, media_type: str):
+        self.media_type = media_type
+        self.etag = '"' + hashlib.sha1(body).hexdigest()[:16] + '"'
+        self.bodies: Dict[str, bytes] = {
+            "identity": body,
+            "br": brotli.compress(body, quality=11),
+            "gzip": gzip.compress(body, 9, mtime=0),
+        }
+
+
+class SpaMiddleware:
+    """前端单页应用静态文件中间件"""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+        self.config = get_config()
+        self.static_dir = self.config.STATIC_DIR
+        self._files: Optional[Dict[str, _StaticFile]] = None
+        self._index: Optional[_MemoryFile] = None
+
+    def _scan(self) -> None:
+        """扫描静态目录，建立 URL路径 -> 文件 的索引"""
+        files: Dict[str, _StaticFile] = {}
+        variants: List[Tuple[str, str, str]] = []
+        asset_cache = f"public, max-age={self.config.SPA_ASSET_MAX_AGE}, immutable"
+        for root, _, names in os.walk(self.static_dir):
+            for name in names:
+                path = os.path.join(root, name)
+                url_path = "/" + os.path.relpath(path, self.static_dir).replace(os.sep, "/")
+                if name == ".gitkeep":
+                    continue
+                encoding = next((enc for enc, suffix in _VARIANT_SUFFIXES.items() if name.endswith(suffix)), None)
+                if encoding:
+                    variants.append((url_path[:-len(_VARIANT_SUFFIXES[encoding])], encoding, path))
+                    continue
+                cache_control = asset_cache if url_path.startswith("/assets/") else "no-cache"
+                files[url_path] = _StaticFile(path, os.stat(path), cache_control)
+
+        for url_path, encoding, path in variants:
+            # 只使用比原文件新的预压缩文件
+            static_file = files.get(url_path)
+            if static_file is not None:
+                stat = os.stat(path)
+                if stat.st_mtime_ns >= static_file.stat.st_mtime_ns:
+                    static_file.variants[encoding] = (path, stat)
+
+        index = files.pop("/index.html", None)
+        if index is not None:
+            with open(index.path, "rb") as f:
+                self._index = _MemoryFile(f.read(), "text/html; charset=utf-8")
+        self._files = files
+        logger.info(f"已加载前端静态文件: {len(files)} 个，预压缩 {len(variants)} 个，"
+                    f"index.html: {'已缓存' if self._index else '不存在'}")
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if (scope["type"] != "http" or scope["method"] not in ("GET", "HEAD")
+                or scope["path"].startswith(_APP_PATH_PREFIXES)):
+            await self.app(scope, receive, send)
+            return
+
+        if self._files is None:
+            self._scan()
+        if self._index is None:
+            # 未构建前端时交给应用处理（返回404）
+            await self.app(scope, receive, send)
+            return
+
+        path = scope["path"]
+        headers = Headers(scope=scope)
+        static_file = self._files.get(path)
+        if static_file is not None:
+            response = self._file_response(static_file, headers)
+        elif path.startswith("/assets/"):
+            # 资源文件不存在时不能返回index.html，否则浏览器会按错误的类型解析
+            response = Response("Not Found", status_code=404, media_type="text/plain")
+        else:
+            # 前端路由：返回index.html
+            response = self._index_response(headers)
+        await response(scope, receive, send)
+
+    @staticmethod
+    def _representation_etag(etag: str, encoding: str) -> str:
+        """压缩版本使用不同的ETag（原ETag加编码后缀）"""
+        return etag if encoding == "identity" else f'{etag[:-1]}-{encoding}"'
+
+    def _file_response(self, static_file: _StaticFile, headers: Headers) -> Response:
+        encoding = choose_encoding(headers.get("accept-encoding", ""))
+        if encoding not in static_file.variants:
+            encoding = "identity"
+        response_headers = {"ETag": self._representation_etag(static_file.etag, encoding),
+                            "Cache-Control": static_file.cache_control}
+        if static_file.variants:
+            response_headers["Vary"] = "Accept-Encoding"
+        if headers.get("if-none-match") == response_headers["ETag"]:
+            return Response(status_code=304, headers=response_headers)
+
+        if encoding == "identity":
+            return FileResponse(static_file.path, stat_result=static_file.stat, media_type=static_file.media_type,
+                                headers=response_headers)
+        path, stat = static_file.variants[encoding]
+        response_headers["Content-Encoding"] = encoding
+        return FileResponse(path, stat_result=stat, media_type=static_file.media_type, headers=response_headers)
+
+    def _index_response(self, headers: Headers) -> Response:
+        index = self._index
+        encoding = choose_encoding(headers.get("accept-encoding", ""))
+        if encoding not in index.bodies:
+            encoding = "identity"
+        response_headers = {"ETag": self._representation_etag(index.etag, encoding),
+                            "Cache-Control": "no-cache", "Vary": "Accept-Encoding"}
+        if headers.get("if-none-match") == response_headers["ETag"]:
+            return Response(status_code=304, headers=response_headers)
+
+        if encoding != "identity":
+            response_headers["Content-Encoding"] = encoding
+        return Response(index.bodies[encoding], media_type=index.media_type, headers=response_headers)
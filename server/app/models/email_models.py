@@ -3,9 +3,12 @@
 """
 
 import logging
+import time
 
 from peewee import *
+from playhouse.migrate import SqliteMigrator, migrate
 
+from app.services.metrics_service import DB_QUERY_SECONDS
 from config import get_config
 
 # 配置日志
@@ -19,8 +22,26 @@ logger = logging.getLogger(__name__)
 # 获取全局配置
 config = get_config()
 
-# 创建数据库连接
-db = SqliteDatabase(config.DATABASE_URL)
+# 统计耗时的语句类型，其他语句（PRAGMA、事务控制等）记为other
+_STATEMENTS = ('select', 'insert', 'update', 'delete')
+
+
+class InstrumentedSqliteDatabase(SqliteDatabase):
+    """记录每条语句耗时（按语句类型）的SQLite数据库"""
+
+    def execute_sql(self, sql, *args, **kwargs):
+        statement = sql[:6].lower()
+        if statement not in _STATEMENTS:
+            statement = 'other'
+        start = time.perf_counter()
+        try:
+            return super().execute_sql(sql, *args, **kwargs)
+        finally:
+            DB_QUERY_SECONDS.observe(time.perf_counter() - start, statement)
+
+
+# 创建数据库连接（WAL模式，允许多个进程同时读写）
+db = InstrumentedSqliteDatabase(config.DATABASE_URL, pragmas={'journal_mode': 'wal'}, timeout=10)
 
 class BaseModel(Model):
     """基础模型类"""
@@ -33,6 +54,9 @@ class EmailConfig(BaseModel):
     auth_code = CharField(max_length=255)  # 授权码
     server_name = CharField(max_length=50)  # 服务商名称
     channel_id = CharField(max_length=50)
+    interval_minutes = IntegerField(default=config.SCHEDULE_INTERVAL_MINUTES)  # 检查间隔（分钟）
+    jitter_seconds = IntegerField(default=config.SCHEDULE_JITTER_SECONDS)  # 每次执行的随机抖动（秒）
+    folders = TextField(default='INBOX')  # 监控的文件夹，多个用英文逗号分隔
 
     class Meta:
         table_name = 'email_configs'
@@ -58,24 +82,174 @@ class EmailContent(BaseModel):
     subject = TextField()  # 邮件主题
     reception_time = DateTimeField()  # 接收时间
     body_text = TextField(null=True)  # 纯文本正文
+    folder = CharField(max_length=255, default='INBOX')  # 所在文件夹
+    uid = BigIntegerField(null=True)  # 文件夹中的UID
+    truncated = BooleanField(default=False)  # 正文是否因超过大小上限被截断
     sent = BooleanField(default=False)  # 是否已发送通知
+    backfilled = BooleanField(default=False)  # 是否为回填导入的历史邮件（不推送通知，不参与保留数量清理）
 
     class Meta:
         table_name = 'email_contents'
+        indexes = (
+            # 按UID去重（回填、导入）与附件关联
+            (('recipient', 'folder', 'uid'), False),
+            # 按发件人、主题与收件时间去重（find_duplicate）
+            (('recipient', 'sender', 'subject', 'reception_time'), False),
+            # 查询未发送通知的邮件
+            (('recipient', 'sent'), False),
+        )
+
+class WorkerHeartbeat(BaseModel):
+    """工作进程心跳表"""
+    worker_id = CharField(max_length=100, primary_key=True)  # 工作进程ID
+    hostname = CharField(max_length=255)  # 主机名
+    pid = IntegerField()  # 进程号
+    started_at = DateTimeField()  # 启动时间
+    last_seen = DateTimeField(index=True)  # 最近一次心跳时间
+
+    class Meta:
+        table_name = 'worker_heartbeats'
+
+class AccountLease(BaseModel):
+    """邮箱账户租约表，同一时刻每个账户只由一个工作进程处理"""
+    account = CharField(max_length=100, primary_key=True)  # 邮箱账户
+    worker_id = CharField(max_length=100, index=True)  # 持有租约的工作进程ID
+    expires_at = DateTimeField()  # 租约过期时间
+
+    class Meta:
+        table_name = 'account_leases'
+
+class MailboxState(BaseModel):
+    """邮箱文件夹状态快照（STATUS结果），用于判断自上次收取后是否有变化"""
+    account = CharField(max_length=100)  # 邮箱账户
+    folder = CharField(max_length=255)  # 文件夹名称
+    uidvalidity = BigIntegerField()  # UIDVALIDITY
+    uidnext = BigIntegerField()  # UIDNEXT
+    messages = IntegerField()  # 邮件数量
+    highest_modseq = BigIntegerField(null=True)  # HIGHESTMODSEQ（服务器支持CONDSTORE时）
+    updated_at = DateTimeField()  # 更新时间
+
+    class Meta:
+        table_name = 'mailbox_states'
+        primary_key = CompositeKey('account', 'folder')
+
+class EmailAttachment(BaseModel):
+    """附件元数据表，来自BODYSTRUCTURE，不保存附件内容，下载时按段号从IMAP收取"""
+    id = AutoField(primary_key=True)  # 附件ID
+    account = CharField(max_length=100)  # 邮箱账户
+    folder = CharField(max_length=255)  # 所在文件夹
+    uid = BigIntegerField()  # 邮件在文件夹中的UID
+    part = CharField(max_length=50)  # MIME段号，如 2、1.2
+    filename = CharField(max_length=255)  # 文件名
+    content_type = CharField(max_length=255)  # MIME类型
+    encoding = CharField(max_length=50, default='7bit')  # 传输编码（下载时解码）
+    size = BigIntegerField(default=0)  # 大小（字节），base64编码的附件为估算的解码后大小
+
+    class Meta:
+        table_name = 'email_attachments'
+        indexes = (
+            (('account', 'folder', 'uid', 'part'), True),
+        )
+
+class ConfigVersion(BaseModel):
+    """配置版本表，邮箱配置或通知渠道每次修改时版本号加一，各进程据此判断内存中的配置缓存是否过期"""
+    name = CharField(max_length=50, primary_key=True)  # 配置名称
+    version = IntegerField(default=0)  # 版本号
+
+    class Meta:
+        table_name = 'config_versions'
+
+class BackfillJob(BaseModel):
+    """历史邮件回填任务表，按UID从新到旧分块导入，next_uid为断点"""
+    id = AutoField(primary_key=True)  # 任务ID
+    account = CharField(max_length=100, index=True)  # 邮箱账户
+    folder = CharField(max_length=255, default='INBOX')  # 文件夹
+    status = CharField(max_length=20, default='pending', index=True)  # pending/running/paused/completed/failed/cancelled
+    uidvalidity = BigIntegerField(null=True)  # 开始导入时的UIDVALIDITY，变化后从头开始
+    next_uid = BigIntegerField(null=True)  # 下一块的最大UID（断点），为0时已导入完成
+    total = IntegerField(default=0)  # 开始导入时文件夹中的邮件数量
+    imported = IntegerField(default=0)  # 已导入邮件数
+    skipped = IntegerField(default=0)  # 已存在而跳过的邮件数
+    bytes_fetched = BigIntegerField(default=0)  # 已收取的字节数
+    error = TextField(null=True)  # 失败原因
+    created_at = DateTimeField()  # 创建时间
+    updated_at = DateTimeField()  # 更新时间
+
+    class Meta:
+        table_name = 'backfill_jobs'
+
+class RunHistory(BaseModel):
+    """邮箱账户处理历史表，每个账户每次处理（定时或手动）一条，记录各阶段耗时、数量与错误"""
+    id = AutoField(primary_key=True)  # 记录ID
+    account = CharField(max_length=100)  # 邮箱账户
+    server_name = CharField(max_length=50, null=True)  # 服务商名称
+    trigger = CharField(max_length=20, default='schedule')  # schedule（定时）/manual（手动）
+    status = CharField(max_length=20)  # success/error/timeout
+    started_at = DateTimeField(index=True)  # 开始时间
+    duration_ms = IntegerField()  # 总耗时（毫秒）
+    connect_ms = IntegerField(null=True)  # IMAP连接与登录耗时（毫秒），以下阶段耗时超时取消时为空
+    fetch_ms = IntegerField(null=True)  # 文件夹同步与邮件收取耗时（毫秒）
+    parse_ms = IntegerField(null=True)  # 邮件解析耗时合计（毫秒）
+    store_ms = IntegerField(null=True)  # 邮件保存耗时合计（毫秒）
+    notify_ms = IntegerField(null=True)  # 通知发送耗时（毫秒）
+    retention_ms = IntegerField(null=True)  # 旧邮件清理耗时（毫秒）
+    total_emails = IntegerField(default=0)  # 收取的邮件数
+    new_emails = IntegerField(default=0)  # 新邮件数
+    notifications_sent = IntegerField(default=0)  # 发送的通知数
+    deleted_old_emails = IntegerField(default=0)  # 删除的旧邮件数
+    unchanged = BooleanField(default=False)  # 所有文件夹是否均无变化
+    errors = TextField(null=True)  # 错误信息（每行一条）
+
+    class Meta:
+        table_name = 'run_history'
+        indexes = (
+            (('account', 'started_at'), False),
+        )
+
+MODELS = [
+    EmailConfig,
+    NotificationChannel,
+    EmailContent,
+    WorkerHeartbeat,
+    AccountLease,
+    MailboxState,
+    BackfillJob,
+    EmailAttachment,
+    ConfigVersion,
+    RunHistory
+]
 
 def create_tables():
-    """创建数据库表"""
-    db.connect()
-    db.create_tables([
-        EmailConfig,
-        NotificationChannel,
-        EmailContent
-    ])
+    """创建数据库表（索引在补充字段之后由create_indexes创建，旧版本数据库的表可能缺少索引用到的字段）"""
+    db.connect(reuse_if_open=True)
+    with db.atomic():
+        for model in MODELS:
+            model._schema.create_table(safe=True)
     logger.info("数据库表创建成功")
 
+def migrate_tables():
+    """为已存在的表补充新增字段（旧版本数据库升级）"""
+    migrator = SqliteMigrator(db)
+    for model in MODELS:
+        table_name = model._meta.table_name
+        existing_columns = {column.name for column in db.get_columns(table_name)}
+        missing_fields = [field for field in model._meta.sorted_fields
+                          if field.column_name not in existing_columns]
+        if missing_fields:
+            migrate(*[migrator.add_column(table_name, field.column_name, field) for field in missing_fields])
+            logger.info(f"数据表 {table_name} 新增字段: {[field.column_name for field in missing_fields]}")
+
+def create_indexes():
+    """创建数据表的索引（已存在的跳过）"""
+    with db.atomic():
+        for model in MODELS:
+            model._schema.create_indexes(safe=True)
+
 def init_database():
     """初始化数据库"""
     create_tables()
+    migrate_tables()
+    create_indexes()
 
 if __name__ == "__main__":
     init_database()
\ No newline at end of file
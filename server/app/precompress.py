@@ -0,0 +1,64 @@
+"""
+前端静态文件预压缩
+为构建产物中的文本类文件生成同名的 .br 与 .gz 文件，由SpaMiddleware在客户端接受时直接返回，运行时不再压缩
+
+用法（在server目录下执行，前端构建产物复制到dist之后）:
+    python -m app.precompress [目录，默认为STATIC_DIR]
+"""
+
+import gzip
+import logging
+import os
+import sys
+
+import brotli
+
+from config import get_config
+
+# 配置日志
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(levelname)s - %(asctime)s - %(name)s - %(message)s',
+    datefmt='%Y-%m-%d %H:%M:%S'
+)
+logger = logging.getLogger(__name__)
+
+# 需要预压缩的文件类型
+COMPRESSIBLE_SUFFIXES = ('.html', '.js', '.mjs', '.css', '.svg', '.json', '.txt', '.map', '.xml', '.wasm')
+
+# 小于该大小的文件不压缩（字节）
+MIN_SIZE = 1024
+
+
+def precompress(directory: str) -> int:
+    """
+    为目录下的文本类文件生成 .br 与 .gz 文件，压缩后没有变小的不保留
+
+    Returns:
+        int: 生成的压缩文件数量
+    """
+    written = 0
+    for root, _, names in os.walk(directory):
+        for name in names:
+            if not name.endswith(COMPRESSIBLE_SUFFIXES):
+                continue
+            path = os.path.join(root, name)
+            with open(path, 'rb') as f:
+                data = f.read()
+            if len(data) < MIN_SIZE:
+                continue
+            for suffix, compressed in (('.br', brotli.compress(data, quality=11)),
+                                       ('.gz', gzip.compress(data, 9, mtime=0))):
+                if len(compressed) >= len(data):
+                    continue
+                with open(path + suffix, 'wb') as f:
+                    f.write(compressed)
+                written += 1
+            logger.info(f"已预压缩: {os.path.relpath(path, directory)}")
+    return written
+
+
+if __name__ == "__main__":
+    target = sys.argv[1] if len(sys.argv) > 1 else get_config().STATIC_DIR
+    count = precompress(target)
+    logger.info(f"预压缩完成: {target}，共生成 {count} 个压缩文件")
@@ -0,0 +1,74 @@
+"""
+附件元数据数据访问层
+"""
+
+from typing import Any, Dict, List, Optional
+
+from app.models.email_models import EmailAttachment, EmailContent
+
+
+class AttachmentRepository:
+    """
+    附件元数据数据访问类，附件按 账户 + 文件夹 + UID 关联到邮件
+    文件夹UIDVALIDITY变化时该文件夹的附件元数据随旧UID一起清除（见MailboxStateRepository.reset_folder）
+    """
+
+    @staticmethod
+    def save_many(account: str, folder: str, uid: int, attachments: List[Dict[str, Any]]) -> None:
+        """保存一封邮件的附件元数据，已存在的段号跳过"""
+        if not attachments or uid is None:
+            return
+        rows = [dict(attachment, account=account, folder=folder, uid=uid) for attachment in attachments]
+        EmailAttachment.insert_many(rows).on_conflict_ignore().execute()
+
+    @staticmethod
+    def get_for_email(email: EmailContent) -> List[EmailAttachment]:
+        """获取邮件的附件列表（按段号排序）"""
+        if email.uid is None:
+            return []
+        return list(EmailAttachment.select()
+                    .where((EmailAttachment.account == email.recipient) &
+                           (EmailAttachment.folder == email.folder) &
+                           (EmailAttachment.uid == email.uid))
+                    .order_by(EmailAttachment.id))
+
+    @staticmethod
+    def get_for_emails(emails: List[EmailContent]) -> Dict[int, List[EmailAttachment]]:
+        """批量获取多封邮件的附件: 邮件ID -> 附件列表，一次查询"""
+        keys = {(email.recipient, email.folder, email.uid): email.id for email in emails if email.uid is not None}
+        result: Dict[int, List[EmailAttachment]] = {email.id: [] for email in emails}
+        if not keys:
+            return result
+        uids = {uid for _, _, uid in keys}
+        accounts = {account for account, _, _ in keys}
+        query = (EmailAttachment.select()
+                 .where(EmailAttachment.account.in_(accounts) & EmailAttachment.uid.in_(uids))
+                 .order_by(EmailAttachment.id))
+        for attachment in query:
+            email_id = keys.get((attachment.account, attachment.folder, attachment.uid))
+            if email_id is not None:
+                result[email_id].append(attachment)
+        return result
+
+    @staticmethod
+    def get_part(email: EmailContent, part: str) -> Optional[EmailAttachment]:
+        """根据段号获取邮件的单个附件"""
+        if email.uid is None:
+            return None
+        return EmailAttachment.select().where(
+            (EmailAttachment.account == email.recipient) &
+            (EmailAttachment.folder == email.folder) &
+            (EmailAttachment.uid == email.uid) &
+            (EmailAttachment.part == part)
+        ).first()
+
+    @staticmethod
+    def delete_for_email(email: EmailContent) -> int:
+        """删除邮件的附件元数据"""
+        if email.uid is None:
+            return 0
+        return EmailAttachment.delete().where(
+            (EmailAttachment.account == email.recipient) &
+            (EmailAttachment.folder == email.folder) &
+            (EmailAttachment.uid == email.uid)
+        ).execute()
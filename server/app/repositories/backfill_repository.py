@@ -0,0 +1,134 @@
+"""
+历史邮件回填任务数据访问层
+"""
+
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from peewee import DoesNotExist
+
+from app.models.email_models import db, BackfillJob, EmailAttachment, EmailContent
+
+# 未结束的任务状态
+ACTIVE_STATUSES = ('pending', 'running')
+
+
+class BackfillRepository:
+    """回填任务数据访问类"""
+
+    @staticmethod
+    def create(account: str, folder: str) -> BackfillJob:
+        """创建回填任务"""
+        now = datetime.now()
+        return BackfillJob.create(account=account, folder=folder, status='pending',
+                                  created_at=now, updated_at=now)
+
+    @staticmethod
+    def get_by_id(job_id: int) -> Optional[BackfillJob]:
+        """根据ID获取回填任务"""
+        try:
+            return BackfillJob.get(BackfillJob.id == job_id)
+        except DoesNotExist:
+            return None
+
+    @staticmethod
+    def get_all(account: str = None) -> List[BackfillJob]:
+        """获取回填任务（新的在前）"""
+        query = BackfillJob.select().order_by(BackfillJob.id.desc())
+        if account:
+            query = query.where(BackfillJob.account == account)
+        return list(query)
+
+    @staticmethod
+    def get_active(account: str = None, folder: str = None) -> List[BackfillJob]:
+        """获取未结束（等待或执行中）的回填任务"""
+        query = BackfillJob.select().where(BackfillJob.status.in_(ACTIVE_STATUSES)).order_by(BackfillJob.id)
+        if account:
+            query = query.where(BackfillJob.account == account)
+        if folder:
+            query = query.where(BackfillJob.folder == folder)
+        return list(query)
+
+    @staticmethod
+    def get_status(job_id: int) -> Optional[str]:
+        """获取回填任务的当前状态（用于感知其他进程的暂停、取消操作）"""
+        job = BackfillJob.select(BackfillJob.status).where(BackfillJob.id == job_id).first()
+        return job.status if job else None
+
+    @staticmethod
+    def update(job_id: int, **fields: Any) -> bool:
+        """更新回填任务字段"""
+        fields['updated_at'] = datetime.now()
+        return BackfillJob.update(**fields).where(BackfillJob.id == job_id).execute() > 0
+
+    @staticmethod
+    def set_status(job_id: int, status: str, from_statuses: tuple = None) -> bool:
+        """
+        修改回填任务状态
+
+        Args:
+            from_statuses: 只有当前状态在其中时才修改，为None时不限制
+
+        Returns:
+            bool: 是否修改成功
+        """
+        query = BackfillJob.update(status=status, updated_at=datetime.now()).where(BackfillJob.id == job_id)
+        if from_statuses:
+            query = query.where(BackfillJob.status.in_(from_statuses))
+        return query.execute() > 0
+
+    @staticmethod
+    def delete_account(account: str) -> int:
+        """删除邮箱账户的全部回填任务"""
+        return BackfillJob.delete().where(BackfillJob.account == account).execute()
+
+    @staticmethod
+    def existing_uids(account: str, folder: str, low_uid: int, high_uid: int) -> Set[int]:
+        """获取UID范围内已保存的邮件UID"""
+        query = (EmailContent
+                 .select(EmailContent.uid)
+                 .where((EmailContent.recipient == account) &
+                        (EmailContent.folder == folder) &
+                        (EmailContent.uid.between(low_uid, high_uid))))
+        return {row.uid for row in query}
+
+    @staticmethod
+    def existing_minutes_without_uid(account: str, since: datetime,
+                                     until: datetime) -> Set[Tuple[str, str, datetime]]:
+        """
+        获取时间范围内没有UID的已保存邮件（记录UID之前收取的邮件）: (发件人, 主题, 收件时间所在分钟)
+        这些邮件无法按UID去重，与定时收取相同按发件人、主题与同一分钟判断重复
+        """
+        query = (EmailContent
+                 .select(EmailContent.sender, EmailContent.subject, EmailContent.reception_time)
+                 .where((EmailContent.recipient == account) &
+                        (EmailContent.uid.is_null()) &
+                        (EmailContent.reception_time.between(since, until))))
+        return {(row.sender, row.subject, row.reception_time.replace(second=0, microsecond=0)) for row in query}
+
+    @staticmethod
+    def save_chunk(job_id: int, rows: List[Dict[str, Any]], attachments: List[Dict[str, Any]],
+                   next_uid: int, skipped: int, bytes_fetched: int) -> None:
+        """
+        在一个事务中批量插入一块邮件并推进断点，保证断点与已导入的邮件一致
+
+        Args:
+            job_id: 回填任务ID
+            rows: 邮件字段字典列表
+            attachments: 附件元数据字典列表
+            next_uid: 下一块的最大UID
+            skipped: 本块跳过的邮件数
+            bytes_fetched: 本块收取的字节数
+        """
+        with db.atomic():
+            if rows:
+                EmailContent.insert_many(rows).execute()
+            if attachments:
+                EmailAttachment.insert_many(attachments).on_conflict_ignore().execute()
+            BackfillJob.update(
+                next_uid=next_uid,
+                imported=BackfillJob.imported + len(rows),
+                skipped=BackfillJob.skipped + skipped,
+                bytes_fetched=BackfillJob.bytes_fetched + bytes_fetched,
+                updated_at=datetime.now()
+            ).where(BackfillJob.id == job_id).execute()
@@ -0,0 +1,103 @@
+"""
+邮箱配置与通知渠道的内存缓存
+配置很少修改却在每次定时任务和手动推送时查询，因此在进程内缓存全部邮箱配置和通知渠道：
+本进程通过仓储类修改配置时立即失效；其他进程的修改通过数据库中的配置版本号发现
+（最多每 CONFIG_CACHE_CHECK_SECONDS 秒查询一次版本号）
+缓存中的模型对象在多处共享，只能读取，修改需通过仓储类的 create / update / delete
+"""
+
+import logging
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+from app.models.email_models import ConfigVersion, EmailConfig, NotificationChannel
+from config import get_config
+
+logger = logging.getLogger(__name__)
+
+# 配置版本号在config_versions表中的名称
+CONFIG_VERSION_NAME = 'configs'
+
+
+class ConfigRegistry:
+    """邮箱配置与通知渠道缓存类（读穿透）"""
+
+    def __init__(self):
+        self.config = get_config()
+        self._lock = threading.Lock()
+        self._email_configs: Optional[Dict[str, EmailConfig]] = None
+        self._channels: Optional[Dict[int, NotificationChannel]] = None
+        self._version: Optional[int] = None
+        self._checked_at: Optional[float] = None
+        self.stats: Dict[str, int] = {
+            'hits': 0,       # 直接使用缓存的次数
+            'reloads': 0,    # 从数据库重新加载的次数
+        }
+
+    @staticmethod
+    def _db_version() -> int:
+        row = ConfigVersion.select(ConfigVersion.version).where(ConfigVersion.name == CONFIG_VERSION_NAME).first()
+        return row.version if row else 0
+
+    def _load(self) -> Tuple[Dict[str, EmailConfig], Dict[int, NotificationChannel]]:
+        """获取当前缓存，版本号检查间隔已过时查询数据库版本号，有变化时重新加载"""
+        with self._lock:
+            now = time.monotonic()
+            if (self._email_configs is not None and self._checked_at is not None
+                    and now - self._checked_at < self.config.CONFIG_CACHE_CHECK_SECONDS):
+                self.stats['hits'] += 1
+                return self._email_configs, self._channels
+
+            version = self._db_version()
+            self._checked_at = now
+            if self._email_configs is not None and version == self._version:
+                self.stats['hits'] += 1
+                return self._email_configs, self._channels
+
+            self._email_configs = {config.account: config for config in EmailConfig.select()}
+            self._channels = {channel.id: channel for channel in NotificationChannel.select()}
+            self._version = version
+            self.stats['reloads'] += 1
+            logger.debug(f"已加载配置缓存（版本 {version}）: {len(self._email_configs)} 个邮箱，{len(self._channels)} 个通知渠道")
+            return self._email_configs, self._channels
+
+    def invalidate(self) -> None:
+        """配置已修改：数据库版本号加一（通知其他进程），并丢弃本进程的缓存"""
+        (ConfigVersion
+         .insert(name=CONFIG_VERSION_NAME, version=1)
+         .on_conflict(conflict_target=[ConfigVersion.name],
+                      update={ConfigVersion.version: ConfigVersion.version + 1})
+         .execute())
+        with self._lock:
+            self._email_configs = None
+            self._channels = None
+
+    def email_configs(self) -> List[EmailConfig]:
+        """获取全部邮箱配置"""
+        return list(self._load()[0].values())
+
+    def email_config(self, account: str) -> Optional[EmailConfig]:
+        """根据账户获取邮箱配置"""
+        return self._load()[0].get(account)
+
+    def channels(self) -> List[NotificationChannel]:
+        """获取全部通知渠道"""
+        return list(self._load()[1].values())
+
+    def channel(self, channel_id: int) -> Optional[NotificationChannel]:
+        """根据ID获取通知渠道"""
+        return self._load()[1].get(channel_id)
+
+    def snapshot(self) -> Dict[str, int]:
+        """获取缓存状态"""
+        return {
+            'version': self._version,
+            'email_configs': len(self._email_configs or {}),
+            'channels': len(self._channels or {}),
+            **self.stats,
+        }
+
+
+# 全局配置缓存实例
+config_registry = ConfigRegistry()
@@ -2,10 +2,11 @@
 邮件记录相关数据访问层
 """
 
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Iterator, Tuple
 from datetime import datetime
-from peewee import DoesNotExist, fn
-from app.models.email_models import EmailContent
+from peewee import DoesNotExist, chunked, fn
+from app.models.email_models import EmailAttachment, EmailContent, db
+from app.repositories.attachment_repository import AttachmentRepository
 
 
 class EmailRecordRepository:
@@ -128,6 +129,7 @@ class EmailRecordRepository:
         """删除邮件记录"""
         try:
             email = EmailContent.get(EmailContent.id == email_id)
+            AttachmentRepository.delete_for_email(email)
             email.delete_instance()
             return True
         except DoesNotExist:
@@ -191,4 +193,106 @@ class EmailRecordRepository:
         
         return list(query.order_by(EmailContent.reception_time.desc())
                    .limit(limit)
-                   .offset(offset))
\ No newline at end of file
+                   .offset(offset))
+
+    @staticmethod
+    def iter_batches(account: str = None, since: datetime = None, until: datetime = None,
+                     batch_size: int = 1000) -> Iterator[List[EmailContent]]:
+        """
+        按ID顺序分批遍历邮件记录（用于导出），每批以上一批最后的ID为起点查询，
+        内存中只保留一批记录，也不会长时间占用数据库读事务
+
+        Args:
+            account: 只导出该邮箱账户的邮件
+            since: 收件时间下限（包含）
+            until: 收件时间上限（不包含）
+            batch_size: 每批的记录数
+        """
+        query = EmailContent.select()
+        if account:
+            query = query.where(EmailContent.recipient == account)
+        if since:
+            query = query.where(EmailContent.reception_time >= since)
+        if until:
+            query = query.where(EmailContent.reception_time < until)
+
+        last_id = 0
+        while True:
+            batch = list(query.where(EmailContent.id > last_id).order_by(EmailContent.id).limit(batch_size))
+            if not batch:
+                return
+            yield batch
+            if len(batch) < batch_size:
+                return
+            last_id = batch[-1].id
+
+    @staticmethod
+    def import_batch(rows: List[Dict[str, Any]], attachments: List[Dict[str, Any]]) -> Tuple[int, int]:
+        """
+        在一个事务中批量导入邮件记录，已存在的邮件跳过：
+        有UID的按 账户 + 文件夹 + UID 判断，没有UID的按发件人、主题相同且收件时间在同一分钟内判断
+
+        Args:
+            rows: 邮件字段字典列表
+            attachments: 附件元数据字典列表（含account、folder、uid），所属邮件被跳过时同样忽略
+
+        Returns:
+            Tuple[int, int]: 导入数量，跳过数量
+        """
+        if not rows:
+            return 0, 0
+
+        def minute_key(row) -> tuple:
+            return (row['recipient'], row['sender'], row['subject'],
+                    row['reception_time'].replace(second=0, microsecond=0))
+
+        with db.atomic():
+            accounts = {row['recipient'] for row in rows}
+            uids = {row['uid'] for row in rows if row.get('uid') is not None}
+            existing_uids = set()
+            if uids:
+                folders = {row['folder'] for row in rows if row.get('uid') is not None}
+                existing_uids = {
+                    (email.recipient, email.folder, email.uid)
+                    for email in EmailContent.select(EmailContent.recipient, EmailContent.folder, EmailContent.uid)
+                    .where(EmailContent.recipient.in_(accounts) & EmailContent.folder.in_(folders) &
+                           EmailContent.uid.in_(uids))
+                }
+            existing_minutes = set()
+            no_uid_rows = [row for row in rows if row.get('uid') is None]
+            if no_uid_rows:
+                since = min(row['reception_time'] for row in no_uid_rows).replace(second=0, microsecond=0)
+                until = max(row['reception_time'] for row in no_uid_rows).replace(second=59, microsecond=999999)
+                existing_minutes = {
+                    minute_key({'recipient': email.recipient, 'sender': email.sender, 'subject': email.subject,
+                                'reception_time': email.reception_time})
+                    for email in EmailContent.select(EmailContent.recipient, EmailContent.sender,
+                                                     EmailContent.subject, EmailContent.reception_time)
+                    .where(EmailContent.recipient.in_(accounts) &
+                           EmailContent.reception_time.between(since, until))
+                }
+
+            new_rows = []
+            for row in rows:
+                # 同一批中重复的记录也只导入一次
+                key = (row['recipient'], row['folder'], row['uid']) if row.get('uid') is not None else None
+                if key is not None:
+                    if key in existing_uids:
+                        continue
+                    existing_uids.add(key)
+                else:
+                    key = minute_key(row)
+                    if key in existing_minutes:
+                        continue
+                    existing_minutes.add(key)
+                new_rows.append(row)
+
+            imported = {(row['recipient'], row['folder'], row['uid']) for row in new_rows if row.get('uid') is not None}
+            new_attachments = [attachment for attachment in attachments
+                               if (attachment['account'], attachment['folder'], attachment['uid']) in imported]
+            # 分组插入，避免单条语句的参数数量超过SQLite上限
+            for group in chunked(new_rows, 100):
+                EmailContent.insert_many(group).execute()
+            for group in chunked(new_attachments, 100):
+                EmailAttachment.insert_many(group).on_conflict_ignore().execute()
+        return len(new_rows), len(rows) - len(new_rows)
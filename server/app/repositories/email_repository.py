@@ -5,7 +5,9 @@
 from typing import List, Optional
 from datetime import datetime
 from peewee import DoesNotExist
-from app.models.email_models import EmailConfig, EmailContent
+from app.models.email_models import db, EmailConfig, EmailContent
+from app.repositories.attachment_repository import AttachmentRepository
+from app.repositories.config_registry import config_registry
 
 
 class EmailServiceProviderRepository:
@@ -17,31 +19,41 @@ class EmailConfigRepository:
 
     @staticmethod
     def get_all() -> List[EmailConfig]:
-        """获取所有邮箱配置"""
-        return list(EmailConfig.select())
+        """获取所有邮箱配置（来自进程内缓存，返回的对象只读）"""
+        return config_registry.email_configs()
 
     @staticmethod
     def get_by_account(account: str) -> Optional[EmailConfig]:
-        """根据账户获取邮箱配置"""
-        try:
-            return EmailConfig.get(EmailConfig.account == account)
-        except DoesNotExist:
-            return None
+        """根据账户获取邮箱配置（来自进程内缓存，返回的对象只读）"""
+        return config_registry.email_config(account)
 
     @staticmethod
-    def create(account: str, auth_code: str, server: str, server_name: str, channel_id: int) -> Optional[EmailConfig]:
+    def create(account: str, auth_code: str, server: str, server_name: str, channel_id: int,
+               interval_minutes: int = None, jitter_seconds: int = None,
+               folders: str = None) -> Optional[EmailConfig]:
         """创建邮箱配置"""
-        return EmailConfig.create(
+        schedule_fields = {}
+        if interval_minutes is not None:
+            schedule_fields['interval_minutes'] = interval_minutes
+        if jitter_seconds is not None:
+            schedule_fields['jitter_seconds'] = jitter_seconds
+        if folders:
+            schedule_fields['folders'] = folders
+        config = EmailConfig.create(
             account=account,
             auth_code=auth_code,
             server=server,
             server_name=server_name,
-            channel_id=channel_id
+            channel_id=channel_id,
+            **schedule_fields
         )
+        config_registry.invalidate()
+        return config
 
     @staticmethod
-    def update(account: str, auth_code: str = None, server_name: str = None, channel_id: int = None) -> Optional[
-        EmailConfig]:
+    def update(account: str, auth_code: str = None, server_name: str = None, channel_id: int = None,
+               interval_minutes: int = None, jitter_seconds: int = None,
+               folders: str = None) -> Optional[EmailConfig]:
         """更新邮箱配置"""
         try:
             config = EmailConfig.get(EmailConfig.account == account)
@@ -51,8 +63,16 @@ class EmailConfigRepository:
                 config.server_name = server_name
             if channel_id is not None:
                 config.channel_id = channel_id
+            if interval_minutes is not None:
+                config.interval_minutes = interval_minutes
+            if jitter_seconds is not None:
+                config.jitter_seconds = jitter_seconds
+            if folders is not None:
+                # 清空文件夹列表时恢复为默认的INBOX
+                config.folders = folders or 'INBOX'
 
             config.save()
+            config_registry.invalidate()
             return config
         except DoesNotExist:
             return None
@@ -63,6 +83,7 @@ class EmailConfigRepository:
         try:
             config = EmailConfig.get(EmailConfig.account == account)
             config.delete_instance()
+            config_registry.invalidate()
             return True
         except DoesNotExist:
             return False
@@ -176,6 +197,42 @@ class EmailContentRepository:
             config_account=config_account
         )
 
+    @staticmethod
+    def find_duplicate(email: EmailContent) -> Optional[EmailContent]:
+        """查找同一账户下发件人、主题相同且收件时间在同一分钟内的邮件"""
+        return EmailContent.select().where(
+            (EmailContent.recipient == email.recipient) &
+            (EmailContent.sender == email.sender) &
+            (EmailContent.subject == email.subject) &
+            (EmailContent.reception_time.between(
+                email.reception_time.replace(second=0, microsecond=0),
+                email.reception_time.replace(second=59, microsecond=999999)
+            ))
+        ).first()
+
+    @staticmethod
+    def save_new_batch(emails: List[EmailContent]) -> List[bool]:
+        """
+        在一个事务中批量保存邮件，已存在的重复邮件跳过
+
+        Returns:
+            与emails一一对应，True表示为新邮件并已保存
+        """
+        saved = []
+        with db.atomic():
+            for email in emails:
+                if EmailContentRepository.find_duplicate(email):
+                    saved.append(False)
+                    continue
+                # 新邮件，保存到数据库（sent=False）
+                email.sent = False
+                email.save()
+                # 附件元数据（parse_message解析得到）与邮件在同一事务中保存
+                AttachmentRepository.save_many(email.recipient, email.folder, email.uid,
+                                               getattr(email, 'attachments', None))
+                saved.append(True)
+        return saved
+
     @staticmethod
     def update(email_id: int, is_read: bool = None) -> Optional[EmailContent]:
         """更新邮件内容"""
@@ -193,6 +250,7 @@ class EmailContentRepository:
         """删除邮件内容"""
         try:
             email = EmailContent.get(EmailContent.id == email_id)
+            AttachmentRepository.delete_for_email(email)
             email.delete_instance()
             return True
         except DoesNotExist:
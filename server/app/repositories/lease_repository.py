@@ -0,0 +1,77 @@
+"""
+工作进程心跳与邮箱账户租约数据访问层
+"""
+
+from datetime import datetime
+from typing import List
+
+from app.models.email_models import AccountLease, WorkerHeartbeat
+
+
+class LeaseRepository:
+    """租约数据访问类"""
+
+    @staticmethod
+    def heartbeat(worker_id: str, hostname: str, pid: int, started_at: datetime, now: datetime) -> None:
+        """写入（或更新）工作进程心跳"""
+        (WorkerHeartbeat
+         .insert(worker_id=worker_id, hostname=hostname, pid=pid, started_at=started_at, last_seen=now)
+         .on_conflict(conflict_target=[WorkerHeartbeat.worker_id],
+                      update={WorkerHeartbeat.last_seen: now})
+         .execute())
+
+    @staticmethod
+    def get_live_workers(since: datetime) -> List[str]:
+        """获取在指定时间之后有心跳的工作进程ID"""
+        query = (WorkerHeartbeat
+                 .select(WorkerHeartbeat.worker_id)
+                 .where(WorkerHeartbeat.last_seen >= since)
+                 .order_by(WorkerHeartbeat.worker_id))
+        return [row.worker_id for row in query]
+
+    @staticmethod
+    def prune_workers(before: datetime) -> int:
+        """删除心跳已过期的工作进程"""
+        return WorkerHeartbeat.delete().where(WorkerHeartbeat.last_seen < before).execute()
+
+    @staticmethod
+    def remove_worker(worker_id: str) -> None:
+        """删除工作进程心跳并释放其持有的全部租约"""
+        AccountLease.delete().where(AccountLease.worker_id == worker_id).execute()
+        WorkerHeartbeat.delete().where(WorkerHeartbeat.worker_id == worker_id).execute()
+
+    @staticmethod
+    def try_acquire(account: str, worker_id: str, now: datetime, expires_at: datetime) -> bool:
+        """
+        尝试获取或续期邮箱账户租约
+        租约不存在、已过期或已由本进程持有时成功
+
+        Returns:
+            bool: 是否持有租约
+        """
+        AccountLease.insert(account=account, worker_id=worker_id, expires_at=expires_at).on_conflict_ignore().execute()
+        updated = (AccountLease
+                   .update(worker_id=worker_id, expires_at=expires_at)
+                   .where((AccountLease.account == account) &
+                          ((AccountLease.worker_id == worker_id) | (AccountLease.expires_at < now)))
+                   .execute())
+        return updated > 0
+
+    @staticmethod
+    def release(account: str, worker_id: str) -> bool:
+        """释放本进程持有的邮箱账户租约"""
+        deleted = (AccountLease
+                   .delete()
+                   .where((AccountLease.account == account) & (AccountLease.worker_id == worker_id))
+                   .execute())
+        return deleted > 0
+
+    @staticmethod
+    def delete_account(account: str) -> None:
+        """删除邮箱账户的租约（邮箱配置被删除时调用）"""
+        AccountLease.delete().where(AccountLease.account == account).execute()
+
+    @staticmethod
+    def get_all() -> List[AccountLease]:
+        """获取所有租约"""
+        return list(AccountLease.select().order_by(AccountLease.account))
@@ -0,0 +1,63 @@
+"""
+邮箱文件夹状态快照数据访问层
+"""
+
+from datetime import datetime
+from typing import Dict, Optional
+
+from app.models.email_models import db, EmailAttachment, EmailContent, MailboxState
+
+
+class MailboxStateRepository:
+    """邮箱文件夹状态快照数据访问类"""
+
+    @staticmethod
+    def get_account(account: str) -> Dict[str, Dict[str, Optional[int]]]:
+        """获取邮箱账户全部文件夹的状态快照: 文件夹 -> 状态"""
+        query = MailboxState.select().where(MailboxState.account == account)
+        return {
+            state.folder: {
+                'uidvalidity': state.uidvalidity,
+                'uidnext': state.uidnext,
+                'messages': state.messages,
+                'highest_modseq': state.highest_modseq,
+            }
+            for state in query
+        }
+
+    @staticmethod
+    def save(account: str, folder: str, status: Dict[str, Optional[int]]) -> None:
+        """写入（或更新）文件夹状态快照"""
+        (MailboxState
+         .insert(account=account, folder=folder, uidvalidity=status['uidvalidity'],
+                 uidnext=status['uidnext'], messages=status['messages'],
+                 highest_modseq=status.get('highest_modseq'), updated_at=datetime.now())
+         .on_conflict_replace()
+         .execute())
+
+    @staticmethod
+    def delete_account(account: str) -> int:
+        """删除邮箱账户的全部文件夹状态快照"""
+        return MailboxState.delete().where(MailboxState.account == account).execute()
+
+    @staticmethod
+    def reset_folder(account: str, folder: str) -> int:
+        """
+        文件夹UIDVALIDITY变化后旧的UID全部失效：删除该文件夹的状态快照与附件元数据，
+        并清空已保存邮件的UID（之后按发件人、主题与收件时间去重），避免新邮件复用旧UID时关联到旧的附件
+
+        Returns:
+            int: 清空UID的邮件数
+        """
+        with db.atomic():
+            MailboxState.delete().where(
+                (MailboxState.account == account) & (MailboxState.folder == folder)
+            ).execute()
+            EmailAttachment.delete().where(
+                (EmailAttachment.account == account) & (EmailAttachment.folder == folder)
+            ).execute()
+            return EmailContent.update(uid=None).where(
+                (EmailContent.recipient == account) &
+                (EmailContent.folder == folder) &
+                (EmailContent.uid.is_null(False))
+            ).execute()
@@ -5,6 +5,7 @@
 from typing import List, Optional
 from peewee import DoesNotExist
 from app.models.email_models import NotificationChannel
+from app.repositories.config_registry import config_registry
 
 
 class NotificationChannelRepository:
@@ -12,16 +13,13 @@ class NotificationChannelRepository:
     
     @staticmethod
     def get_all() -> List[NotificationChannel]:
-        """获取所有通知渠道"""
-        return list(NotificationChannel.select())
+        """获取所有通知渠道（来自进程内缓存，返回的对象只读）"""
+        return config_registry.channels()
     
     @staticmethod
     def get_by_id(channel_id: int) -> Optional[NotificationChannel]:
-        """根据ID获取通知渠道"""
-        try:
-            return NotificationChannel.get(NotificationChannel.id == channel_id)
-        except DoesNotExist:
-            return None
+        """根据ID获取通知渠道（来自进程内缓存，返回的对象只读）"""
+        return config_registry.channel(channel_id)
     
     @staticmethod
     def get_by_name(name: str) -> List[NotificationChannel]:
@@ -31,12 +29,14 @@ class NotificationChannelRepository:
     @staticmethod
     def create(name: str, token: str, server_name: str, chat_id: str = None) -> Optional[NotificationChannel]:
         """创建通知渠道"""
-        return NotificationChannel.create(
+        channel = NotificationChannel.create(
             name=name,
             token=token,
             server_name=server_name,
             chat_id=chat_id
         )
+        config_registry.invalidate()
+        return channel
     
     @staticmethod
     def update(channel_id: int, name: str = None, token: str = None, 
@@ -53,6 +53,7 @@ class NotificationChannelRepository:
             if chat_id is not None:
                 channel.chat_id = chat_id
             channel.save()
+            config_registry.invalidate()
             return channel
         except DoesNotExist:
             return None
@@ -63,6 +64,7 @@ class NotificationChannelRepository:
         try:
             channel = NotificationChannel.get(NotificationChannel.id == channel_id)
             channel.delete_instance()
+            config_registry.invalidate()
             return True
         except DoesNotExist:
             return False
\ No newline at end of file
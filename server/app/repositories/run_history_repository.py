@@ -0,0 +1,80 @@
+"""
+邮箱账户处理历史数据访问层
+"""
+
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from peewee import fn
+
+from app.models.email_models import db, RunHistory
+
+# 各阶段耗时字段（毫秒）
+STAGE_FIELDS = ('connect_ms', 'fetch_ms', 'parse_ms', 'store_ms', 'notify_ms', 'retention_ms')
+
+
+class RunHistoryRepository:
+    """处理历史数据访问类"""
+
+    @staticmethod
+    def create(**fields: Any) -> RunHistory:
+        """保存一条处理历史"""
+        return RunHistory.create(**fields)
+
+    @staticmethod
+    def get_page(account: str = None, status: str = None, limit: int = 50,
+                 offset: int = 0) -> Tuple[List[RunHistory], int]:
+        """
+        分页获取处理历史（新的在前）
+
+        Returns:
+            Tuple[List[RunHistory], int]: 当前页记录与总数
+        """
+        query = RunHistory.select()
+        if account:
+            query = query.where(RunHistory.account == account)
+        if status:
+            query = query.where(RunHistory.status == status)
+        total = query.count()
+        rows = list(query.order_by(RunHistory.started_at.desc(), RunHistory.id.desc()).limit(limit).offset(offset))
+        return rows, total
+
+    @staticmethod
+    def get_timings(since: datetime, account: str = None) -> List[Dict[str, Any]]:
+        """获取时间范围内各次处理的状态与耗时（按开始时间排序），只查询统计需要的字段"""
+        fields = [RunHistory.account, RunHistory.server_name, RunHistory.started_at, RunHistory.status,
+                  RunHistory.duration_ms, RunHistory.new_emails] + [getattr(RunHistory, name) for name in STAGE_FIELDS]
+        query = RunHistory.select(*fields).where(RunHistory.started_at >= since)
+        if account:
+            query = query.where(RunHistory.account == account)
+        return list(query.order_by(RunHistory.started_at).dicts())
+
+    @staticmethod
+    def prune(before: datetime, max_per_account: int) -> int:
+        """
+        删除早于before的历史记录，并且每个账户只保留最新的max_per_account条
+
+        Returns:
+            int: 删除的记录数
+        """
+        with db.atomic():
+            deleted = RunHistory.delete().where(RunHistory.started_at < before).execute()
+            if max_per_account > 0:
+                over_limit = (RunHistory
+                              .select(RunHistory.account)
+                              .group_by(RunHistory.account)
+                              .having(fn.COUNT(RunHistory.id) > max_per_account)
+                              .tuples())
+                for (account,) in over_limit:
+                    boundary: Optional[RunHistory] = (RunHistory
+                                                      .select(RunHistory.id)
+                                                      .where(RunHistory.account == account)
+                                                      .order_by(RunHistory.id.desc())
+                                                      .offset(max_per_account)
+                                                      .first())
+                    if boundary:
+                        deleted += RunHistory.delete().where(
+                            (RunHistory.account == account) & (RunHistory.id <= boundary.id)
+                        ).execute()
+        return deleted
+
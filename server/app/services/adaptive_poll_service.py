@@ -0,0 +1,99 @@
+"""
+自适应轮询服务
+根据每个邮箱的新邮件到达率动态调整检查间隔：繁忙邮箱缩短间隔，空闲邮箱按指数退避，收到新邮件后重置
+"""
+
+import logging
+import time
+from typing import Dict, Any, Optional
+
+from app.models.email_models import EmailConfig
+from config import get_config
+
+logger = logging.getLogger(__name__)
+
+
+class PollState:
+    """单个邮箱账户的轮询状态"""
+
+    def __init__(self, interval_seconds: float, now: float):
+        self.interval_seconds = interval_seconds  # 当前检查间隔（秒）
+        self.arrival_rate = 0.0                   # 新邮件到达率（封/小时，指数加权平均）
+        self.last_check = now                     # 上一次检查时间
+        self.last_new_mail: Optional[float] = None  # 上一次收到新邮件的时间
+        self.idle_checks = 0                      # 连续无新邮件的检查次数
+
+
+class AdaptivePollService:
+    """自适应轮询服务类"""
+
+    def __init__(self):
+        self.config = get_config()
+        self._states: Dict[str, PollState] = {}
+
+    def _bounds(self, email_config: EmailConfig) -> tuple:
+        """获取检查间隔的基准值与上下限（秒）"""
+        base = max(1, int(email_config.interval_minutes or self.config.SCHEDULE_INTERVAL_MINUTES)) * 60
+        min_seconds = self.config.ADAPTIVE_POLL_MIN_SECONDS
+        max_seconds = max(self.config.ADAPTIVE_POLL_MAX_SECONDS, base)
+        return base, min_seconds, max_seconds
+
+    def next_interval(self, email_config: EmailConfig, new_emails: int, now: float = None) -> float:
+        """
+        根据本次检查结果计算下一次检查间隔
+
+        Args:
+            email_config: 邮箱配置对象
+            new_emails: 本次检查收到的新邮件数量
+            now: 当前时间戳，默认为time.time()
+
+        Returns:
+            下一次检查间隔（秒）
+        """
+        now = time.time() if now is None else now
+        base, min_seconds, max_seconds = self._bounds(email_config)
+
+        state = self._states.get(email_config.account)
+        if state is None:
+            state = PollState(base, now)
+            self._states[email_config.account] = state
+            elapsed = base
+        else:
+            elapsed = max(now - state.last_check, 1.0)
+        state.last_check = now
+
+        # 更新到达率（封/小时）
+        observed_rate = new_emails * 3600.0 / elapsed
+        alpha = self.config.ADAPTIVE_POLL_RATE_ALPHA
+        state.arrival_rate = alpha * observed_rate + (1 - alpha) * state.arrival_rate
+
+        if new_emails > 0:
+            # 收到新邮件：重置为基准间隔；到达率越高，间隔越短（约每个间隔一封）
+            state.last_new_mail = now
+            state.idle_checks = 0
+            interval = base
+            if state.arrival_rate > 0:
+                interval = min(interval, 3600.0 / state.arrival_rate)
+        else:
+            # 无新邮件：指数退避
+            state.idle_checks += 1
+            interval = state.interval_seconds * self.config.ADAPTIVE_POLL_BACKOFF_FACTOR
+
+        state.interval_seconds = min(max(interval, min_seconds), max_seconds)
+        return state.interval_seconds
+
+    def reset(self, account: str) -> None:
+        """清除邮箱账户的轮询状态（配置更新或删除时调用）"""
+        self._states.pop(account, None)
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """获取所有邮箱账户的轮询状态"""
+        return {
+            account: {
+                'interval_seconds': round(state.interval_seconds, 1),
+                'arrival_rate_per_hour': round(state.arrival_rate, 3),
+                'idle_checks': state.idle_checks,
+                'last_new_mail': state.last_new_mail,
+            }
+            for account, state in self._states.items()
+        }
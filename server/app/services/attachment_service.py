@@ -0,0 +1,128 @@
+"""
+附件服务
+附件内容不在收取邮件时下载：下载时按BODYSTRUCTURE记录的段号，用 BODY.PEEK[段号]<偏移.长度> 分块从IMAP收取，
+边收取边解码传输编码（base64 / quoted-printable）并输出，内存占用与附件大小无关
+"""
+
+import base64
+import logging
+import quopri
+from typing import Iterator, List
+
+from app.models.email_models import EmailAttachment, EmailConfig
+from app.services.email_service import EmailService
+from config import get_config
+
+logger = logging.getLogger(__name__)
+
+
+def format_size(size: int) -> str:
+    """字节数转为便于阅读的大小"""
+    for unit in ('B', 'KB', 'MB'):
+        if size < 1024:
+            return f"{size:.0f}{unit}" if unit == 'B' else f"{size:.1f}{unit}"
+        size /= 1024
+    return f"{size:.1f}GB"
+
+
+def format_attachments(attachments: List[EmailAttachment]) -> str:
+    """附件列表转为通知中的文本（以换行开头，接在正文之后），没有附件时为空字符串"""
+    if not attachments:
+        return ''
+    lines = [f"  {attachment.filename}（{attachment.content_type}，{format_size(attachment.size)}）"
+             for attachment in attachments]
+    return f"\n附件（{len(attachments)}）：\n" + "\n".join(lines)
+
+
+class _TransferDecoder:
+    """按块解码传输编码，块边界可以落在编码单元中间"""
+
+    def __init__(self, encoding: str):
+        self.encoding = encoding.lower()
+        self.pending = b''
+
+    def feed(self, data: bytes) -> bytes:
+        if self.encoding == 'base64':
+            data = self.pending + b''.join(data.split())
+            usable = len(data) - len(data) % 4
+            self.pending = data[usable:]
+            return base64.b64decode(data[:usable])
+        if self.encoding == 'quoted-printable':
+            # 只解码完整的行，最后一行可能未结束（软换行或 =XX 被截断）
+            data = self.pending + data
+            cut = data.rfind(b'\n') + 1
+            self.pending = data[cut:]
+            return quopri.decodestring(data[:cut])
+        return data
+
+    def flush(self) -> bytes:
+        pending, self.pending = self.pending, b''
+        if not pending:
+            return b''
+        if self.encoding == 'base64':
+            return base64.b64decode(pending + b'=' * (-len(pending) % 4))
+        if self.encoding == 'quoted-printable':
+            return quopri.decodestring(pending)
+        return pending
+
+
+class AttachmentService:
+    """附件下载服务类"""
+
+    def __init__(self, email_service: EmailService):
+        self.config = get_config()
+        self.email_service = email_service
+
+    def stream(self, email_config: EmailConfig, attachment: EmailAttachment) -> Iterator[bytes]:
+        """
+        连接IMAP并选择附件所在文件夹，返回分块收取并解码附件的迭代器
+        连接、登录失败时在调用时立即抛出异常；连接在迭代器内部建立，迭代结束、中断（客户端断开）
+        或迭代器未被使用就被回收时都会登出
+        
+        Args:
+            email_config: 附件所属邮箱的配置
+            attachment: 附件元数据
+            
+        Returns:
+            Iterator[bytes]: 解码后的附件内容块
+        """
+        chunks = self._iter_chunks(email_config, attachment)
+        # 先执行到连接并选择文件夹之后，此后迭代器关闭时都会登出
+        next(chunks)
+        return chunks
+
+    def _iter_chunks(self, email_config: EmailConfig, attachment: EmailAttachment) -> Iterator[bytes]:
+        chunk_bytes = max(1024, self.config.ATTACHMENT_STREAM_CHUNK_BYTES)
+        decoder = _TransferDecoder(attachment.encoding)
+        section = f'BODY[{attachment.part}]'
+        streamed = 0
+        offset = 0
+
+        client = self.email_service.connect(email_config)
+        with client:
+            client.select_folder(attachment.folder, readonly=True)
+            # 连接完成，由stream()取走
+            yield b''
+            while True:
+                data = client.fetch([attachment.uid], [f'BODY.PEEK[{attachment.part}]<{offset}.{chunk_bytes}>'])
+                item = data.get(attachment.uid)
+                if item is None:
+                    raise FileNotFoundError(f"邮件已不存在: {attachment.folder} UID {attachment.uid}")
+                chunk = item.get(f'{section}<{offset}>'.encode())
+                # 部分服务器对部分收取返回完整内容，此时已收取完毕
+                complete = chunk is None
+                if complete:
+                    chunk = item.get(section.encode()) or b''
+                decoded = decoder.feed(chunk)
+                if decoded:
+                    streamed += len(decoded)
+                    yield decoded
+                offset += len(chunk)
+                if complete or len(chunk) < chunk_bytes:
+                    break
+            tail = decoder.flush()
+            if tail:
+                streamed += len(tail)
+                yield tail
+
+        logger.info(f"附件下载完成: {attachment.filename}，{streamed} 字节，邮箱: {email_config.account}")
@@ -0,0 +1,173 @@
+"""
+鉴权服务
+访问密码保存在 data/.password 中：读取后缓存在内存，按文件修改时间判断是否需要重新读取（最多每
+AUTH_PASSWORD_CHECK_SECONDS 秒检查一次），密码比较使用常量时间比较。
+登录成功后签发带有效期的会话令牌（HMAC-SHA256签名），之后的请求只在内存中校验令牌；
+签名密钥由密码派生，修改密码后已签发的令牌全部失效，多个进程之间无需共享状态
+"""
+
+import hashlib
+import hmac
+import logging
+import os
+import secrets
+import string
+import time
+from typing import Optional, Tuple
+
+from config import get_config
+
+logger = logging.getLogger(__name__)
+
+# 令牌签名密钥的派生标签
+_TOKEN_KEY_LABEL = b'mailnotice-session-token'
+
+
+class AuthService:
+    """鉴权服务类"""
+
+    def __init__(self, password_file: str = None):
+        self.config = get_config()
+        self.password_file = password_file or os.path.join(
+            os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), 'data', '.password'
+        )
+        self._password = ''
+        self._token_key = b''
+        self._file_stamp: Optional[Tuple[int, int]] = None  # 已加载的密码文件 (修改时间, 大小)
+        self._checked_at: Optional[float] = None
+
+    def _stamp(self) -> Optional[Tuple[int, int]]:
+        """密码文件的 (修改时间, 大小)，文件不存在时为None"""
+        try:
+            stat = os.stat(self.password_file)
+        except FileNotFoundError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def _refresh(self) -> None:
+        """密码文件修改时间变化时重新读取，检查间隔内直接使用缓存"""
+        now = time.monotonic()
+        if self._checked_at is not None and now - self._checked_at < self.config.AUTH_PASSWORD_CHECK_SECONDS:
+            return
+        self._checked_at = now
+
+        try:
+            stamp = self._stamp()
+            if stamp is not None and stamp == self._file_stamp:
+                return
+
+            if stamp is None:
+                logger.info(f"密码文件不存在，将自动创建密码文件: {self.password_file}")
+                password = self._create_password_file()
+            else:
+                password = self._read_password_file()
+                if not password:
+                    logger.warning("密码文件存在但内容为空，将重新生成密码")
+                    password = self._create_password_file()
+            stamp = self._stamp()
+        except OSError as e:
+            logger.error(f"读取.password文件异常: {str(e)}")
+            return
+
+        if self._file_stamp is not None:
+            logger.info("密码文件已修改，重新加载密码，已签发的令牌失效")
+        self._password = password
+        self._token_key = hmac.new(password.encode('utf-8'), _TOKEN_KEY_LABEL, hashlib.sha256).digest() \
+            if password else b''
+        self._file_stamp = stamp
+
+    def load(self) -> None:
+        """立即加载密码（应用启动时调用，密码文件不存在时创建并在日志中输出生成的密码）"""
+        self._checked_at = None
+        self._refresh()
+
+    def _read_password_file(self) -> str:
+        try:
+            with open(self.password_file, 'r', encoding='utf-8') as f:
+                return f.read().strip()
+        except Exception as e:
+            logger.error(f"读取.password文件异常: {str(e)}")
+            return ''
+
+    def _create_password_file(self) -> str:
+        """
+        创建密码文件并生成随机密码
+        
+        Returns:
+            str: 生成的随机密码，创建失败时为空字符串
+        """
+        # 生成16位随机密码（包含字母、数字和特殊字符）
+        alphabet = string.ascii_letters + string.digits + "!@#$%^&*"
+        password = ''.join(secrets.choice(alphabet) for _ in range(16))
+
+        try:
+            # 确保目录存在
+            os.makedirs(os.path.dirname(self.password_file), exist_ok=True)
+
+            # 写入密码文件
+            with open(self.password_file, 'w', encoding='utf-8') as f:
+                f.write(password)
+
+            # 首次生成的密码只在日志中输出这一次
+            logger.info(f"生成的随机密码: {password}")
+            return password
+        except Exception as e:
+            logger.error(f"创建密码文件失败: {str(e)}")
+            return ''
+
+    def verify_password(self, password: Optional[str]) -> bool:
+        """
+        验证密码（常量时间比较）
+        
+        Args:
+            password: 密码字符串
+            
+        Returns:
+            bool: 验证是否通过
+        """
+        self._refresh()
+        # 存储的密码为空时，任何密码都不会验证通过
+        if not self._password or not password:
+            return False
+        return hmac.compare_digest(password.encode('utf-8'), self._password.encode('utf-8'))
+
+    def _sign(self, payload: str) -> str:
+        return hmac.new(self._token_key, payload.encode('ascii'), hashlib.sha256).hexdigest()
+
+    def issue_token(self) -> Tuple[str, int]:
+        """
+        签发会话令牌，格式为 过期时间戳.随机数.签名
+        
+        Returns:
+            Tuple[str, int]: 令牌，以及过期时间（Unix时间戳，秒）
+        """
+        self._refresh()
+        expires_at = int(time.time()) + self.config.AUTH_TOKEN_TTL_SECONDS
+        payload = f"{expires_at}.{secrets.token_hex(8)}"
+        return f"{payload}.{self._sign(payload)}", expires_at
+
+    def verify_token(self, token: Optional[str]) -> bool:
+        """
+        校验会话令牌的签名与有效期，只在内存中计算
+        
+        Args:
+            token: 会话令牌
+            
+        Returns:
+            bool: 令牌是否有效
+        """
+        # 签发的令牌只包含ASCII字符，其他令牌直接拒绝（签名计算与compare_digest只接受ASCII）
+        if not token or not token.isascii():
+            return False
+        self._refresh()
+        if not self._token_key:
+            return False
+        payload, _, signature = token.rpartition('.')
+        expires_at, _, _ = payload.partition('.')
+        if not expires_at.isdigit() or int(expires_at) < time.time():
+            return False
+        return hmac.compare_digest(signature, self._sign(payload))
+
+
+# 全局鉴权服务实例
+auth_service = AuthService()
@@ -0,0 +1,272 @@
+"""
+历史邮件回填服务
+按UID从新到旧分块导入邮箱文件夹中的全部历史邮件：每块在一个事务中批量插入并推进断点（next_uid），
+中断（暂停、进程重启、网络错误）后从断点继续；收取速度受邮件数与字节数两个上限限制。
+回填在独立的线程和IMAP连接上执行，不占用定时收取的线程与队列；导入的邮件标记为已发送，不推送通知，
+回填从定时收取的文件夹状态快照（UIDNEXT）之前开始，之后到达的新邮件仍由定时收取并推送通知
+"""
+
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+from imapclient import IMAPClient
+
+from app.models.email_models import BackfillJob, EmailConfig
+from app.repositories.backfill_repository import BackfillRepository
+from app.repositories.email_repository import EmailConfigRepository
+from app.repositories.mailbox_state_repository import MailboxStateRepository
+from app.services.email_service import EmailService, extract_body_text
+from config import get_config
+
+logger = logging.getLogger(__name__)
+
+
+class BackfillStopped(Exception):
+    """回填任务被暂停、取消、删除，或本进程不再负责该账户"""
+
+
+class _Throttle:
+    """按邮件数与字节数限制收取速度：实际耗时低于上限对应的耗时时休眠补足"""
+
+    def __init__(self, max_messages_per_second: float, max_bytes_per_second: float, stop_event: threading.Event):
+        self.max_messages_per_second = max_messages_per_second
+        self.max_bytes_per_second = max_bytes_per_second
+        self.stop_event = stop_event
+        self.started = time.monotonic()
+        self.messages = 0
+        self.bytes = 0
+
+    def consume(self, messages: int, size: int) -> None:
+        self.messages += messages
+        self.bytes += size
+        required = 0.0
+        if self.max_messages_per_second:
+            required = max(required, self.messages / self.max_messages_per_second)
+        if self.max_bytes_per_second:
+            required = max(required, self.bytes / self.max_bytes_per_second)
+        deficit = required - (time.monotonic() - self.started)
+        if deficit > 0:
+            # 停止时立即结束休眠
+            self.stop_event.wait(deficit)
+
+
+class BackfillService:
+    """历史邮件回填服务类"""
+
+    def __init__(self, email_service: EmailService):
+        self.config = get_config()
+        self.email_service = email_service
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._stop_event = threading.Event()
+        # 本进程正在执行的回填任务ID
+        self._running: Set[int] = set()
+        self._lock = threading.Lock()
+
+    def start(self) -> None:
+        """创建回填线程池"""
+        if self._executor is None:
+            self._stop_event.clear()
+            self._executor = ThreadPoolExecutor(max_workers=max(1, self.config.BACKFILL_WORKERS),
+                                                thread_name_prefix='mail-backfill')
+
+    def stop(self) -> None:
+        """停止回填：执行中的任务在当前块结束后退出，状态保持为running，下次启动时从断点继续"""
+        self._stop_event.set()
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def poll(self, owns: Callable[[str], bool]) -> int:
+        """
+        领取本进程负责账户的未结束回填任务并提交执行（定时调用）
+
+        Args:
+            owns: 判断本进程是否负责某个账户
+
+        Returns:
+            int: 本次提交执行的任务数
+        """
+        if self._executor is None:
+            return 0
+
+        submitted = 0
+        for job in BackfillRepository.get_active():
+            with self._lock:
+                if job.id in self._running or not owns(job.account):
+                    continue
+                self._running.add(job.id)
+            self._executor.submit(self._run_job, job.id, owns)
+            submitted += 1
+        return submitted
+
+    def _run_job(self, job_id: int, owns: Callable[[str], bool]) -> None:
+        try:
+            job = BackfillRepository.get_by_id(job_id)
+            if not job or job.status not in ('pending', 'running'):
+                return
+            email_config = EmailConfigRepository.get_by_account(job.account)
+            if not email_config:
+                BackfillRepository.update(job_id, status='failed', error='邮箱配置不存在')
+                return
+
+            BackfillRepository.set_status(job_id, 'running', from_statuses=('pending', 'running'))
+            self._backfill(job, email_config, owns)
+            BackfillRepository.set_status(job_id, 'completed', from_statuses=('running',))
+            logger.info(f"回填任务完成: #{job_id} {job.account}/{job.folder}")
+        except BackfillStopped as e:
+            logger.info(f"回填任务已停止: #{job_id}, 原因: {e}")
+        except Exception as e:
+            logger.error(f"回填任务失败: #{job_id}, 错误: {e}")
+            BackfillRepository.update(job_id, status='failed', error=str(e))
+        finally:
+            with self._lock:
+                self._running.discard(job_id)
+
+    def _check_continue(self, job: BackfillJob, owns: Callable[[str], bool]) -> None:
+        """每块开始前检查任务是否应继续（进程停止、状态被修改、租约转移）"""
+        if self._stop_event.is_set():
+            raise BackfillStopped('服务停止')
+        status = BackfillRepository.get_status(job.id)
+        if status != 'running':
+            raise BackfillStopped(f'任务状态为 {status}')
+        if not owns(job.account):
+            raise BackfillStopped('账户已由其他工作进程负责')
+
+    def _backfill(self, job: BackfillJob, email_config: EmailConfig, owns: Callable[[str], bool]) -> None:
+        chunk_size = max(1, self.config.BACKFILL_CHUNK_SIZE)
+        throttle = _Throttle(self.config.BACKFILL_MAX_MESSAGES_PER_SECOND,
+                             self.config.BACKFILL_MAX_BYTES_PER_SECOND, self._stop_event)
+
+        with self.email_service.connect(email_config) as client:
+            selected = client.select_folder(job.folder, readonly=True)
+            uidvalidity = int(selected.get(b'UIDVALIDITY', 0))
+            uidnext = int(selected.get(b'UIDNEXT', 0))
+            if job.uidvalidity != uidvalidity or job.next_uid is None:
+                # 首次执行或UIDVALIDITY变化（UID已失效）：从当前最大UID重新开始
+                live_state = MailboxStateRepository.get_account(job.account).get(job.folder)
+                if ((job.uidvalidity is not None and job.uidvalidity != uidvalidity) or
+                        (live_state and live_state['uidvalidity'] != uidvalidity)):
+                    logger.warning(f"回填任务 #{job.id} 的文件夹UIDVALIDITY已变化，从头开始: {job.folder}")
+                    # 清除旧UID关联的数据，定时收取随后按首次同步处理该文件夹
+                    MailboxStateRepository.reset_folder(job.account, job.folder)
+                    live_state = None
+                if not uidnext:
+                    uids = client.search(['ALL'])
+                    uidnext = (max(uids) + 1) if uids else 1
+                # 定时收取尚未同步到的新邮件留给定时收取（需要推送通知），回填只导入状态快照之前的邮件
+                if live_state and live_state['uidnext']:
+                    uidnext = min(uidnext, live_state['uidnext'])
+                job.uidvalidity = uidvalidity
+                job.next_uid = uidnext - 1
+                job.total = int(selected.get(b'EXISTS', 0))
+                BackfillRepository.update(job.id, uidvalidity=job.uidvalidity, next_uid=job.next_uid,
+                                          total=job.total, error=None)
+
+            logger.info(f"开始回填: #{job.id} {job.account}/{job.folder}，从UID {job.next_uid} 向前，共 {job.total} 封")
+            while job.next_uid > 0:
+                self._check_continue(job, owns)
+                low_uid = max(1, job.next_uid - chunk_size + 1)
+                high_uid = job.next_uid
+                rows, attachments, skipped, size = self._fetch_chunk(client, job, low_uid, high_uid, throttle)
+                BackfillRepository.save_chunk(job.id, rows, attachments, low_uid - 1, skipped, size)
+                job.next_uid = low_uid - 1
+                logger.debug(f"回填任务 #{job.id} 已导入UID {low_uid}:{high_uid}，新增 {len(rows)} 封，跳过 {skipped} 封")
+
+    def _fetch_chunk(self, client: IMAPClient, job: BackfillJob, low_uid: int, high_uid: int,
+                     throttle: _Throttle) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]], int, int]:
+        """
+        收取一个UID范围内尚未保存的邮件
+
+        Returns:
+            (邮件字段字典列表, 附件元数据字典列表, 已存在而跳过的邮件数, 收取的字节数)
+        """
+        uids = client.search(['UID', f'{low_uid}:{high_uid}'])
+        # "N:M" 中N超过最大UID时服务器可能返回最后一封，需要按范围过滤
+        uids = [uid for uid in uids if low_uid <= uid <= high_uid]
+        existing = BackfillRepository.existing_uids(job.account, job.folder, low_uid, high_uid)
+        missing = sorted((uid for uid in uids if uid not in existing), reverse=True)
+
+        max_raw_bytes = self.config.MAIL_MAX_RAW_BYTES
+        body_item = f'BODY.PEEK[]<0.{max_raw_bytes}>' if max_raw_bytes else 'BODY.PEEK[]'
+        batch_size = max(1, self.config.BACKFILL_FETCH_BATCH_SIZE)
+        items = ['ENVELOPE', 'RFC822.SIZE', body_item]
+        if self.config.MAIL_ATTACHMENT_INDEX_ENABLED:
+            items.append('BODYSTRUCTURE')
+
+        rows: List[Dict[str, Any]] = []
+        attachments: List[Dict[str, Any]] = []
+        fetched_bytes = 0
+        for start in range(0, len(missing), batch_size):
+            batch = missing[start:start + batch_size]
+            data = client.fetch(batch, items)
+            batch_bytes = 0
+            for uid in batch:
+                item = data.get(uid)
+                if not item:
+                    continue
+                raw_email = item.get(b'BODY[]<0>')
+                if raw_email is None:
+                    raw_email = item.get(b'BODY[]', b'')
+                batch_bytes += len(raw_email)
+                rows.append(self._build_row(job, uid, item, raw_email))
+                if b'BODYSTRUCTURE' in item:
+                    attachments.extend(dict(attachment, account=job.account, folder=job.folder, uid=uid)
+                                       for attachment in self.email_service.parse_attachments(item[b'BODYSTRUCTURE']))
+            fetched_bytes += batch_bytes
+            throttle.consume(len(batch), batch_bytes)
+            if self._stop_event.is_set():
+                raise BackfillStopped('服务停止')
+
+        rows = self._skip_saved_without_uid(job, rows)
+        imported = {row['uid'] for row in rows}
+        attachments = [attachment for attachment in attachments if attachment['uid'] in imported]
+        return rows, attachments, len(uids) - len(rows), fetched_bytes
+
+    @staticmethod
+    def _skip_saved_without_uid(job: BackfillJob, rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """去掉与没有UID的已保存邮件（发件人、主题相同且在同一分钟内）重复的邮件"""
+        if not rows:
+            return rows
+        times = [row['reception_time'] for row in rows]
+        existing = BackfillRepository.existing_minutes_without_uid(
+            job.account, min(times).replace(second=0, microsecond=0),
+            max(times).replace(second=59, microsecond=999999))
+        return [row for row in rows
+                if (row['sender'], row['subject'], row['reception_time'].replace(second=0, microsecond=0))
+                not in existing]
+
+    def _build_row(self, job: BackfillJob, uid: int, item: Dict[bytes, Any], raw_email: bytes) -> Dict[str, Any]:
+        sender, subject, reception_time = self.email_service.parse_envelope(item[b'ENVELOPE'])
+        body_text, truncated = '', False
+        if raw_email:
+            try:
+                body_text, truncated = extract_body_text(raw_email, self.config.MAIL_MAX_TEXT_BYTES,
+                                                         item.get(b'RFC822.SIZE', 0) > len(raw_email))
+            except Exception as e:
+                logger.warning(f"解析邮件正文失败 (UID: {uid}): {e}")
+        return {
+            'sender': sender,
+            'recipient': job.account,
+            'subject': subject,
+            'reception_time': reception_time,
+            'body_text': body_text,
+            'truncated': truncated,
+            'folder': job.folder,
+            'uid': uid,
+            # 历史邮件不推送通知
+            'sent': True,
+            'backfilled': True,
+        }
+
+    def is_running(self, job_id: int) -> bool:
+        """任务是否正在本进程中执行"""
+        return job_id in self._running
+
+    def snapshot(self) -> Dict[str, Any]:
+        """获取回填状态"""
+        return {
+            'running_jobs': sorted(self._running),
+        }
@@ -0,0 +1,188 @@
+"""
+服务商目录服务
+mail_server.json（邮箱服务商）与 notice_server.json（通知服务商）只在启动时读取一次，之后按文件的
+(修改时间, 大小) 判断是否变化（最多每 CATALOG_CHECK_SECONDS 秒检查一次）；变化时重新读取并校验，
+校验通过才整体替换为新版本，校验失败时保留旧版本并记录错误，读取方不会看到半新半旧的目录
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from config import get_config
+
+logger = logging.getLogger(__name__)
+
+# 目录文件所在目录（server/app）
+_APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class CatalogError(ValueError):
+    """目录文件格式或字段不合法"""
+
+
+def _without_nulls(entry: Dict[str, Any]) -> Dict[str, Any]:
+    """值为null的字段视为未填写，使用默认值"""
+    return {key: value for key, value in entry.items() if value is not None}
+
+
+def _check_type(entry: Dict[str, Any], key: str, types: tuple, type_name: str) -> None:
+    value = entry.get(key)
+    # bool是int的子类，数字字段不接受true/false
+    if value is not None and (not isinstance(value, types) or (bool not in types and isinstance(value, bool))):
+        raise CatalogError(f"服务商 {entry.get('name')} 的 {key} 必须是{type_name}")
+
+
+def validate_mail_server(entry: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    校验邮箱服务商配置并补充默认值
+
+    字段: name、imap（必填）；port（默认993）、ssl（默认true）、ssl_verify（是否校验证书，默认true）、
+    timeout（IMAP超时秒数，默认IMAP_TIMEOUT_SECONDS）、max_new_messages（每个文件夹每次最多收取的新邮件数，
+    默认MAIL_SYNC_MAX_NEW_MESSAGES）、imap_id（登录后是否发送ID命令，如126邮箱要求）；值为null的字段使用默认值
+    """
+    entry = _without_nulls(entry)
+    if not isinstance(entry.get('imap'), str) or not entry['imap'].strip():
+        raise CatalogError(f"服务商 {entry.get('name')} 缺少imap地址")
+    _check_type(entry, 'port', (int,), '整数')
+    _check_type(entry, 'ssl', (bool,), '布尔值')
+    _check_type(entry, 'ssl_verify', (bool,), '布尔值')
+    _check_type(entry, 'imap_id', (bool,), '布尔值')
+    _check_type(entry, 'timeout', (int, float), '数字')
+    _check_type(entry, 'max_new_messages', (int,), '整数')
+    port = entry.get('port', 993)
+    if not 1 <= port <= 65535:
+        raise CatalogError(f"服务商 {entry['name']} 的端口不合法: {port}")
+    for key in ('timeout', 'max_new_messages'):
+        if entry.get(key) is not None and entry[key] <= 0:
+            raise CatalogError(f"服务商 {entry['name']} 的 {key} 必须大于0")
+    return {
+        'port': 993,
+        'ssl': True,
+        'ssl_verify': True,
+        'imap_id': False,
+        **entry,
+        'imap': entry['imap'].strip(),
+    }
+
+
+def validate_notice_server(entry: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    校验通知服务商配置并补充默认值
+
+    字段: name、server（必填，推送地址）；timeout（请求超时秒数，默认5）；值为null的字段使用默认值
+    """
+    entry = _without_nulls(entry)
+    if not isinstance(entry.get('server'), str) or not entry['server'].strip():
+        raise CatalogError(f"服务商 {entry.get('name')} 缺少server地址")
+    _check_type(entry, 'timeout', (int, float), '数字')
+    if entry.get('timeout') is not None and entry['timeout'] <= 0:
+        raise CatalogError(f"服务商 {entry['name']} 的 timeout 必须大于0")
+    return {'timeout': 5.0, **entry}
+
+
+class Catalog:
+    """
+    单个服务商目录（JSON数组，每项以name为键）
+
+    Args:
+        path: 目录文件路径
+        validator: 单项校验函数，返回补充默认值后的配置，不合法时抛出CatalogError
+    """
+
+    def __init__(self, path: str, validator: Callable[[Dict[str, Any]], Dict[str, Any]]):
+        self.config = get_config()
+        self.path = path
+        self.validator = validator
+        self._lock = threading.Lock()
+        # 当前版本: (服务名 -> 配置, 服务名列表, ETag)，整体替换
+        self._snapshot: Tuple[Dict[str, Dict[str, Any]], List[str], str] = ({}, [], '')
+        self._file_stamp: Optional[Tuple[int, int]] = None
+        self._checked_at: Optional[float] = None
+        self.reloads = 0
+        self.errors = 0
+
+    def _parse(self, raw: bytes) -> Tuple[Dict[str, Dict[str, Any]], List[str], str]:
+        data = json.loads(raw.decode('utf-8'))
+        if not isinstance(data, list):
+            raise CatalogError("目录文件必须是JSON数组")
+        entries: Dict[str, Dict[str, Any]] = {}
+        for item in data:
+            if not isinstance(item, dict) or not isinstance(item.get('name'), str) or not item['name']:
+                raise CatalogError(f"目录项缺少name: {item}")
+            if item['name'] in entries:
+                raise CatalogError(f"服务商名称重复: {item['name']}")
+            entries[item['name']] = self.validator(item)
+        names = list(entries)
+        etag = '"' + hashlib.sha1(raw).hexdigest()[:16] + '"'
+        return entries, names, etag
+
+    def _refresh(self) -> None:
+        """文件变化时重新加载，检查间隔内直接使用当前版本"""
+        now = time.monotonic()
+        if self._checked_at is not None and now - self._checked_at < self.config.CATALOG_CHECK_SECONDS:
+            return
+
+        with self._lock:
+            if self._checked_at is not None and now - self._checked_at < self.config.CATALOG_CHECK_SECONDS:
+                return
+            self._checked_at = now
+            try:
+                stat = os.stat(self.path)
+            except OSError as e:
+                if self._file_stamp is None:
+                    self._file_stamp = (0, 0)
+                    self.errors += 1
+                    logger.error(f"读取服务商目录失败: {self.path}，错误: {e}")
+                return
+            stamp = (stat.st_mtime_ns, stat.st_size)
+            if stamp == self._file_stamp:
+                return
+            self._file_stamp = stamp
+
+            try:
+                with open(self.path, 'rb') as f:
+                    snapshot = self._parse(f.read())
+            except (OSError, ValueError, TypeError) as e:
+                # 保留当前版本，文件修复（再次修改）后重新加载
+                self.errors += 1
+                logger.error(f"服务商目录不合法，继续使用当前版本: {self.path}，错误: {e}")
+                return
+
+            first_load = self.reloads == 0
+            self._snapshot = snapshot
+            self.reloads += 1
+            if first_load:
+                logger.info(f"已加载服务商目录: {os.path.basename(self.path)}，共 {len(snapshot[1])} 项")
+            else:
+                logger.info(f"服务商目录已更新: {os.path.basename(self.path)}，共 {len(snapshot[1])} 项")
+
+    def get(self, name: str) -> Optional[Dict[str, Any]]:
+        """根据服务名获取配置"""
+        self._refresh()
+        return self._snapshot[0].get(name)
+
+    def names(self) -> Tuple[List[str], str]:
+        """
+        获取全部服务名及对应的ETag（目录内容的摘要）
+
+        Returns:
+            Tuple[List[str], str]: 服务名列表，ETag
+        """
+        self._refresh()
+        entries, names, etag = self._snapshot
+        return list(names), etag
+
+    def snapshot(self) -> Dict[str, Any]:
+        """目录状态（用于状态接口）"""
+        return {'entries': len(self._snapshot[1]), 'etag': self._snapshot[2],
+                'reloads': self.reloads, 'errors': self.errors}
+
+
+# 全局服务商目录
+mail_server_catalog = Catalog(os.path.join(_APP_DIR, 'mail_server.json'), validate_mail_server)
+notice_server_catalog = Catalog(os.path.join(_APP_DIR, 'notice_server.json'), validate_notice_server)
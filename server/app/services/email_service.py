@@ -2,18 +2,25 @@
 邮箱相关业务逻辑服务层
 """
 
-import email
-import json
 import logging
-import os
+import ssl
+import time
 from datetime import datetime
 from email.header import decode_header
-from typing import List, Optional, Dict
+from email.parser import BytesParser
+from typing import Any, Callable, List, Optional, Dict, Tuple
+from urllib.parse import unquote
 
 from imapclient import IMAPClient
 
 from app.models.email_models import EmailConfig, EmailContent
 from app.repositories.email_repository import EmailConfigRepository
+from app.repositories.mailbox_state_repository import MailboxStateRepository
+from app.services.catalog_service import mail_server_catalog
+from app.services.html_to_text import html_to_text
+from app.services.metrics_service import (BYTES_DOWNLOADED, IMAP_CONNECT_SECONDS, IMAP_ERRORS, IMAP_FETCH_SECONDS,
+                                          IMAP_LOGIN_SECONDS, MESSAGES_FETCHED)
+from config import get_config
 
 # 配置日志
 logging.basicConfig(
@@ -27,26 +34,17 @@ class EmailService:
     """邮箱业务服务类"""
 
     def __init__(self):
-        # 加载邮件服务器配置
-        self.server_configs = self._load_server_configs()
+        self.config = get_config()
+        # 额外的服务商配置（如本地测试服务器），优先于mail_server.json中的服务商目录
+        self.server_configs: Dict[str, Dict[str, Any]] = {}
 
-    def _load_server_configs(self) -> Dict[str, Dict[str, str]]:
-        """加载邮件服务器配置"""
-        config_path = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
-                                   'app', 'mail_server.json')
-        try:
-            with open(config_path, 'r', encoding='utf-8') as f:
-                servers = json.load(f)
-                # 转换为字典格式，方便根据服务名查找
-                return {server['name']: server for server in servers}
-        except Exception as e:
-            logger.error(f"加载邮件服务器配置失败: {e}")
-            return {}
-
-    def _get_server_config(self, server_name: str) -> Optional[Dict[str, str]]:
+    def _get_server_config(self, server_name: str) -> Optional[Dict[str, Any]]:
         """根据服务名获取服务器配置"""
         if server_name in self.server_configs:
             return self.server_configs[server_name]
+        server_config = mail_server_catalog.get(server_name)
+        if server_config:
+            return server_config
 
         # 如果没有找到，使用默认的IMAP服务器地址
         default_config = {
@@ -79,234 +77,510 @@ class EmailService:
             logger.error(f"解码邮件头失败: {e}")
             return header_value
 
-    def _extract_email_content(self, email_message) -> str:
+    @staticmethod
+    def _extract_email_content(email_message, max_text_bytes: int = 0) -> Tuple[str, bool]:
         """
-        提取邮件正文，去除CSS样式
+        提取邮件正文，HTML部分转换为纯文本
         
         Args:
             email_message: 邮件消息对象
+            max_text_bytes: 正文最大字节数（UTF-8），达到后停止提取，0表示不限制
             
         Returns:
-            str: 邮件正文文本（已去除CSS样式）
+            Tuple[str, bool]: 邮件正文文本，以及正文是否被截断
         """
-        body_text = ''
-
+        texts = []
+        text_bytes = 0
+
+        def append_text(text: str) -> bool:
+            """追加一段正文，达到上限时截断并返回False"""
+            nonlocal text_bytes
+            if not text:
+                return True
+            encoded_length = len(text.encode('utf-8'))
+            if max_text_bytes and text_bytes + encoded_length > max_text_bytes:
+                remaining = max_text_bytes - text_bytes
+                texts.append(text.encode('utf-8')[:remaining].decode('utf-8', errors='ignore'))
+                text_bytes = max_text_bytes
+                return False
+            texts.append(text)
+            text_bytes += encoded_length
+            return True
+
+        def part_text(part, content_type: str) -> str:
+            payload = part.get_payload(decode=True)
+            if not payload:
+                return ''
+            # 尝试解码
+            charset = part.get_content_charset() or 'utf-8'
+            try:
+                text = payload.decode(charset, errors='replace')
+            except LookupError:
+                text = payload.decode('utf-8', errors='replace')
+            if content_type == 'text/html':
+                # 提取HTML中的文本内容（去除标签、样式与脚本，解码实体）
+                return html_to_text(text)
+            return text
+
+        truncated = False
         try:
-            # 遍历邮件的各个部分
-            if email_message.is_multipart():
-                for part in email_message.walk():
-                    content_type = part.get_content_type()
-                    content_disposition = str(part.get('Content-Disposition', ''))
-
-                    # 跳过附件
-                    if 'attachment' in content_disposition:
-                        continue
-
-                    # 获取文本正文
-                    if content_type == 'text/plain' and 'attachment' not in content_disposition:
-                        try:
-                            payload = part.get_payload(decode=True)
-                            if payload:
-                                # 尝试解码
-                                charset = part.get_content_charset() or 'utf-8'
-                                body_text += payload.decode(charset, errors='replace')
-                        except Exception as e:
-                            logger.warning(f"提取文本正文失败: {e}")
-
-                    # 对于HTML邮件，提取纯文本内容并去除CSS
-                    elif content_type == 'text/html' and 'attachment' not in content_disposition:
-                        try:
-                            payload = part.get_payload(decode=True)
-                            if payload:
-                                # 尝试解码
-                                charset = part.get_content_charset() or 'utf-8'
-                                html_content = payload.decode(charset, errors='replace')
-                                # 去除CSS样式
-                                cleaned_html = self._remove_css_styles(html_content)
-                                # 提取HTML中的文本内容（去除标签）
-                                import re
-                                text_content = re.sub(r'<[^>]+>', ' ', cleaned_html)
-                                text_content = re.sub(r'\s+', ' ', text_content).strip()
-                                body_text += text_content
-                        except Exception as e:
-                            logger.warning(f"提取HTML正文失败: {e}")
-
-            else:
-                # 单部分邮件
-                content_type = email_message.get_content_type()
-                
-                if content_type == 'text/plain':
-                    try:
-                        payload = email_message.get_payload(decode=True)
-                        if payload:
-                            charset = email_message.get_content_charset() or 'utf-8'
-                            body_text = payload.decode(charset, errors='replace')
-                    except Exception as e:
-                        logger.warning(f"提取单部分文本正文失败: {e}")
-                
-                elif content_type == 'text/html':
-                    try:
-                        payload = email_message.get_payload(decode=True)
-                        if payload:
-                            charset = email_message.get_content_charset() or 'utf-8'
-                            html_content = payload.decode(charset, errors='replace')
-                            # 去除CSS样式
-                            cleaned_html = self._remove_css_styles(html_content)
-                            # 提取HTML中的文本内容（去除标签）
-                            import re
-                            text_content = re.sub(r'<[^>]+>', ' ', cleaned_html)
-                            text_content = re.sub(r'\s+', ' ', text_content).strip()
-                            body_text = text_content
-                    except Exception as e:
-                        logger.warning(f"提取单部分HTML正文失败: {e}")
+            # 遍历邮件的各个部分（单部分邮件只有自身）
+            for part in email_message.walk():
+                content_type = part.get_content_type()
+                if content_type not in ('text/plain', 'text/html'):
+                    continue
+
+                # 跳过附件
+                content_disposition = str(part.get('Content-Disposition', ''))
+                if 'attachment' in content_disposition:
+                    continue
+
+                try:
+                    text = part_text(part, content_type)
+                except Exception as e:
+                    logger.warning(f"提取{'HTML' if content_type == 'text/html' else '文本'}正文失败: {e}")
+                    continue
+
+                if not append_text(text):
+                    truncated = True
+                    break
 
         except Exception as e:
             logger.error(f"提取邮件内容失败: {e}")
 
-        return body_text
+        return ''.join(texts), truncated
     
-    def _remove_css_styles(self, html_content: str) -> str:
+    def parse_message(self, account: str, raw_message: Dict[str, Any],
+                      parsed: Optional[Tuple[str, bool]] = None) -> EmailContent:
         """
-        处理HTML内容，保留CSS样式但处理&nbsp;字符
+        将收取到的原始邮件解析为EmailContent对象
         
         Args:
-            html_content: 原始HTML内容
+            account: 邮箱账户
+            raw_message: fetch_raw_messages产出的原始邮件
+            parsed: 已在其他进程中提取好的（正文, 是否截断），为None时在当前线程解析
             
         Returns:
-            str: 处理后的HTML内容
+            EmailContent: 邮件内容对象（未保存）
         """
-        import re
-        
-        # 保留CSS样式，不进行删除
-        cleaned_html = html_content
-        
-        # 处理&nbsp;字符，替换为普通空格
-        cleaned_html = re.sub(r'&nbsp;?', ' ', cleaned_html, flags=re.IGNORECASE)
-        
-        # 处理其他HTML实体
-        cleaned_html = re.sub(r'&amp;?', '&', cleaned_html)
-        cleaned_html = re.sub(r'&lt;?', '<', cleaned_html)
-        cleaned_html = re.sub(r'&gt;?', '>', cleaned_html)
-        cleaned_html = re.sub(r'&quot;?', '"', cleaned_html)
-        
-        # 清理多余的空白字符，但保留HTML结构
-        cleaned_html = re.sub(r'\s+', ' ', cleaned_html)
-        cleaned_html = cleaned_html.strip()
-        cleaned_html = cleaned_html.strip()
+        raw_email = raw_message.get('raw')
+        if parsed is None:
+            parsed = ('', False)
+            if raw_email:
+                try:
+                    parsed = extract_body_text(raw_email, self.config.MAIL_MAX_TEXT_BYTES,
+                                               raw_message.get('raw_truncated', False))
+                except Exception as e:
+                    logger.warning(f"解析邮件正文失败 (ID: {raw_message.get('msg_id')}): {e}")
+        body_text, truncated = parsed
         
-        return cleaned_html
-
-    def fetch_emails(self, email_config: EmailConfig, get_body: bool = False, count: int = 5) -> List[EmailContent]:
+        email_content = EmailContent(
+            sender=raw_message['sender'],
+            recipient=account,
+            subject=raw_message['subject'],
+            reception_time=raw_message['reception_time'],
+            body_text=body_text,
+            folder=raw_message.get('folder', 'INBOX'),
+            uid=raw_message.get('uid'),
+            # 正文超过上限，或原始邮件在正文部分中间被截断
+            truncated=truncated
+        )
+        # 附件元数据（不是数据库字段），与邮件一起保存到附件表
+        email_content.attachments = raw_message.get('attachments', [])
+        return email_content
+
+    def connect(self, email_config: EmailConfig) -> IMAPClient:
         """
-        使用IMAP协议收取邮件
+        连接并登录邮箱的IMAP服务器
         
-        Args:
-            email_config: 邮箱配置对象
-            get_body: 是否获取邮件正文，默认为False
-            
         Returns:
-            List[EmailContent]: 邮件内容列表
+            IMAPClient: 已登录的客户端，可作为上下文管理器使用，退出时自动登出
         """
-        email_contents = []
-
+        # 获取服务器配置
+        server_config = self._get_server_config(email_config.server_name)
+        if not server_config:
+            raise ValueError(f"未找到服务器配置: {email_config.server_name}")
+
+        imap_server = server_config.get('imap', '')
+        if not imap_server:
+            raise ValueError(f"IMAP服务器地址为空: {email_config.server_name}")
+
+        # 端口、SSL与超时来自服务商目录，默认993/SSL
+        imap_port = int(server_config.get('port', 993))
+        use_ssl = bool(server_config.get('ssl', True))
+        ssl_context = None
+        if use_ssl and not server_config.get('ssl_verify', True):
+            ssl_context = ssl.create_default_context()
+            ssl_context.check_hostname = False
+            ssl_context.verify_mode = ssl.CERT_NONE
+        timeout = server_config.get('timeout') or self.config.IMAP_TIMEOUT_SECONDS
+
+        logger.info(f"连接IMAP服务器: {imap_server}:{imap_port}，邮箱: {email_config.account}")
+
+        # 连接IMAP服务器 - 添加SSL连接选项
+        provider = email_config.server_name
+        start = time.perf_counter()
         try:
-            # 获取服务器配置
-            server_config = self._get_server_config(email_config.server_name)
-            if not server_config:
-                logger.error(f"未找到服务器配置: {email_config.server_name}")
-                return email_contents
-
-            imap_server = server_config.get('imap', '')
-            if not imap_server:
-                logger.error(f"IMAP服务器地址为空: {email_config.server_name}")
-                return email_contents
-
-            logger.info(f"连接IMAP服务器: {imap_server}，邮箱: {email_config.account}，获取正文: {get_body}")
-
-            # 连接IMAP服务器 - 添加SSL连接选项
-            with IMAPClient(imap_server, port=993, ssl=True, ssl_context=None) as client:
-                # 登录邮箱
+            client = IMAPClient(imap_server, port=imap_port, ssl=use_ssl, ssl_context=ssl_context, timeout=timeout)
+        except Exception:
+            IMAP_ERRORS.inc(provider, 'connect')
+            raise
+        IMAP_CONNECT_SECONDS.observe(time.perf_counter() - start, provider)
+        try:
+            # 登录邮箱
+            with IMAP_LOGIN_SECONDS.time(provider):
                 client.login(email_config.account, email_config.auth_code)
 
-                if server_config.get('name') == "126":
+                # 部分服务商（如126）要求登录后发送ID命令
+                if server_config.get('imap_id'):
                     client.id_({"name": "MailNotice", "version": "1.0.0"})
-                logger.info(f"邮箱登录成功: {email_config.account}")
-
-                # 选择收件箱
-                client.select_folder('INBOX')
-                logger.info(f"选择收件箱成功: {email_config.account}")
-
-                # 搜索所有邮件
-                messages = client.search(['ALL'])
-                logger.info(f"找到邮件数量: {len(messages)}，邮箱: {email_config.account}")
-
-                # 只获取最近的5封邮件（避免一次性获取过多邮件）
-                recent_messages = messages[-count:] if len(messages) > count else messages
-
-                for msg_id in recent_messages:
-                    try:
-                        # 获取邮件头信息
-                        header_data = client.fetch([msg_id], ['ENVELOPE'])
-                        envelope = header_data[msg_id][b'ENVELOPE']
+        except Exception:
+            IMAP_ERRORS.inc(provider, 'login')
+            client.shutdown()
+            raise
+        logger.info(f"邮箱登录成功: {email_config.account}")
+        return client
+
+    def parse_envelope(self, envelope) -> Tuple[str, str, datetime]:
+        """从ENVELOPE中解析发件人、主题与接收时间"""
+        # 解析发件人
+        sender = ''
+        if envelope.from_:
+            sender = envelope.from_[0].mailbox.decode() + '@' + envelope.from_[0].host.decode()
+
+        # 解析主题
+        subject = self._decode_header_value(envelope.subject.decode() if envelope.subject else '')
+
+        # 解析接收时间
+        reception_time = datetime.now()
+        if envelope.date:
+            reception_time = envelope.date
+        return sender, subject, reception_time
+
+    def parse_attachments(self, bodystructure) -> List[Dict[str, Any]]:
+        """
+        从BODYSTRUCTURE中解析附件元数据（不收取附件内容）
+        带有attachment处置或文件名的非multipart段视为附件；message/rfc822段整体作为一个附件，不再展开
+        
+        Returns:
+            List[Dict[str, Any]]: 附件列表，包含part、filename、content_type、encoding、size
+        """
+        attachments: List[Dict[str, Any]] = []
+
+        def text(value) -> str:
+            return value.decode('utf-8', errors='replace') if isinstance(value, bytes) else (value or '')
+
+        def params(value) -> Dict[str, str]:
+            """参数列表 (key, value, key, value, ...) 转为字典，键为小写"""
+            if not isinstance(value, (list, tuple)):
+                return {}
+            return {text(value[i]).lower(): text(value[i + 1]) for i in range(0, len(value) - 1, 2)}
+
+        def filename_of(*param_dicts: Dict[str, str]) -> str:
+            for values in param_dicts:
+                value = values.get('filename*')
+                if value:
+                    # RFC 2231 编码的文件名，如 UTF-8''%E6%8A%A5%E5%91%8A.pdf
+                    charset, _, encoded = value.split("'", 2) if value.count("'") >= 2 else ('', '', value)
+                    return unquote(encoded, encoding=charset or 'utf-8', errors='replace')
+                for key in ('filename', 'name'):
+                    if values.get(key):
+                        return self._decode_header_value(values[key])
+            return ''
 
-                        # 解析发件人
-                        sender = ''
-                        if envelope.from_:
-                            sender = envelope.from_[0].mailbox.decode() + '@' + envelope.from_[0].host.decode()
+        def walk(structure, part: str) -> None:
+            if isinstance(structure[0], list):
+                # multipart: 子段编号为 前缀.1、前缀.2 ...
+                for index, child in enumerate(structure[0], start=1):
+                    walk(child, f'{part}.{index}' if part else str(index))
+                return
+
+            main_type, sub_type = text(structure[0]).lower(), text(structure[1]).lower()
+            content_type = f'{main_type}/{sub_type}'
+            # 扩展字段中的处置位置取决于段类型: 普通段8，text段9（多一个行数），message/rfc822段11
+            if main_type == 'text':
+                disposition_index = 9
+            elif content_type == 'message/rfc822':
+                disposition_index = 11
+            else:
+                disposition_index = 8
+            disposition = structure[disposition_index] if len(structure) > disposition_index else None
+            disposition_type, disposition_params = '', {}
+            if isinstance(disposition, (list, tuple)) and disposition:
+                disposition_type = text(disposition[0]).lower()
+                disposition_params = params(disposition[1]) if len(disposition) > 1 else {}
+
+            filename = filename_of(disposition_params, params(structure[2]))
+            if disposition_type != 'attachment' and not filename:
+                return
+            encoding = text(structure[5]).lower() or '7bit'
+            size = int(structure[6] or 0)
+            if encoding == 'base64':
+                # BODYSTRUCTURE中是编码后的大小，按每78字节一行（76个字符 + CRLF）解码为57字节估算原始大小
+                size = size * 57 // 78
+            attachments.append({
+                'part': part or '1',
+                'filename': (filename or f'part-{part or 1}')[:255],
+                'content_type': content_type,
+                'encoding': encoding,
+                'size': size,
+            })
 
-                        # 解析主题
-                        subject = self._decode_header_value(envelope.subject.decode() if envelope.subject else '')
+        try:
+            walk(bodystructure, '')
+        except Exception as e:
+            logger.warning(f"解析BODYSTRUCTURE失败: {e}")
+        return attachments
+
+    @staticmethod
+    def get_folders(email_config: EmailConfig) -> List[str]:
+        """获取邮箱配置中监控的文件夹列表，未配置时为INBOX"""
+        folders = [name.strip() for name in (email_config.folders or '').split(',') if name.strip()]
+        return folders or ['INBOX']
+
+    @staticmethod
+    def _folder_status(client: IMAPClient, folder: str, condstore: bool) -> Dict[str, Optional[int]]:
+        """使用STATUS命令获取文件夹状态（不需要SELECT），服务器支持CONDSTORE时同时获取HIGHESTMODSEQ"""
+        items = ['MESSAGES', 'UIDNEXT', 'UIDVALIDITY']
+        if condstore:
+            items.append('HIGHESTMODSEQ')
+        response = client.folder_status(folder, items)
+        highest_modseq = response.get(b'HIGHESTMODSEQ')
+        return {
+            'messages': int(response.get(b'MESSAGES', 0)),
+            'uidnext': int(response.get(b'UIDNEXT', 0)),
+            'uidvalidity': int(response.get(b'UIDVALIDITY', 0)),
+            'highest_modseq': int(highest_modseq) if highest_modseq is not None else None,
+        }
 
-                        # 解析接收时间
-                        reception_time = datetime.now()
-                        if envelope.date:
-                            reception_time = envelope.date
+    def _fetch_new_summaries(self, client: IMAPClient, folder: str, known: Optional[Dict[str, Optional[int]]],
+                             count: int, max_new: int) -> Tuple[Dict[int, Dict[bytes, Any]], Optional[int]]:
+        """
+        选择文件夹并获取需要收取的邮件的摘要: UID -> FETCH结果（ENVELOPE，启用附件索引时还有BODYSTRUCTURE）
+        首次同步或UIDVALIDITY变化时取最近count封；之后先用 UID SEARCH 找出上次UIDNEXT之后的新邮件UID，
+        只为其中最旧的max_new封收取摘要，其余留到下一次收取（积压的新邮件不会每次都重新传输）
 
-                        # 初始化正文
-                        body_text = ''
+        Returns:
+            Tuple[Dict[int, Dict[bytes, Any]], Optional[int]]: 邮件摘要，以及还有新邮件未收取时
+                本次应记录的UIDNEXT（最后一封已收取邮件的UID + 1），否则为None
+        """
+        client.select_folder(folder, readonly=True)
+        items = ['ENVELOPE', 'BODYSTRUCTURE'] if self.config.MAIL_ATTACHMENT_INDEX_ENABLED else ['ENVELOPE']
 
-                        # 如果要求获取正文
+        resume_uidnext = None
+        if not known or known['uidvalidity'] is None or known['uidnext'] is None:
+            uids = client.search(['ALL'])[-count:]
+        else:
+            # "N:*" 在没有新邮件时也会返回最后一封，需要按UID过滤
+            uids = sorted(uid for uid in client.search(['UID', f"{known['uidnext']}:*"])
+                          if uid >= known['uidnext'])
+            if len(uids) > max_new:
+                uids = uids[:max_new]
+                resume_uidnext = uids[-1] + 1
+
+        if not uids:
+            return {}, None
+        data = client.fetch(uids, items)
+        return {uid: data[uid] for uid in sorted(data)}, resume_uidnext
+
+    def _fetch_raw_body(self, client: IMAPClient, msg_id: int) -> Tuple[bytes, bool]:
+        """
+        收取原始邮件内容，超过 MAIL_MAX_RAW_BYTES 的邮件使用部分收取（BODY.PEEK[]<0.N>）
+        
+        Returns:
+            Tuple[bytes, bool]: 原始邮件内容，以及是否只收取了一部分
+        """
+        max_raw_bytes = self.config.MAIL_MAX_RAW_BYTES
+        if not max_raw_bytes:
+            full_data = client.fetch([msg_id], ['BODY.PEEK[]'])
+            return full_data[msg_id][b'BODY[]'], False
+
+        data = client.fetch([msg_id], ['RFC822.SIZE', f'BODY.PEEK[]<0.{max_raw_bytes}>'])[msg_id]
+        raw_email = data.get(b'BODY[]<0>')
+        if raw_email is None:
+            # 部分服务器对部分收取返回完整内容
+            raw_email = data.get(b'BODY[]', b'')
+        return raw_email, data.get(b'RFC822.SIZE', 0) > len(raw_email)
+
+    def fetch_raw_messages(self, email_config: EmailConfig, on_message: Callable[[Dict[str, Any]], None],
+                           get_body: bool = False, count: int = 5,
+                           known_states: Optional[Dict[str, Dict[str, Optional[int]]]] = None) -> Dict[str, Any]:
+        """
+        使用IMAP协议收取原始邮件，每收到一封即回调on_message，不在内存中累积
+        依次同步邮箱配置中的每个文件夹：SELECT之前先用STATUS获取文件夹状态，与上次的快照一致时跳过该文件夹；
+        有变化时只收取上次之后的新邮件（见_fetch_new_summaries）
+        附件只从BODYSTRUCTURE中记录元数据，附件内容不单独收取
+        连接或登录失败时抛出异常，单个文件夹或单封邮件处理失败时跳过；
+        收取失败的邮件不计入状态快照（UIDNEXT停在失败的UID），下一次重新收取
+        
+        Args:
+            email_config: 邮箱配置对象
+            on_message: 原始邮件回调，参数包含msg_id、folder、uid、sender、subject、reception_time、
+                raw（未获取正文时为None）、attachments（附件元数据）
+            get_body: 是否获取邮件正文，默认为False
+            count: 首次同步文件夹时获取最近的邮件数量
+            known_states: 上一次收取时各文件夹的状态快照: 文件夹 -> (messages、uidnext、uidvalidity、highest_modseq)
+            
+        Returns:
+            Dict[str, Any]: produced（产出的邮件数量）、unchanged（所有文件夹是否均无变化）、
+                statuses（本次同步成功的文件夹状态）、errors（同步失败的文件夹）、
+                connect_seconds（连接与登录耗时）
+        """
+        known_states = known_states or {}
+        folders = self.get_folders(email_config)
+        produced = 0
+        unchanged_folders = 0
+        statuses: Dict[str, Dict[str, Optional[int]]] = {}
+        errors: List[str] = []
+        server_config = self._get_server_config(email_config.server_name) or {}
+        max_new = server_config.get('max_new_messages') or self.config.MAIL_SYNC_MAX_NEW_MESSAGES
+        provider = email_config.server_name
+        connect_start = time.perf_counter()
+        with self.connect(email_config) as client:
+            connect_seconds = time.perf_counter() - connect_start
+            condstore = client.has_capability('CONDSTORE') or client.has_capability('QRESYNC')
+
+            for folder in folders:
+                try:
+                    with IMAP_FETCH_SECONDS.time(provider, 'summary'):
+                        # 获取文件夹状态，无变化时不再SELECT和收取邮件
+                        status = self._folder_status(client, folder, condstore)
+                        known = known_states.get(folder)
+                        if known and status == known:
+                            unchanged_folders += 1
+                            continue
+
+                        # UIDVALIDITY变化时UID全部失效，清除旧UID关联的数据并按首次同步处理
+                        if known and known['uidvalidity'] != status['uidvalidity']:
+                            logger.warning(f"文件夹 {folder} 的UIDVALIDITY已变化，重新同步，邮箱: {email_config.account}")
+                            MailboxStateRepository.reset_folder(email_config.account, folder)
+                            known = None
+                        summaries, resume_uidnext = self._fetch_new_summaries(client, folder, known, count, max_new)
+                        if resume_uidnext is not None:
+                            # 还有新邮件未收取：快照只推进到已收取的位置，MODSEQ保持上次的值，下一次继续收取其余邮件
+                            status = dict(status, uidnext=resume_uidnext, highest_modseq=known.get('highest_modseq'))
+                            logger.info(f"文件夹 {folder} 新邮件超过 {max_new} 封，其余留到下一次收取，"
+                                        f"邮箱: {email_config.account}")
+                    logger.info(f"文件夹 {folder} 需要收取 {len(summaries)} 封邮件，邮箱: {email_config.account}")
+                except IMAPClient.Error as e:
+                    IMAP_ERRORS.inc(provider, 'fetch')
+                    error_msg = f"同步文件夹失败: {folder}，错误: {e}"
+                    logger.error(f"{error_msg}，邮箱: {email_config.account}")
+                    errors.append(error_msg)
+                    continue
+
+                # 本文件夹中收取失败的最小UID，快照不越过它，下一次从这里重新收取（已保存的邮件按重复跳过）
+                failed_uid = None
+                for uid, summary in summaries.items():
+                    try:
+                        sender, subject, reception_time = self.parse_envelope(summary[b'ENVELOPE'])
+                        attachments = []
+                        if b'BODYSTRUCTURE' in summary:
+                            attachments = self.parse_attachments(summary[b'BODYSTRUCTURE'])
+
+                        # 如果要求获取正文，获取邮件内容（超大邮件只收取前 MAIL_MAX_RAW_BYTES 字节）
+                        raw_email = None
+                        raw_truncated = False
                         if get_body:
                             try:
-                                # 获取完整的邮件内容
-                                full_data = client.fetch([msg_id], ['BODY.PEEK[]'])
-                                raw_email = full_data[msg_id][b'BODY[]']
-                                
-                                # 解析邮件内容
-                                email_message = email.message_from_bytes(raw_email)
-                                
-                                # 提取正文
-                                body_text = self._extract_email_content(email_message)
-                                
-                                # 处理HTML实体字符
-                                body_text = self._remove_css_styles(body_text)
-                                
+                                with IMAP_FETCH_SECONDS.time(provider, 'body'):
+                                    raw_email, raw_truncated = self._fetch_raw_body(client, uid)
+                                BYTES_DOWNLOADED.inc(provider, amount=len(raw_email))
                             except Exception as e:
-                                logger.warning(f"获取邮件正文失败 (ID: {msg_id}): {e}")
-
-                        # 创建EmailContent对象
-                        email_content = EmailContent(
-                            sender=sender,
-                            recipient=email_config.account,
-                            subject=subject,
-                            reception_time=reception_time,
-                            body_text=body_text
-                        )
-
-                        email_contents.append(email_content)
+                                IMAP_ERRORS.inc(provider, 'fetch')
+                                logger.warning(f"获取邮件正文失败，下一次重新收取 (ID: {uid}): {e}")
+                                failed_uid = uid if failed_uid is None else min(failed_uid, uid)
+                                continue
 
                     except Exception as e:
-                        logger.error(f"处理邮件失败 (ID: {msg_id}): {e}")
+                        logger.error(f"处理邮件失败，下一次重新收取 (ID: {uid}): {e}")
+                        failed_uid = uid if failed_uid is None else min(failed_uid, uid)
                         continue
 
-                logger.info(f"成功获取邮件信息: {len(email_contents)}封，邮箱: {email_config.account}")
+                    on_message({
+                        'msg_id': uid,
+                        'folder': folder,
+                        'uid': uid,
+                        'sender': sender,
+                        'subject': subject,
+                        'reception_time': reception_time,
+                        'raw': raw_email,
+                        'raw_truncated': raw_truncated,
+                        'attachments': attachments
+                    })
+                    produced += 1
+                    MESSAGES_FETCHED.inc(provider)
+
+                if failed_uid is not None and (not status['uidnext'] or failed_uid < status['uidnext']):
+                    status = dict(status, uidnext=failed_uid,
+                                  highest_modseq=known.get('highest_modseq') if known else None)
+                statuses[folder] = status
+
+            if unchanged_folders == len(folders):
+                logger.info(f"所有文件夹均无变化，跳过收取: {email_config.account}")
+            else:
+                logger.info(f"成功获取邮件信息: {produced}封，邮箱: {email_config.account}")
+
+        return {
+            'produced': produced,
+            'unchanged': unchanged_folders == len(folders),
+            'statuses': statuses,
+            'errors': errors,
+            'connect_seconds': connect_seconds
+        }
 
+    def fetch_emails(self, email_config: EmailConfig, get_body: bool = False, count: int = 5) -> List[EmailContent]:
+        """
+        使用IMAP协议收取邮件
+        
+        Args:
+            email_config: 邮箱配置对象
+            get_body: 是否获取邮件正文，默认为False
+            
+        Returns:
+            List[EmailContent]: 邮件内容列表
+        """
+        email_contents = []
+
+        def on_message(raw_message: Dict[str, Any]) -> None:
+            email_contents.append(self.parse_message(email_config.account, raw_message))
+
+        try:
+            self.fetch_raw_messages(email_config, on_message, get_body=get_body, count=count)
         except Exception as e:
             logger.error(f"收取邮件失败: {email_config.account}，错误: {e}")
 
         return email_contents
 
 
+def extract_body_text(raw_email: bytes, max_text_bytes: int = 0, raw_truncated: bool = False) -> Tuple[str, bool]:
+    """
+    解析原始邮件并提取正文文本
+    模块级函数，只接收和返回可序列化的简单类型，可提交到解析进程池中执行
+    原始邮件（已按MAIL_MAX_RAW_BYTES限制大小）一次性解析为MIME树，正文达到max_text_bytes后停止提取
+    
+    Args:
+        raw_email: 原始邮件内容
+        max_text_bytes: 正文最大字节数，0表示不限制
+        raw_truncated: 原始邮件是否只收取了前一部分
+        
+    Returns:
+        Tuple[str, bool]: 邮件正文文本，以及正文是否被截断（正文达到上限，或原始邮件在正文部分中间被截断；
+            只截掉了后面的附件时不算截断）
+    """
+    # 解析邮件内容
+    email_message = BytesParser().parsebytes(raw_email)
+    
+    # 提取正文
+    body_text, truncated = EmailService._extract_email_content(email_message, max_text_bytes)
+    if raw_truncated and not truncated:
+        # MIME各部分按顺序排列，截断处位于最后一个叶子部分中：它是正文部分时正文不完整
+        last_part = list(email_message.walk())[-1]
+        truncated = (last_part.get_content_type() in ('text/plain', 'text/html') and
+                     'attachment' not in str(last_part.get('Content-Disposition', '')))
+    return body_text.strip(), truncated
+
+
 if __name__ == "__main__":
     """主函数，用于测试从数据库获取邮件配置并收取邮件"""
 
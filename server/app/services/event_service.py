@@ -0,0 +1,124 @@
+"""
+邮件事件广播服务
+进程内发布/订阅：保存新邮件、标记已通知、删除邮件时发布精简事件，由 /api/events 以SSE推送给网页。
+每个订阅者有一个有界队列，队列满（消费过慢）时丢弃该订阅者并发送overflow事件，由网页重新加载列表后重连，
+慢客户端不会拖慢发布方，也不会无限占用内存。
+事件只在本进程内广播：API与定时任务分进程部署（APP_ROLE=api）时，API进程只能推送本进程内的修改
+"""
+
+import asyncio
+import itertools
+import logging
+from typing import Any, Dict, Iterable, List, Optional
+
+from config import get_config
+
+logger = logging.getLogger(__name__)
+
+
+class Subscriber:
+    """单个订阅者（一个SSE连接）"""
+
+    def __init__(self, max_events: int):
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_events)
+        self.dropped = False
+
+
+class EventService:
+    """事件广播服务，发布与订阅都在事件循环上进行，其他线程发布时转到事件循环执行"""
+
+    def __init__(self):
+        self.config = get_config()
+        self._subscribers: List[Subscriber] = []
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._ids = itertools.count(1)
+        self.stats = {'published': 0, 'dropped_subscribers': 0}
+
+    def subscribe(self) -> Subscriber:
+        """添加订阅者（在事件循环上调用）"""
+        self._loop = asyncio.get_running_loop()
+        subscriber = Subscriber(self.config.EVENTS_QUEUE_SIZE)
+        self._subscribers.append(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber) -> None:
+        if subscriber in self._subscribers:
+            self._subscribers.remove(subscriber)
+
+    def publish(self, event_type: str, data: Dict[str, Any]) -> None:
+        """
+        发布事件，没有订阅者时直接返回
+
+        Args:
+            event_type: 事件类型，如 emails.created、emails.sent、emails.deleted
+            data: 事件内容（可被orjson序列化）
+        """
+        if not self._subscribers:
+            return
+        event = {'id': next(self._ids), 'type': event_type, 'data': data}
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is not self._loop:
+            # 在线程池等其他线程中发布
+            try:
+                self._loop.call_soon_threadsafe(self._dispatch, event)
+            except RuntimeError:
+                # 事件循环已关闭
+                pass
+            return
+        self._dispatch(event)
+
+    def _dispatch(self, event: Dict[str, Any]) -> None:
+        self.stats['published'] += 1
+        for subscriber in list(self._subscribers):
+            try:
+                subscriber.queue.put_nowait(event)
+            except asyncio.QueueFull:
+                self._drop(subscriber)
+
+    def _drop(self, subscriber: Subscriber) -> None:
+        """丢弃消费过慢的订阅者：清空其队列，只留下overflow事件，连接随后关闭"""
+        self.unsubscribe(subscriber)
+        subscriber.dropped = True
+        while not subscriber.queue.empty():
+            subscriber.queue.get_nowait()
+        subscriber.queue.put_nowait({'id': next(self._ids), 'type': 'overflow', 'data': {}})
+        self.stats['dropped_subscribers'] += 1
+        logger.warning("事件订阅者消费过慢，已断开")
+
+    def publish_created(self, emails: Iterable) -> None:
+        """发布新邮件事件（不含正文）"""
+        summaries = [
+            {
+                'id': email.id,
+                'recipient': email.recipient,
+                'sender': email.sender,
+                'subject': email.subject,
+                'reception_time': email.reception_time,
+                'sent': email.sent,
+                'truncated': email.truncated,
+            }
+            for email in emails
+        ]
+        if summaries:
+            self.publish('emails.created', {'emails': summaries})
+
+    def publish_sent(self, email_ids: List[int]) -> None:
+        """发布邮件已通知事件"""
+        if email_ids:
+            self.publish('emails.sent', {'ids': email_ids})
+
+    def publish_deleted(self, email_ids: List[int]) -> None:
+        """发布邮件已删除事件"""
+        if email_ids:
+            self.publish('emails.deleted', {'ids': email_ids})
+
+    def snapshot(self) -> Dict[str, Any]:
+        """事件广播状态（用于状态接口）"""
+        return {'subscribers': len(self._subscribers), **self.stats}
+
+
+# 全局事件广播服务
+event_service = EventService()
@@ -0,0 +1,110 @@
+"""
+HTML转纯文本
+整个转换由少量整体的正则替换完成，不在Python中逐个标记循环：
+先去掉注释、声明与head/style/script等不可见内容，再把块级元素、<br>、表格单元格替换为换行标记或空格并去掉其余标签，
+然后解码HTML实体、合并连续空白，最后把换行标记合并为换行（段落之间保留一个空行）
+"""
+
+import html
+import re
+
+# 内容不可见、需要整体丢弃的元素
+_SKIP_TAGS = ('head', 'style', 'script', 'title', 'noscript', 'template', 'svg', 'object')
+
+# 块级元素：开始和结束处换行
+_BLOCK_TAGS = frozenset({
+    'address', 'article', 'aside', 'blockquote', 'center', 'dd', 'div', 'dl', 'dt', 'fieldset',
+    'figcaption', 'figure', 'footer', 'form', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'header', 'hr',
+    'li', 'main', 'nav', 'ol', 'p', 'pre', 'section', 'table', 'tbody', 'thead', 'tfoot', 'tr', 'ul',
+})
+
+# 段落级元素：前后保留一个空行
+_PARAGRAPH_TAGS = frozenset({'p', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'blockquote', 'table', 'ul', 'ol', 'pre'})
+
+# 表格单元格之间用空格分隔
+_CELL_TAGS = frozenset({'td', 'th'})
+
+# 换行标记（Unicode私用区字符，不会出现在正常文本中），合并空白后再转换为换行
+_LINE_MARK, _PARAGRAPH_MARK = '\ue000', '\ue001'
+
+# 标签的属性部分（属性值中可以包含">"）
+_ATTRIBUTES = r'[^>"\']*(?:(?:"[^"]*"|\'[^\']*\')[^>"\']*)*'
+
+# 注释、声明/处理指令与不可见元素（含内容）；head缺少</head>时以<body>开始为准，
+# 自闭合的不可见元素只去掉标签本身，其他缺少结束标签的不可见元素丢弃到末尾
+_SKIP_NAMES = '|'.join(_SKIP_TAGS)
+_INVISIBLE_RE = re.compile(
+    r'<!--.*?(?:-->|\Z)'
+    r'|<[!?][^>]*>'
+    r'|<head(?=[\s/>])' + _ATTRIBUTES + r'>.*?(?:</head\s*>|(?=<body[\s>]))'
+    r'|<(?:' + _SKIP_NAMES + r')(?=[\s/>])' + _ATTRIBUTES + r'(?<=/)>'
+    r'|<(' + _SKIP_NAMES + r')(?=[\s/>])' + _ATTRIBUTES + r'>.*?(?:</\1\s*>|\Z)',
+    re.S | re.I
+)
+
+# 其余的开始或结束标签
+_TAG_RE = re.compile(r'</?([a-zA-Z][a-zA-Z0-9:-]*)' + _ATTRIBUTES + '>')
+
+# 标签的替换内容：块级元素与<br>为换行标记，单元格为空格，其他（行内）标签直接去掉
+_TAG_REPLACEMENTS = {tag: _PARAGRAPH_MARK if tag in _PARAGRAPH_TAGS else _LINE_MARK for tag in _BLOCK_TAGS}
+_TAG_REPLACEMENTS.update({tag: ' ' for tag in _CELL_TAGS})
+_TAG_REPLACEMENTS['br'] = _LINE_MARK
+
+# HTML实体（与html.unescape的匹配规则相同）
+_ENTITY_RE = re.compile(r'&(#[0-9]+;?|#[xX][0-9a-fA-F]+;?|[^\t\n\f <&#;]{1,32};?)')
+# 其余常见实体直接查表
+_COMMON_ENTITIES = {'&amp;': '&', '&#39;': "'", '&apos;': "'"}
+
+# 最常见、解码结果不含"&"的实体先用str.replace替换，减少逐个实体的回调
+_PLAIN_ENTITIES = (('&nbsp;', '\xa0'), ('&lt;', '<'), ('&gt;', '>'), ('&quot;', '"'))
+
+_WHITESPACE_RE = re.compile(r'[ \t\r\n\f\v\u00a0\u200b]+')
+
+# 连续的换行标记（空白已合并为单个空格）
+_BREAK_RE = re.compile(' ?[\ue000\ue001][\ue000\ue001 ]*')
+
+
+def _replace_tag(match: re.Match) -> str:
+    tag = match.group(1)
+    replacement = _TAG_REPLACEMENTS.get(tag)
+    if replacement is None:
+        replacement = _TAG_REPLACEMENTS.get(tag.lower(), '')
+    return replacement
+
+
+def _replace_entity(match: re.Match) -> str:
+    entity = match.group()
+    replacement = _COMMON_ENTITIES.get(entity)
+    if replacement is None:
+        replacement = html.unescape(entity)
+    return replacement
+
+
+def _replace_break(match: re.Match) -> str:
+    return '\n\n' if _PARAGRAPH_MARK in match.group() else '\n'
+
+
+def html_to_text(html_content: str) -> str:
+    """
+    将HTML转换为纯文本
+
+    Args:
+        html_content: HTML内容
+
+    Returns:
+        str: 纯文本，段落之间以空行分隔
+    """
+    if not html_content:
+        return ''
+
+    text = _INVISIBLE_RE.sub('', html_content)
+    text = _TAG_RE.sub(_replace_tag, text)
+    # 先去掉标签再解码实体，正文中的"&lt;p&gt;"不会被当作标签
+    if '&' in text:
+        for entity, replacement in _PLAIN_ENTITIES:
+            text = text.replace(entity, replacement)
+        if '&' in text:
+            text = _ENTITY_RE.sub(_replace_entity, text)
+    text = _WHITESPACE_RE.sub(' ', text)
+    text = _BREAK_RE.sub(_replace_break, text)
+    return text.strip(' \n')
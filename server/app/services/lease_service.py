@@ -0,0 +1,152 @@
+"""
+租约服务
+多进程/多副本部署时，通过共享数据库中的租约表在工作进程之间分配邮箱账户，
+保证每个账户每次只由一个工作进程收取和推送
+"""
+
+import hashlib
+import logging
+import os
+import socket
+import uuid
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional
+
+from app.repositories.email_repository import EmailConfigRepository
+from app.repositories.lease_repository import LeaseRepository
+from config import get_config
+
+logger = logging.getLogger(__name__)
+
+
+def _utcnow() -> datetime:
+    """租约统一使用UTC时间，避免不同节点时区不一致"""
+    return datetime.utcnow()
+
+
+def _rendezvous_score(worker_id: str, account: str) -> int:
+    """最高随机权重（rendezvous）哈希，工作进程增减时只有少量账户迁移"""
+    digest = hashlib.md5(f"{worker_id}|{account}".encode('utf-8')).digest()
+    return int.from_bytes(digest[:8], 'big')
+
+
+class LeaseService:
+    """
+    租约服务类
+
+    Args:
+        is_busy: 判断本进程是否正在处理该账户的函数；正在处理的账户即使已不归属本进程，
+            也继续续期租约，处理结束后的下一次心跳再释放，避免新的归属进程同时处理同一账户
+    """
+
+    def __init__(self, is_busy: Optional[Callable[[str], bool]] = None):
+        self.config = get_config()
+        self.is_busy = is_busy or (lambda account: False)
+        self.enabled = self.config.LEASE_ENABLED
+        self.hostname = socket.gethostname()
+        self.pid = os.getpid()
+        self.worker_id = f"{self.hostname}:{self.pid}:{uuid.uuid4().hex[:8]}"
+        self.started_at = _utcnow()
+        self.live_workers: List[str] = [self.worker_id]
+        # 本进程持有的租约: 账户 -> 过期时间
+        self._owned: Dict[str, datetime] = {}
+
+    def _ttl(self) -> timedelta:
+        return timedelta(seconds=self.config.LEASE_TTL_SECONDS)
+
+    def assigned_worker(self, account: str) -> str:
+        """按当前存活的工作进程计算账户应归属的工作进程"""
+        return max(self.live_workers, key=lambda worker_id: _rendezvous_score(worker_id, account))
+
+    def _acquire(self, account: str, now: datetime) -> bool:
+        expires_at = now + self._ttl()
+        if LeaseRepository.try_acquire(account, self.worker_id, now, expires_at):
+            self._owned[account] = expires_at
+            return True
+        self._owned.pop(account, None)
+        return False
+
+    def heartbeat(self) -> None:
+        """
+        心跳：刷新本进程存活状态，按存活工作进程重新分配账户，
+        续期归属本进程的租约，释放不再归属本进程的租约（正在处理的账户延后到处理结束后释放）
+        """
+        if not self.enabled:
+            return
+
+        now = _utcnow()
+        try:
+            LeaseRepository.heartbeat(self.worker_id, self.hostname, self.pid, self.started_at, now)
+            live_workers = LeaseRepository.get_live_workers(now - self._ttl())
+            self.live_workers = live_workers or [self.worker_id]
+
+            accounts = [config.account for config in EmailConfigRepository.get_all()]
+            acquired, released = 0, 0
+            for account in accounts:
+                if self.assigned_worker(account) == self.worker_id:
+                    if self._acquire(account, now):
+                        acquired += 1
+                elif account in self._owned:
+                    if self.is_busy(account):
+                        # 本进程仍在处理该账户：续期租约，下一次心跳再释放
+                        self._acquire(account, now)
+                        continue
+                    LeaseRepository.release(account, self.worker_id)
+                    self._owned.pop(account, None)
+                    released += 1
+
+            # 清理已不存在的账户
+            for account in set(self._owned) - set(accounts):
+                self._owned.pop(account, None)
+
+            LeaseRepository.prune_workers(now - self._ttl() * 4)
+            logger.debug(f"租约心跳: 工作进程 {len(self.live_workers)} 个，持有 {acquired} 个账户，释放 {released} 个账户")
+        except Exception as e:
+            logger.error(f"租约心跳失败: {e}")
+
+    def owns(self, account: str) -> bool:
+        """
+        判断本进程当前是否负责处理该邮箱账户
+        归属本进程但尚未持有租约时（如新添加的账户）会立即尝试获取
+        """
+        if not self.enabled:
+            return True
+
+        # 已不归属本进程的账户不再开始新的处理（租约可能因处理未结束仍由本进程持有）
+        if self.assigned_worker(account) != self.worker_id:
+            return False
+        now = _utcnow()
+        expires_at = self._owned.get(account)
+        if expires_at and expires_at > now:
+            return True
+        try:
+            return self._acquire(account, now)
+        except Exception as e:
+            logger.error(f"获取邮箱账户租约失败: {account}, 错误: {e}")
+            return False
+
+    def release_account(self, account: str) -> None:
+        """删除邮箱账户的租约（邮箱配置被删除时调用）"""
+        self._owned.pop(account, None)
+        if self.enabled:
+            LeaseRepository.delete_account(account)
+
+    def stop(self) -> None:
+        """进程退出时释放全部租约并注销心跳，让其他工作进程立即接管"""
+        if not self.enabled:
+            return
+        try:
+            LeaseRepository.remove_worker(self.worker_id)
+            self._owned.clear()
+            logger.info(f"工作进程 {self.worker_id} 已释放全部租约")
+        except Exception as e:
+            logger.error(f"释放租约失败: {e}")
+
+    def snapshot(self) -> Dict[str, object]:
+        """获取租约状态"""
+        return {
+            'enabled': self.enabled,
+            'worker_id': self.worker_id,
+            'live_workers': list(self.live_workers),
+            'owned_accounts': sorted(self._owned),
+        }
@@ -0,0 +1,160 @@
+"""
+手动执行任务服务
+手动执行（全部账户或单个账户）作为后台任务在定时任务的事件循环上运行，提交后立即返回任务ID，
+HTTP请求不再等待整个收取流程完成。同一时刻只有一个手动执行任务，重复提交返回进行中的任务；
+各账户的进度可按任务ID轮询，也会以 runs.progress 事件通过 /api/events 推送
+"""
+
+import asyncio
+import itertools
+import logging
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from app.models.email_models import EmailConfig
+from app.services.event_service import event_service
+from app.services.run_history_service import run_status
+from config import get_config
+
+logger = logging.getLogger(__name__)
+
+# 执行全量任务的函数: (邮箱配置列表, 单个账户结束时的回调) -> 处理结果列表
+RunFunction = Callable[[List[EmailConfig], Callable[[str, Dict[str, Any]], None]], Awaitable[List[Dict[str, Any]]]]
+
+
+class ManualRunJob:
+    """一次手动执行任务"""
+
+    def __init__(self, job_id: int, accounts: List[str], account: Optional[str]):
+        self.id = job_id
+        self.account = account               # 只执行单个账户时为该账户，全部账户时为None
+        self.status = 'running'              # running/completed/failed
+        self.created_at = datetime.now()
+        self.finished_at: Optional[datetime] = None
+        self.error: Optional[str] = None
+        # 各账户进度: 账户 -> {status: running/success/error/timeout/skipped, result: 处理结果}
+        self.accounts: Dict[str, Dict[str, Any]] = {
+            name: {'status': 'running', 'result': None} for name in accounts
+        }
+        self.task: Optional[asyncio.Task] = None
+
+    @property
+    def done(self) -> bool:
+        return self.status != 'running'
+
+    def to_dict(self, include_results: bool = True) -> Dict[str, Any]:
+        """任务状态，include_results为False时不包含各账户的处理结果"""
+        finished = [state for state in self.accounts.values() if state['status'] != 'running']
+        results = [state['result'] for state in finished]
+        data = {
+            'id': self.id,
+            'account': self.account,
+            'status': self.status,
+            'created_at': self.created_at,
+            'finished_at': self.finished_at,
+            'error': self.error,
+            'total': len(self.accounts),
+            'finished': len(finished),
+            'new_emails': sum(result.get('new_emails', 0) for result in results),
+            'notifications_sent': sum(result.get('notifications_sent', 0) for result in results),
+            'errors': sum(len(result.get('errors', [])) for result in results),
+        }
+        data['accounts'] = [
+            {'account': name, 'status': state['status'],
+             **({'result': state['result']} if include_results else {})}
+            for name, state in self.accounts.items()
+        ]
+        return data
+
+
+class ManualRunService:
+    """
+    手动执行任务服务
+
+    Args:
+        run_function: 执行全量任务的函数（ScheduleService.run_scheduled_task）
+    """
+
+    def __init__(self, run_function: RunFunction):
+        self.config = get_config()
+        self.run_function = run_function
+        self._jobs: 'OrderedDict[int, ManualRunJob]' = OrderedDict()
+        self._ids = itertools.count(1)
+        self._active: Optional[ManualRunJob] = None
+
+    def submit(self, email_configs: List[EmailConfig], account: str = None) -> Tuple[ManualRunJob, bool]:
+        """
+        提交手动执行任务（在事件循环上调用），已有进行中的任务时直接返回该任务
+
+        Args:
+            email_configs: 要处理的邮箱配置
+            account: 只执行单个账户时为该账户
+
+        Returns:
+            Tuple[ManualRunJob, bool]: 任务与是否新创建
+        """
+        if self._active is not None and not self._active.done:
+            return self._active, False
+
+        job = ManualRunJob(next(self._ids), [config.account for config in email_configs], account)
+        self._jobs[job.id] = job
+        while len(self._jobs) > self.config.MANUAL_RUN_JOBS_KEEP:
+            self._jobs.popitem(last=False)
+        self._active = job
+        job.task = asyncio.get_running_loop().create_task(self._run(job, email_configs))
+        logger.info(f"已提交手动执行任务 {job.id}: {account or '全部账户'}，共 {len(email_configs)} 个邮箱")
+        return job, True
+
+    async def _run(self, job: ManualRunJob, email_configs: List[EmailConfig]) -> None:
+        try:
+            await self.run_function(email_configs, lambda name, result: self._on_result(job, name, result))
+            job.status = 'completed'
+        except asyncio.CancelledError:
+            job.status = 'failed'
+            job.error = '任务已取消'
+            raise
+        except Exception as e:
+            logger.error(f"手动执行任务 {job.id} 失败: {e}")
+            job.status = 'failed'
+            job.error = str(e)
+        finally:
+            job.finished_at = datetime.now()
+            for state in job.accounts.values():
+                if state['status'] == 'running':
+                    state['status'] = 'error'
+                    state['result'] = {'errors': [job.error or '未完成']}
+            self._publish(job)
+            logger.info(f"手动执行任务 {job.id} 结束: {job.status}")
+
+    def _on_result(self, job: ManualRunJob, account: str, result: Dict[str, Any]) -> None:
+        """单个账户处理结束：更新进度并推送事件"""
+        state = job.accounts.get(account)
+        if state is None:
+            return
+        state['status'] = 'skipped' if result.get('skipped') else run_status(result)
+        state['result'] = result
+        self._publish(job)
+
+    @staticmethod
+    def _publish(job: ManualRunJob) -> None:
+        event_service.publish('runs.progress', job.to_dict(include_results=False))
+
+    def get(self, job_id: int) -> Optional[ManualRunJob]:
+        return self._jobs.get(job_id)
+
+    def list(self) -> List[ManualRunJob]:
+        """最近的手动执行任务（新的在前）"""
+        return list(reversed(self._jobs.values()))
+
+    @property
+    def active(self) -> Optional[ManualRunJob]:
+        """进行中的任务"""
+        if self._active is not None and not self._active.done:
+            return self._active
+        return None
+
+    def snapshot(self) -> Dict[str, Any]:
+        """手动执行任务状态（用于状态接口）"""
+        active = self.active
+        return {'active_job': active.id if active else None, 'jobs': len(self._jobs)}
@@ -0,0 +1,201 @@
+"""
+运行指标服务
+进程内的计数器、直方图与按需计算的仪表，由 /metrics 以Prometheus文本格式输出。
+记录一次指标只是加锁后累加几个数（无锁竞争时约1微秒），不做IO，可以放在收取、解析、数据库等热点路径上；
+仪表（如队列深度）只在抓取时计算。指标只统计本进程，API与工作进程分开部署时分别抓取（见 WORKER_METRICS_PORT）
+"""
+
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Sequence, Tuple
+
+# Prometheus文本格式的媒体类型
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# 默认的耗时分桶（秒）
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+# 数据库查询的耗时分桶（秒）
+DB_BUCKETS = (0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+# 调度延迟与账户任务耗时的分桶（秒）
+SCHEDULE_BUCKETS = (0.1, 0.5, 1.0, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 600.0)
+
+LabelValues = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = '') -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return '{' + ','.join(parts) + '}' if parts else ''
+
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+class Counter:
+    """只增不减的计数器，按标签值分别计数"""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[LabelValues, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def collect(self) -> List[str]:
+        with self._lock:
+            values = list(self._values.items())
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} counter']
+        for labels, value in values:
+            lines.append(f'{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}')
+        return lines
+
+
+class Histogram:
+    """直方图：按标签值分别统计各分桶的次数、总和与总次数"""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        # 标签值 -> [各分桶次数（不累计）..., 超出最大分桶的次数, 总和]
+        self._values: Dict[LabelValues, List[float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labels: str) -> None:
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts = self._values.get(labels)
+            if counts is None:
+                counts = self._values[labels] = [0] * (len(self.buckets) + 2)
+            counts[index] += 1
+            counts[-1] += value
+
+    @contextmanager
+    def time(self, *labels: str) -> Iterator[None]:
+        """统计代码块的耗时（异常时同样记录）"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, *labels)
+
+    def collect(self) -> List[str]:
+        with self._lock:
+            values = [(labels, list(counts)) for labels, counts in self._values.items()]
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} histogram']
+        for labels, counts in values:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), counts[:-1]):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f'{self.name}_bucket{_format_labels(self.labelnames, labels, le)} {cumulative}')
+            label_text = _format_labels(self.labelnames, labels)
+            lines.append(f'{self.name}_sum{label_text} {_format_value(counts[-1])}')
+            lines.append(f'{self.name}_count{label_text} {cumulative}')
+        return lines
+
+
+class Gauge:
+    """仪表：抓取时调用回调函数取值，回调返回 {标签值元组: 数值}"""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str],
+                 callback: Callable[[], Dict[LabelValues, float]]):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.callback = callback
+
+    def collect(self) -> List[str]:
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} gauge']
+        for labels, value in self.callback().items():
+            lines.append(f'{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}')
+        return lines
+
+
+class MetricsRegistry:
+    """指标注册表"""
+
+    def __init__(self):
+        self._metrics: Dict[str, object] = {}
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str],
+              callback: Callable[[], Dict[LabelValues, float]]) -> Gauge:
+        """注册仪表，同名仪表重复注册时替换回调（如服务重新创建）"""
+        gauge = Gauge(name, documentation, labelnames, callback)
+        self._metrics[name] = gauge
+        return gauge
+
+    def _register(self, metric):
+        if metric.name in self._metrics:
+            raise ValueError(f"指标重复注册: {metric.name}")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        """输出Prometheus文本格式（0.0.4）"""
+        lines: List[str] = []
+        for metric in list(self._metrics.values()):
+            lines.extend(metric.collect())
+        return '\n'.join(lines) + '\n'
+
+
+# 全局指标注册表与各模块使用的指标
+registry = MetricsRegistry()
+
+IMAP_CONNECT_SECONDS = registry.histogram(
+    'mailnotice_imap_connect_seconds', 'IMAP连接（含TLS握手）耗时', ['provider'])
+IMAP_LOGIN_SECONDS = registry.histogram(
+    'mailnotice_imap_login_seconds', 'IMAP登录耗时', ['provider'])
+IMAP_FETCH_SECONDS = registry.histogram(
+    'mailnotice_imap_fetch_seconds', 'IMAP收取命令耗时（summary: 文件夹同步与摘要，body: 单封正文）',
+    ['provider', 'kind'])
+IMAP_ERRORS = registry.counter(
+    'mailnotice_imap_errors_total', 'IMAP错误次数', ['provider', 'stage'])
+MESSAGES_FETCHED = registry.counter(
+    'mailnotice_messages_fetched_total', '收取的邮件数', ['provider'])
+BYTES_DOWNLOADED = registry.counter(
+    'mailnotice_bytes_downloaded_total', '收取的原始邮件字节数', ['provider'])
+PARSE_SECONDS = registry.histogram(
+    'mailnotice_parse_seconds', '邮件解析耗时（thread: 解析线程池，process: 解析进程池）', ['mode'])
+MESSAGES_STORED = registry.counter(
+    'mailnotice_messages_stored_total', '保存的新邮件数')
+DEDUP_HITS = registry.counter(
+    'mailnotice_dedup_hits_total', '因已存在而跳过的重复邮件数')
+DB_QUERY_SECONDS = registry.histogram(
+    'mailnotice_db_query_seconds', '数据库语句耗时', ['statement'], DB_BUCKETS)
+NOTIFICATION_SECONDS = registry.histogram(
+    'mailnotice_notification_seconds', '通知发送耗时（按服务商与结果）', ['provider', 'status'])
+SCHEDULE_LAG_SECONDS = registry.histogram(
+    'mailnotice_schedule_lag_seconds', '定时任务实际执行时间与计划时间的差', buckets=SCHEDULE_BUCKETS)
+RUNS_SKIPPED = registry.counter(
+    'mailnotice_runs_skipped_total', '跳过的账户任务次数（busy: 上一次执行尚未完成，missed: 错过执行时间已合并）',
+    ['reason'])
+RUNS_OVERRUN = registry.counter(
+    'mailnotice_runs_overrun_total', '超出账户时间预算被取消的账户任务次数')
+RUNS_UNCHANGED = registry.counter(
+    'mailnotice_runs_unchanged_total', '所有文件夹均无变化、跳过收取的账户任务次数')
+ACCOUNT_RUN_SECONDS = registry.histogram(
+    'mailnotice_account_run_seconds', '单个账户一次处理（收取到通知）的耗时', ['outcome'], SCHEDULE_BUCKETS)
@@ -1,13 +1,71 @@
-from typing import Dict, Any, Coroutine
+import time
+from contextlib import asynccontextmanager
+from typing import Dict, Any, Coroutine, AsyncIterator, Optional
 import httpx
-import json
-import os
+import logging
 from telegram import Bot
 
+from app.services.catalog_service import notice_server_catalog
+from app.services.metrics_service import NOTIFICATION_SECONDS
+
+logger = logging.getLogger(__name__)
+
 
 class NotificationService:
     """通知服务类"""
 
+    # 长生命周期资源，在应用lifespan中创建，所有通知共享
+    _http_client: Optional[httpx.AsyncClient] = None
+    _telegram_bots: Dict[str, Bot] = {}
+
+    @staticmethod
+    async def startup() -> None:
+        """创建共享的HTTP客户端（应用启动时调用）"""
+        if NotificationService._http_client is None:
+            NotificationService._http_client = httpx.AsyncClient(
+                timeout=5.0,
+                limits=httpx.Limits(max_connections=20, max_keepalive_connections=10)
+            )
+            logger.info("通知服务共享HTTP客户端已创建")
+
+    @staticmethod
+    async def shutdown() -> None:
+        """关闭共享的HTTP客户端与Telegram Bot（应用关闭时调用）"""
+        bots = list(NotificationService._telegram_bots.values())
+        NotificationService._telegram_bots = {}
+        for bot in bots:
+            try:
+                await bot.shutdown()
+            except Exception as e:
+                logger.warning(f"关闭Telegram Bot失败: {e}")
+
+        if NotificationService._http_client is not None:
+            await NotificationService._http_client.aclose()
+            NotificationService._http_client = None
+            logger.info("通知服务共享HTTP客户端已关闭")
+
+    @staticmethod
+    @asynccontextmanager
+    async def _client() -> AsyncIterator[httpx.AsyncClient]:
+        """获取HTTP客户端：优先使用共享客户端，未启动时（如命令行运行）临时创建"""
+        if NotificationService._http_client is not None:
+            yield NotificationService._http_client
+        else:
+            async with httpx.AsyncClient() as client:
+                yield client
+
+    @staticmethod
+    async def _get_telegram_bot(token: str) -> Bot:
+        """获取已初始化的Telegram Bot，按token复用"""
+        bot = NotificationService._telegram_bots.get(token)
+        if bot is None:
+            bot = Bot(token=token)
+            await bot.initialize()
+            # 仅在共享资源已启动时缓存，否则由调用方负责关闭
+            if NotificationService._http_client is not None:
+                NotificationService._telegram_bots[token] = bot
+        return bot
+
     @staticmethod
     async def send(name: str, key: str, content: str, msg: str, group_id: str = None, chat_id: str = None) -> Dict[str, Any]:
         """
@@ -34,32 +92,28 @@ class NotificationService:
 
         # 根据不同的name执行不同的发送逻辑
         if name == "传息":
-            return await NotificationService._send_chuanxi(server_config, key, content, msg, group_id)
+            send = NotificationService._send_chuanxi(server_config, key, content, msg, group_id)
         elif name == "企业微信":
-            return await NotificationService._send_wechat_work(server_config, key, content, msg)
+            send = NotificationService._send_wechat_work(server_config, key, content, msg)
         elif name == "Telegram":
-            return await NotificationService._send_telegram(server_config, key, content, msg, chat_id)
+            send = NotificationService._send_telegram(server_config, key, content, msg, chat_id)
         else:
             raise Exception(f"暂时不支持 '{name}' 的通知服务商配置")
 
-    @staticmethod
-    async def _get_server_config(name: str) -> Any | None:
-        """从notice_server.json获取服务器配置"""
+        # 按服务商与结果（success/failure/error）统计发送耗时
+        start = time.perf_counter()
+        status = 'error'
         try:
-            # 获取notice_server.json文件路径
-            current_dir = os.path.dirname(os.path.abspath(__file__))
-            server_file = os.path.join(current_dir, "..", "notice_server.json")
+            result = await send
+            status = 'success' if result and result.get('success', False) else 'failure'
+            return result
+        finally:
+            NOTIFICATION_SECONDS.observe(time.perf_counter() - start, name, status)
 
-            with open(server_file, 'r', encoding='utf-8') as f:
-                servers = json.load(f)
-
-            for server in servers:
-                if server.get('name') == name:
-                    return server
-
-            return None
-        except Exception as e:
-            raise Exception(f"读取通知服务商配置失败: {str(e)}")
+    @staticmethod
+    async def _get_server_config(name: str) -> Any | None:
+        """从通知服务商目录（notice_server.json）获取服务器配置"""
+        return notice_server_catalog.get(name)
 
     @staticmethod
     async def _send_chuanxi(server_config: Dict[str, str], key: str, content: str, msg: str, group_id: str = None) -> \
@@ -78,11 +132,11 @@ class NotificationService:
         if group_id:
             payload["group_id"] = group_id
 
-        async with httpx.AsyncClient() as client:
+        async with NotificationService._client() as client:
             response = await client.post(
                 server_url,
                 json=payload,
-                timeout=5
+                timeout=server_config['timeout']
             )
 
             if response.status_code == 200:
@@ -105,11 +159,11 @@ class NotificationService:
             }
         }
 
-        async with httpx.AsyncClient() as client:
+        async with NotificationService._client() as client:
             response = await client.post(
                 full_url,
                 json=payload,
-                timeout=5.0
+                timeout=server_config['timeout']
             )
 
             if response.status_code == 200:
@@ -139,13 +193,17 @@ class NotificationService:
                     "message": "Telegram Bot Token不能为空"
                 }
             
-            # 使用python-telegram-bot发送消息
-            bot = Bot(token=bot_token)
-            async with bot:
+            # 使用python-telegram-bot发送消息，Bot按token复用
+            bot = await NotificationService._get_telegram_bot(bot_token)
+            try:
                 await bot.send_message(
                     text=msg,
-                    chat_id=chat_id
+                    chat_id=chat_id,
+                    read_timeout=server_config['timeout']
                 )
+            finally:
+                if bot_token not in NotificationService._telegram_bots:
+                    await bot.shutdown()
             
             return {
                 "success": True,
@@ -170,11 +228,11 @@ class NotificationService:
             "channel": server_config.get('name')
         }
 
-        async with httpx.AsyncClient() as client:
+        async with NotificationService._client() as client:
             response = await client.post(
                 server_url,
                 json=payload,
-                timeout=5.0
+                timeout=server_config['timeout']
             )
 
             if response.status_code == 200:
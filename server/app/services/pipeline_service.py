@@ -0,0 +1,422 @@
+"""
+邮件处理流水线
+将收取 → 解析 → 保存 → 通知拆分为独立的阶段，阶段之间通过有界队列连接：
+IMAP收取线程把原始邮件放入原始队列，解析工作者把原始邮件解析为邮件记录，
+批量写入工作者在一个事务中保存一批记录，账户的全部邮件保存完成后进入通知队列
+队列写满时上游阶段会阻塞等待（背压），内存占用不随邮箱规模增长
+"""
+
+import asyncio
+import concurrent.futures
+import logging
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from app.models.email_models import EmailConfig, EmailContent
+from app.repositories.email_repository import EmailContentRepository
+from app.repositories.mailbox_state_repository import MailboxStateRepository
+from app.services.email_service import EmailService, extract_body_text
+from app.services.event_service import event_service
+from app.services.metrics_service import DEDUP_HITS, MESSAGES_STORED, PARSE_SECONDS, RUNS_UNCHANGED
+from config import get_config
+
+logger = logging.getLogger(__name__)
+
+
+class PipelineCancelled(Exception):
+    """账户任务已取消或流水线已停止，用于中断IMAP收取线程"""
+
+
+class AccountRun:
+    """单个邮箱账户的一次处理"""
+
+    def __init__(self, email_config: EmailConfig, future: asyncio.Future):
+        self.email_config = email_config
+        self.future = future                 # 通知阶段完成后设置结果
+        self.pending = 0                     # 已进入流水线但尚未保存完成的邮件数量
+        self.fetch_done = False              # 收取阶段是否结束
+        self.completed = False               # 是否已进入通知阶段
+        self.cancelled = False               # 是否已取消（如超出账户时间预算）
+        self.notify_task: Optional[asyncio.Task] = None
+        self.mailbox_statuses: Dict[str, Dict[str, Optional[int]]] = {}  # 本次同步成功的文件夹状态
+        self.store_failed = False            # 是否有邮件解析或保存失败
+        # 各阶段耗时（秒）: connect、fetch为收取线程中的实际耗时，parse、store为该账户邮件的解析、保存耗时合计，
+        # notify、retention由通知阶段处理函数记录
+        self.timings: Dict[str, float] = {'connect': 0.0, 'fetch': 0.0, 'parse': 0.0, 'store': 0.0,
+                                          'notify': 0.0, 'retention': 0.0}
+        self.result: Dict[str, Any] = {
+            'account': email_config.account,
+            'server_name': email_config.server_name,
+            'total_emails': 0,
+            'new_emails': 0,
+            'deleted_old_emails': 0,
+            'notifications_sent': 0,
+            'errors': []
+        }
+
+
+class MailPipeline:
+    """
+    邮件处理流水线
+
+    Args:
+        email_service: 邮箱服务，提供原始邮件收取与解析
+        notify_handler: 通知阶段处理函数，账户的全部邮件保存完成后调用
+    """
+
+    def __init__(self, email_service: EmailService, notify_handler: Callable[[AccountRun], Awaitable[None]]):
+        self.config = get_config()
+        self.email_service = email_service
+        self.notify_handler = notify_handler
+        self.is_running = False
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._tasks: List[asyncio.Task] = []
+        self._runs: Dict[int, AccountRun] = {}
+        self.raw_queue: Optional[asyncio.Queue] = None
+        self.record_queue: Optional[asyncio.Queue] = None
+        self.notify_queue: Optional[asyncio.Queue] = None
+        # IMAP收取使用阻塞的IMAPClient，解析为CPU密集操作，数据库写入需要串行，分别使用独立线程池
+        self.fetch_executor: Optional[ThreadPoolExecutor] = None
+        self.parse_executor: Optional[ThreadPoolExecutor] = None
+        self.write_executor: Optional[ThreadPoolExecutor] = None
+        # 可选的解析进程池：大邮件的MIME解析与HTML转文本在子进程中执行，不受GIL限制
+        self.parse_process_pool: Optional[ProcessPoolExecutor] = None
+        self.stats: Dict[str, int] = {
+            'fetched': 0,          # 收取的原始邮件数
+            'parsed': 0,           # 解析完成的邮件数
+            'parsed_in_process': 0,  # 在解析进程池中解析的邮件数
+            'parse_errors': 0,     # 解析失败的邮件数
+            'written': 0,          # 保存的新邮件数
+            'duplicates': 0,       # 跳过的重复邮件数
+            'write_batches': 0,    # 批量写入次数
+            'dropped': 0,          # 因账户任务取消而丢弃的邮件数
+            'runs_notified': 0,    # 完成通知阶段的账户任务数
+            'unchanged': 0,        # 所有文件夹均无变化、跳过收取的次数
+        }
+
+    def start(self) -> None:
+        """在当前事件循环上启动流水线各阶段的工作者"""
+        if self.is_running:
+            return
+
+        self._loop = asyncio.get_running_loop()
+        self.raw_queue = asyncio.Queue(maxsize=self.config.PIPELINE_RAW_QUEUE_SIZE)
+        self.record_queue = asyncio.Queue(maxsize=self.config.PIPELINE_RECORD_QUEUE_SIZE)
+        self.notify_queue = asyncio.Queue(maxsize=self.config.PIPELINE_NOTIFY_QUEUE_SIZE)
+
+        self.fetch_executor = ThreadPoolExecutor(
+            max_workers=self.config.IMAP_FETCH_WORKERS,
+            thread_name_prefix='imap-fetch'
+        )
+        self.parse_executor = ThreadPoolExecutor(
+            max_workers=self.config.PIPELINE_PARSE_WORKERS,
+            thread_name_prefix='mail-parse'
+        )
+        self.write_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='mail-write')
+        parse_processes = self.config.PIPELINE_PARSE_PROCESSES
+        if parse_processes > 0:
+            # 使用spawn启动子进程，避免在已有多个线程的进程中fork
+            self.parse_process_pool = ProcessPoolExecutor(
+                max_workers=parse_processes,
+                mp_context=multiprocessing.get_context('spawn')
+            )
+
+        # 解析工作者数量不少于解析进程数，保证每个进程都有邮件可处理
+        parse_workers = max(self.config.PIPELINE_PARSE_WORKERS, parse_processes)
+        self._tasks = [self._loop.create_task(self._parse_worker()) for _ in range(parse_workers)]
+        self._tasks.append(self._loop.create_task(self._write_worker()))
+        self._tasks += [self._loop.create_task(self._notify_worker())
+                        for _ in range(self.config.PIPELINE_NOTIFY_WORKERS)]
+        self.is_running = True
+        logger.info(f"邮件处理流水线已启动: 收取 {self.config.IMAP_FETCH_WORKERS}，"
+                    f"解析 {parse_workers}（进程 {parse_processes}），批量写入 {self.config.PIPELINE_WRITE_BATCH_SIZE}，"
+                    f"通知 {self.config.PIPELINE_NOTIFY_WORKERS}")
+
+    def stop(self) -> None:
+        """停止流水线，取消进行中的账户任务"""
+        if not self.is_running:
+            return
+
+        self.is_running = False
+        for run in list(self._runs.values()):
+            self._cancel_run(run)
+        for task in self._tasks:
+            task.cancel()
+        self._tasks = []
+        for executor in (self.fetch_executor, self.parse_executor, self.write_executor, self.parse_process_pool):
+            if executor:
+                executor.shutdown(wait=False, cancel_futures=True)
+        self.fetch_executor = self.parse_executor = self.write_executor = self.parse_process_pool = None
+        self._loop = None
+        logger.info("邮件处理流水线已停止")
+
+    def ensure_started(self) -> None:
+        """确保流水线运行在当前事件循环上（事件循环变化时重新启动）"""
+        if self.is_running and self._loop is not asyncio.get_running_loop():
+            self.stop()
+        self.start()
+
+    async def run(self, email_config: EmailConfig) -> Dict[str, Any]:
+        """
+        通过流水线处理单个邮箱账户，等待收取、解析、保存、通知全部完成
+
+        Args:
+            email_config: 邮箱配置对象
+
+        Returns:
+            处理结果字典
+        """
+        self.ensure_started()
+        run = AccountRun(email_config, self._loop.create_future())
+        self._runs[id(run)] = run
+        fetch_task = self._loop.create_task(self._fetch(run))
+        try:
+            return await run.future
+        except asyncio.CancelledError:
+            # 超出时间预算等原因被取消：通知收取线程中断，丢弃队列中该账户的邮件
+            self._cancel_run(run)
+            fetch_task.cancel()
+            raise
+        finally:
+            self._runs.pop(id(run), None)
+
+    def _cancel_run(self, run: AccountRun) -> None:
+        run.cancelled = True
+        if run.notify_task and not run.notify_task.done():
+            run.notify_task.cancel()
+        if not run.future.done():
+            run.future.cancel()
+
+    # ---------- 收取阶段 ----------
+
+    async def _fetch(self, run: AccountRun) -> None:
+        account = run.email_config.account
+        logger.info(f"开始收取邮件: {account}")
+        start = time.perf_counter()
+        try:
+            fetched = await self._loop.run_in_executor(self.fetch_executor, self._fetch_blocking, run)
+            run.timings['connect'] = fetched['connect_seconds']
+            run.timings['fetch'] = time.perf_counter() - start - fetched['connect_seconds']
+            run.result['total_emails'] = fetched['produced']
+            run.mailbox_statuses = fetched['statuses']
+            run.result['errors'].extend(fetched['errors'])
+            if fetched['unchanged']:
+                run.result['unchanged'] = True
+                self.stats['unchanged'] += 1
+                RUNS_UNCHANGED.inc()
+        except PipelineCancelled:
+            return
+        except asyncio.CancelledError:
+            return
+        except Exception as e:
+            # 连接或登录失败时无法区分各阶段，耗时全部计入收取阶段
+            run.timings['fetch'] = time.perf_counter() - start
+            error_msg = f"收取邮件失败: {account}，错误: {e}"
+            logger.error(error_msg)
+            run.result['errors'].append(error_msg)
+
+        run.fetch_done = True
+        await self._maybe_complete(run)
+
+    def _fetch_blocking(self, run: AccountRun) -> Dict[str, Any]:
+        """在IMAP收取线程中执行：读取上一次各文件夹的状态快照并收取邮件"""
+        known_states = None
+        if self.config.MAILBOX_STATUS_CHECK_ENABLED:
+            known_states = MailboxStateRepository.get_account(run.email_config.account)
+        return self.email_service.fetch_raw_messages(
+            run.email_config, partial(self._emit, run), get_body=True, known_states=known_states
+        )
+
+    def _emit(self, run: AccountRun, raw_message: Dict[str, Any]) -> None:
+        """在IMAP收取线程中调用：将原始邮件放入原始队列，队列已满时阻塞等待"""
+        if run.cancelled or not self.is_running:
+            raise PipelineCancelled()
+
+        future = asyncio.run_coroutine_threadsafe(self._put_raw(run, raw_message), self._loop)
+        while True:
+            try:
+                future.result(timeout=1.0)
+                return
+            except concurrent.futures.TimeoutError:
+                if run.cancelled or not self.is_running:
+                    future.cancel()
+                    raise PipelineCancelled()
+
+    async def _put_raw(self, run: AccountRun, raw_message: Dict[str, Any]) -> None:
+        run.pending += 1
+        try:
+            await self.raw_queue.put((run, raw_message))
+        except asyncio.CancelledError:
+            run.pending -= 1
+            raise
+        self.stats['fetched'] += 1
+
+    # ---------- 解析阶段 ----------
+
+    async def _parse_worker(self) -> None:
+        while True:
+            run, raw_message = await self.raw_queue.get()
+            if run.cancelled:
+                await self._item_done(run, dropped=True)
+                continue
+
+            start = time.perf_counter()
+            try:
+                email = await self._parse(run, raw_message)
+            except Exception as e:
+                run.timings['parse'] += time.perf_counter() - start
+                self.stats['parse_errors'] += 1
+                run.store_failed = True
+                logger.error(f"解析邮件失败: {run.email_config.account}，错误: {e}")
+                await self._item_done(run)
+                continue
+
+            run.timings['parse'] += time.perf_counter() - start
+            self.stats['parsed'] += 1
+            await self.record_queue.put((run, email))
+
+    async def _parse(self, run: AccountRun, raw_message: Dict[str, Any]) -> EmailContent:
+        """超过大小阈值的邮件交给解析进程池，只传递原始字节并取回正文；其余邮件在解析线程池中处理"""
+        account = run.email_config.account
+        raw_email = raw_message.get('raw')
+        if (self.parse_process_pool and raw_email
+                and len(raw_email) >= self.config.PIPELINE_PROCESS_PARSE_MIN_BYTES):
+            try:
+                with PARSE_SECONDS.time('process'):
+                    parsed = await self._loop.run_in_executor(
+                        self.parse_process_pool, extract_body_text, raw_email, self.config.MAIL_MAX_TEXT_BYTES,
+                        raw_message.get('raw_truncated', False)
+                    )
+            except Exception as e:
+                logger.warning(f"解析邮件正文失败 (ID: {raw_message.get('msg_id')}): {e}")
+                parsed = ('', False)
+            self.stats['parsed_in_process'] += 1
+            return self.email_service.parse_message(account, raw_message, parsed=parsed)
+
+        with PARSE_SECONDS.time('thread'):
+            return await self._loop.run_in_executor(
+                self.parse_executor,
+                self.email_service.parse_message, account, raw_message
+            )
+
+    # ---------- 保存阶段 ----------
+
+    async def _write_worker(self) -> None:
+        batch_size = self.config.PIPELINE_WRITE_BATCH_SIZE
+        while True:
+            batch: List[Tuple[AccountRun, EmailContent]] = [await self.record_queue.get()]
+            while len(batch) < batch_size and not self.record_queue.empty():
+                batch.append(self.record_queue.get_nowait())
+
+            live = [(run, email) for run, email in batch if not run.cancelled]
+            if live:
+                start = time.perf_counter()
+                try:
+                    saved = await self._loop.run_in_executor(
+                        self.write_executor,
+                        EmailContentRepository.save_new_batch, [email for _, email in live]
+                    )
+                    self.stats['write_batches'] += 1
+                    event_service.publish_created(email for (_, email), is_new in zip(live, saved) if is_new)
+                    for (run, email), is_new in zip(live, saved):
+                        if is_new:
+                            run.result['new_emails'] += 1
+                            self.stats['written'] += 1
+                            MESSAGES_STORED.inc()
+                            logger.info(f"保存新邮件到数据库: {email.sender} -> {email.recipient}, 主题: {email.subject}")
+                        else:
+                            self.stats['duplicates'] += 1
+                            DEDUP_HITS.inc()
+                            logger.info(f"跳过重复邮件: {email.sender} -> {email.recipient}, 主题: {email.subject}")
+                except Exception as e:
+                    logger.error(f"批量保存邮件失败: {e}")
+                    for run in {id(run): run for run, _ in live}.values():
+                        run.store_failed = True
+                        run.result['errors'].append(f"保存邮件失败: {e}")
+                # 一批中包含多个账户的邮件时，按邮件数分摊该批的保存耗时
+                share = (time.perf_counter() - start) / len(live)
+                for run, _ in live:
+                    run.timings['store'] += share
+
+            for run, _ in batch:
+                await self._item_done(run, dropped=run.cancelled)
+
+    async def _item_done(self, run: AccountRun, dropped: bool = False) -> None:
+        if dropped:
+            self.stats['dropped'] += 1
+        run.pending -= 1
+        await self._maybe_complete(run)
+
+    async def _maybe_complete(self, run: AccountRun) -> None:
+        """账户的全部邮件保存完成后进入通知队列"""
+        if run.fetch_done and run.pending == 0 and not run.completed and not run.cancelled:
+            run.completed = True
+            await self._save_mailbox_statuses(run)
+            await self.notify_queue.put(run)
+
+    async def _save_mailbox_statuses(self, run: AccountRun) -> None:
+        """
+        全部邮件保存成功后记录各文件夹的状态快照，下一次状态不变时跳过，有变化时只收取新邮件
+        有邮件解析或保存失败时不更新，保证下一次会重新收取
+        """
+        if not run.mailbox_statuses or run.store_failed:
+            return
+        account = run.email_config.account
+
+        def save_all() -> None:
+            for folder, status in run.mailbox_statuses.items():
+                MailboxStateRepository.save(account, folder, status)
+
+        try:
+            await self._loop.run_in_executor(self.write_executor, save_all)
+        except Exception as e:
+            logger.error(f"保存文件夹状态失败: {account}，错误: {e}")
+
+    # ---------- 通知阶段 ----------
+
+    async def _notify_worker(self) -> None:
+        while True:
+            run = await self.notify_queue.get()
+            if run.cancelled:
+                continue
+
+            run.notify_task = self._loop.create_task(self.notify_handler(run))
+            await asyncio.wait([run.notify_task])
+            if run.notify_task.cancelled() or run.future.done():
+                continue
+            if run.notify_task.exception() is not None:
+                error_msg = f"处理邮箱配置失败: {run.email_config.account}, 错误: {run.notify_task.exception()}"
+                logger.error(error_msg)
+                run.result['errors'].append(error_msg)
+            self.stats['runs_notified'] += 1
+            run.result['timings'] = {stage: round(seconds * 1000) for stage, seconds in run.timings.items()}
+            run.future.set_result(run.result)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """获取流水线状态：各阶段并发度、队列深度与计数"""
+        def queue_state(queue: Optional[asyncio.Queue]) -> Dict[str, int]:
+            return {
+                'depth': queue.qsize() if queue else 0,
+                'capacity': queue.maxsize if queue else 0,
+            }
+
+        return {
+            'running': self.is_running,
+            'active_runs': len(self._runs),
+            'concurrency': {
+                'fetch': self.config.IMAP_FETCH_WORKERS,
+                'parse': max(self.config.PIPELINE_PARSE_WORKERS, self.config.PIPELINE_PARSE_PROCESSES),
+                'parse_processes': self.config.PIPELINE_PARSE_PROCESSES,
+                'write_batch_size': self.config.PIPELINE_WRITE_BATCH_SIZE,
+                'notify': self.config.PIPELINE_NOTIFY_WORKERS,
+            },
+            'queues': {
+                'raw': queue_state(self.raw_queue),
+                'record': queue_state(self.record_queue),
+                'notify': queue_state(self.notify_queue),
+            },
+            **self.stats,
+        }
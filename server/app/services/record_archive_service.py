@@ -0,0 +1,245 @@
+"""
+邮件记录导出/导入服务
+导出按ID分批读取并逐行生成NDJSON或CSV，导入逐行解析并按批在事务中写入，两者内存占用都与记录总数无关
+"""
+
+import codecs
+import csv
+import io
+import logging
+from datetime import datetime
+from typing import Any, Dict, Iterable, Iterator, List, Tuple
+
+import orjson
+
+from app.repositories.attachment_repository import AttachmentRepository
+from app.repositories.email_record_repository import EmailRecordRepository
+from config import get_config
+
+logger = logging.getLogger(__name__)
+
+# 支持的格式: 格式 -> (媒体类型, 文件扩展名)
+FORMATS = {
+    'ndjson': ('application/x-ndjson', 'ndjson'),
+    'csv': ('text/csv; charset=utf-8', 'csv'),
+}
+
+# 导出的邮件字段（CSV的列顺序），NDJSON每行另外包含attachments（附件元数据列表）
+EXPORT_FIELDS = ['recipient', 'folder', 'uid', 'sender', 'subject', 'reception_time',
+                 'body_text', 'truncated', 'sent', 'backfilled']
+
+# 导入结果中最多保留的错误信息条数
+_MAX_ERROR_MESSAGES = 20
+
+# CSV单个字段的最大字符数（csv模块默认只有128 KiB，不足以容纳较大的正文）
+_CSV_FIELD_SIZE_LIMIT = 256 * 1024 * 1024
+
+
+def _record_dict(email) -> Dict[str, Any]:
+    return {field: getattr(email, field) for field in EXPORT_FIELDS}
+
+
+def export_records(fmt: str, account: str = None, since: datetime = None,
+                   until: datetime = None) -> Iterator[bytes]:
+    """
+    导出邮件记录，每批记录生成一块数据
+
+    Args:
+        fmt: ndjson 或 csv
+        account: 只导出该邮箱账户的邮件
+        since: 收件时间下限（包含）
+        until: 收件时间上限（不包含）
+    """
+    batch_size = get_config().EXPORT_BATCH_SIZE
+    batches = EmailRecordRepository.iter_batches(account, since, until, batch_size)
+    if fmt == 'csv':
+        return _export_csv(batches)
+    return _export_ndjson(batches)
+
+
+def _export_ndjson(batches: Iterator[list]) -> Iterator[bytes]:
+    for emails in batches:
+        attachments_by_email = AttachmentRepository.get_for_emails(emails)
+        lines = []
+        for email in emails:
+            record = _record_dict(email)
+            record['attachments'] = [
+                {
+                    'part': attachment.part,
+                    'filename': attachment.filename,
+                    'content_type': attachment.content_type,
+                    'encoding': attachment.encoding,
+                    'size': attachment.size,
+                }
+                for attachment in attachments_by_email[email.id]
+            ]
+            lines.append(orjson.dumps(record))
+        yield b'\n'.join(lines) + b'\n'
+
+
+def _export_csv(batches: Iterator[list]) -> Iterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    # 带BOM，方便Excel识别UTF-8
+    buffer.write('\ufeff')
+    writer.writerow(EXPORT_FIELDS)
+    for emails in batches:
+        for email in emails:
+            record = _record_dict(email)
+            record['reception_time'] = record['reception_time'].isoformat()
+            for field in ('truncated', 'sent', 'backfilled'):
+                record[field] = 'true' if record[field] else 'false'
+            writer.writerow(['' if record[field] is None else record[field] for field in EXPORT_FIELDS])
+        yield buffer.getvalue().encode('utf-8')
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode('utf-8')
+
+
+def _iter_lines(chunks: Iterable[bytes]) -> Iterator[str]:
+    """把字节块拆分为文本行（保留换行符，CSV中带引号的字段可跨行），开头的BOM被忽略"""
+    decoder = codecs.getincrementaldecoder('utf-8-sig')()
+    pending = ''
+    for chunk in chunks:
+        pending += decoder.decode(chunk)
+        start = 0
+        while True:
+            end = pending.find('\n', start)
+            if end < 0:
+                break
+            yield pending[start:end + 1]
+            start = end + 1
+        pending = pending[start:]
+    pending += decoder.decode(b'', final=True)
+    if pending:
+        yield pending
+
+
+def _parse_bool(value: Any) -> bool:
+    if isinstance(value, str):
+        return value.strip().lower() in ('true', '1', 'yes')
+    return bool(value)
+
+
+def _to_row(record: Dict[str, Any]) -> Tuple[Dict[str, Any], List[Dict[str, Any]]]:
+    """
+    校验一条导入记录并转为数据库字段，不合法时抛出ValueError
+    导入的邮件视为历史邮件：标记为已通知、回填导入，不会推送通知也不参与保留数量清理
+    """
+    for field in ('recipient', 'sender', 'reception_time'):
+        if not record.get(field):
+            raise ValueError(f"缺少字段 {field}")
+    reception_time = record['reception_time']
+    if not isinstance(reception_time, datetime):
+        reception_time = datetime.fromisoformat(str(reception_time))
+    if reception_time.tzinfo is not None:
+        # 带时区的时间转为本地时间（数据库中保存不带时区的本地时间）
+        reception_time = reception_time.astimezone().replace(tzinfo=None)
+    uid = record.get('uid')
+    uid = int(uid) if uid not in (None, '') else None
+    row = {
+        'recipient': str(record['recipient']),
+        'folder': str(record.get('folder') or 'INBOX'),
+        'uid': uid,
+        'sender': str(record['sender']),
+        'subject': str(record.get('subject') or ''),
+        'reception_time': reception_time,
+        'body_text': record.get('body_text') or None,
+        'truncated': _parse_bool(record.get('truncated', False)),
+        'sent': True,
+        'backfilled': True,
+    }
+
+    attachments = []
+    if uid is not None:
+        for attachment in record.get('attachments') or []:
+            if not attachment.get('part'):
+                raise ValueError("附件缺少字段 part")
+            attachments.append({
+                'account': row['recipient'],
+                'folder': row['folder'],
+                'uid': uid,
+                'part': str(attachment['part']),
+                'filename': str(attachment.get('filename') or ''),
+                'content_type': str(attachment.get('content_type') or 'application/octet-stream'),
+                'encoding': str(attachment.get('encoding') or '7bit'),
+                'size': int(attachment.get('size') or 0),
+            })
+    return row, attachments
+
+
+def _iter_records(fmt: str, lines: Iterator[str]) -> Iterator[Tuple[int, Any]]:
+    """逐条解析导入数据: (行号, 记录字典)，无法解析的行产出 (行号, 异常)"""
+    if fmt == 'csv':
+        if csv.field_size_limit() < _CSV_FIELD_SIZE_LIMIT:
+            csv.field_size_limit(_CSV_FIELD_SIZE_LIMIT)
+        reader = csv.DictReader(lines)
+        while True:
+            try:
+                record = next(reader)
+            except StopIteration:
+                return
+            except csv.Error as e:
+                # 单行格式错误（如字段超过上限、包含NUL字符）计为失败，继续解析下一行
+                # DictReader.line_num只在成功读取后更新，出错的行号取底层reader的
+                yield reader.reader.line_num, e
+                continue
+            yield reader.line_num, record
+    for line_num, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        try:
+            record = orjson.loads(line)
+            if not isinstance(record, dict):
+                raise ValueError("每行必须是JSON对象")
+        except ValueError as e:
+            yield line_num, e
+            continue
+        yield line_num, record
+
+
+def import_records(fmt: str, chunks: Iterable[bytes]) -> Dict[str, Any]:
+    """
+    导入邮件记录（NDJSON或CSV，与导出格式相同），每 IMPORT_BATCH_SIZE 条在一个事务中写入，已存在的邮件跳过
+    在线程中执行，chunks为请求体的字节块
+
+    Returns:
+        Dict[str, Any]: imported（导入数量）、skipped（已存在而跳过的数量）、failed（不合法的记录数量）、
+            errors（前若干条错误信息）
+    """
+    batch_size = get_config().IMPORT_BATCH_SIZE
+    result: Dict[str, Any] = {'imported': 0, 'skipped': 0, 'failed': 0, 'errors': []}
+    rows: List[Dict[str, Any]] = []
+    attachments: List[Dict[str, Any]] = []
+
+    def flush() -> None:
+        imported, skipped = EmailRecordRepository.import_batch(rows, attachments)
+        result['imported'] += imported
+        result['skipped'] += skipped
+        rows.clear()
+        attachments.clear()
+
+    def fail(line_num: int, error: Exception) -> None:
+        result['failed'] += 1
+        if len(result['errors']) < _MAX_ERROR_MESSAGES:
+            result['errors'].append(f"第 {line_num} 行: {error}")
+
+    for line_num, record in _iter_records(fmt, _iter_lines(chunks)):
+        if isinstance(record, Exception):
+            fail(line_num, record)
+            continue
+        try:
+            row, row_attachments = _to_row(record)
+        except (ValueError, TypeError, AttributeError) as e:
+            fail(line_num, e)
+            continue
+        rows.append(row)
+        attachments.extend(row_attachments)
+        if len(rows) >= batch_size:
+            flush()
+    flush()
+
+    logger.info(f"导入邮件记录完成: 导入 {result['imported']} 条，跳过 {result['skipped']} 条，"
+                f"失败 {result['failed']} 条")
+    return result
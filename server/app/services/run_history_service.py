@@ -0,0 +1,146 @@
+"""
+邮箱账户处理历史服务
+每个账户每次处理（定时或手动）结束后记录一条历史：各阶段耗时、数量与错误，定期按保留天数与条数清理；
+统计接口按账户计算总耗时与各阶段耗时的分位数，以及按时间分桶的分位数趋势，用于找出拖慢定时任务的邮箱或服务商
+"""
+
+import logging
+import math
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Sequence
+
+from app.repositories.run_history_repository import RunHistoryRepository, STAGE_FIELDS
+from config import get_config
+
+logger = logging.getLogger(__name__)
+
+# 保存的错误信息最大长度
+_MAX_ERRORS_LENGTH = 2000
+
+# 统计的分位数
+PERCENTILES = (50, 90, 99)
+
+
+def run_status(result: Dict[str, Any]) -> str:
+    """根据处理结果判断状态: timeout（超出时间预算）、error（有错误）、success"""
+    if result.get('timed_out'):
+        return 'timeout'
+    if result.get('errors'):
+        return 'error'
+    return 'success'
+
+
+def record_run(result: Dict[str, Any], trigger: str, started_at: datetime, duration_seconds: float) -> None:
+    """
+    保存一次账户处理的历史（失败时只记录日志，不影响处理结果）
+
+    Args:
+        result: 处理结果字典，timings（各阶段耗时，毫秒）超时取消时不存在
+        trigger: schedule（定时）或 manual（手动）
+        started_at: 开始时间
+        duration_seconds: 总耗时（秒）
+    """
+    if not get_config().RUN_HISTORY_ENABLED:
+        return
+    timings = result.get('timings') or {}
+    errors = '\n'.join(str(error) for error in result.get('errors') or [])
+    try:
+        RunHistoryRepository.create(
+            account=result['account'],
+            server_name=result.get('server_name'),
+            trigger=trigger,
+            status=run_status(result),
+            started_at=started_at,
+            duration_ms=round(duration_seconds * 1000),
+            total_emails=result.get('total_emails', 0),
+            new_emails=result.get('new_emails', 0),
+            notifications_sent=result.get('notifications_sent', 0),
+            deleted_old_emails=result.get('deleted_old_emails', 0),
+            unchanged=bool(result.get('unchanged')),
+            errors=errors[:_MAX_ERRORS_LENGTH] or None,
+            **{field: timings.get(field[:-3]) for field in STAGE_FIELDS},
+        )
+    except Exception as e:
+        logger.error(f"保存处理历史失败: {result.get('account')}，错误: {e}")
+
+
+def prune() -> int:
+    """按保留天数与每个账户的最大条数清理处理历史"""
+    config = get_config()
+    before = datetime.now() - timedelta(days=config.RUN_HISTORY_RETENTION_DAYS)
+    deleted = RunHistoryRepository.prune(before, config.RUN_HISTORY_MAX_PER_ACCOUNT)
+    if deleted:
+        logger.info(f"已清理 {deleted} 条处理历史")
+    return deleted
+
+
+def percentile(sorted_values: Sequence[float], p: float) -> Optional[float]:
+    """最近秩法计算分位数，sorted_values需已排序"""
+    if not sorted_values:
+        return None
+    rank = max(1, math.ceil(p / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def _distribution(values: List[Optional[int]]) -> Optional[Dict[str, Any]]:
+    """一组耗时（毫秒）的分位数、平均值与最大值，忽略空值"""
+    values = sorted(value for value in values if value is not None)
+    if not values:
+        return None
+    summary: Dict[str, Any] = {f'p{p}': percentile(values, p) for p in PERCENTILES}
+    summary['avg'] = round(sum(values) / len(values))
+    summary['max'] = values[-1]
+    return summary
+
+
+def summarize(hours: int = 24, account: str = None, bucket_minutes: int = 60,
+              group_by: str = 'account') -> List[Dict[str, Any]]:
+    """
+    按账户（或服务商）统计时间范围内的处理历史
+
+    Args:
+        hours: 统计最近多少小时
+        account: 只统计该邮箱账户
+        bucket_minutes: 趋势的时间分桶（分钟）
+        group_by: account（按邮箱账户）或 server_name（按服务商）
+
+    Returns:
+        List[Dict[str, Any]]: 每个分组一项，包含次数、各状态次数、总耗时与各阶段耗时的分位数、
+            按时间分桶的总耗时分位数趋势；按总耗时p90从大到小排序
+    """
+    since = datetime.now() - timedelta(hours=hours)
+    bucket = timedelta(minutes=bucket_minutes)
+    origin = since.replace(hour=0, minute=0, second=0, microsecond=0)
+    rows_by_group: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+    for row in RunHistoryRepository.get_timings(since, account):
+        rows_by_group[row[group_by] or ''].append(row)
+
+    summaries = []
+    for name, rows in rows_by_group.items():
+        statuses: Dict[str, int] = defaultdict(int)
+        for row in rows:
+            statuses[row['status']] += 1
+
+        # 按开始时间分桶，分桶从当天零点起对齐（rows已按开始时间排序）
+        buckets: Dict[datetime, List[int]] = {}
+        for row in rows:
+            start = origin + bucket * ((row['started_at'] - origin) // bucket)
+            buckets.setdefault(start, []).append(row['duration_ms'])
+        trend = []
+        for start, durations in buckets.items():
+            point = {'start': start, 'runs': len(durations)}
+            point.update(_distribution(durations))
+            trend.append(point)
+
+        summaries.append({
+            group_by: name,
+            'runs': len(rows),
+            'statuses': dict(statuses),
+            'new_emails': sum(row['new_emails'] for row in rows),
+            'duration': _distribution([row['duration_ms'] for row in rows]),
+            'stages': {stage[:-3]: _distribution([row[stage] for row in rows]) for stage in STAGE_FIELDS},
+            'trend': trend,
+        })
+    summaries.sort(key=lambda item: item['duration']['p90'], reverse=True)
+    return summaries
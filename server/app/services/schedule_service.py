@@ -1,19 +1,39 @@
 """
 定时任务服务
-使用APScheduler实现邮箱邮件收取和通知推送的定时任务
+使用APScheduler（AsyncIOScheduler）在应用自身的事件循环上实现邮箱邮件收取和通知推送的定时任务
 """
 
 import asyncio
 import logging
-from time import sleep
-from typing import List, Dict, Any
-from apscheduler.schedulers.background import BackgroundScheduler
+import random
+import time
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List
+from apscheduler.events import EVENT_JOB_MAX_INSTANCES, EVENT_JOB_MISSED, EVENT_JOB_SUBMITTED
+from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.triggers.interval import IntervalTrigger
 import pytz
 
+from config import get_config
+
 from app.models.email_models import EmailConfig, EmailContent
 from app.repositories.email_repository import EmailConfigRepository
+from app.repositories.attachment_repository import AttachmentRepository
+from app.repositories.backfill_repository import BackfillRepository
+from app.repositories.config_registry import config_registry
+from app.repositories.mailbox_state_repository import MailboxStateRepository
+from app.services.adaptive_poll_service import AdaptivePollService
+from app.services.attachment_service import format_attachments
+from app.services.backfill_service import BackfillService
+from app.services.catalog_service import mail_server_catalog, notice_server_catalog
 from app.services.email_service import EmailService
+from app.services.event_service import event_service
+from app.services.lease_service import LeaseService
+from app.services.manual_run_service import ManualRunService
+from app.services.metrics_service import (ACCOUNT_RUN_SECONDS, RUNS_OVERRUN, RUNS_SKIPPED, SCHEDULE_LAG_SECONDS,
+                                          registry)
+from app.services.pipeline_service import AccountRun, MailPipeline
+from app.services import run_history_service
 from app.services.notification_service import NotificationService
 from app.repositories.notification_repository import NotificationChannelRepository
 
@@ -24,18 +44,189 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# 邮箱检查任务ID前缀，每个邮箱账户一个任务
+ACCOUNT_JOB_PREFIX = 'email_check_job:'
+# 租约心跳任务ID
+LEASE_HEARTBEAT_JOB_ID = 'lease_heartbeat_job'
+# 邮箱配置同步任务ID
+CONFIG_SYNC_JOB_ID = 'config_sync_job'
+# 处理历史清理任务ID
+RUN_HISTORY_PRUNE_JOB_ID = 'run_history_prune_job'
+# 回填任务领取任务ID
+BACKFILL_POLL_JOB_ID = 'backfill_poll_job'
+
 
 class ScheduleService:
     """定时任务服务类"""
     
     def __init__(self):
+        self.config = get_config()
         self.email_service = EmailService()
-        self.scheduler = BackgroundScheduler(timezone=pytz.timezone('Asia/Shanghai'))
+        self.adaptive_poll = AdaptivePollService()
+        self.lease_service = LeaseService(is_busy=self._is_account_running)
+        self.timezone = pytz.timezone('Asia/Shanghai')
+        self.scheduler = AsyncIOScheduler(timezone=self.timezone)
         self.is_running = False
+        # 邮件处理流水线（收取 → 解析 → 保存 → 通知），首次使用时在当前事件循环上启动
+        self.pipeline = MailPipeline(self.email_service, self.notify_and_prune)
+        # 历史邮件回填（独立线程与IMAP连接，不影响定时收取）
+        self.backfill_service = BackfillService(self.email_service)
+        # 手动执行任务（后台执行，同一时刻只有一个）
+        self.manual_runs = ManualRunService(self.run_scheduled_task)
+        # 每个邮箱账户一把运行锁，防止定时任务与手动执行重叠
+        self._account_locks: Dict[str, asyncio.Lock] = {}
+        # 已注册任务对应的调度参数: 账户 -> (间隔分钟, 抖动秒)，用于与数据库同步
+        self._job_settings: Dict[str, tuple] = {}
+        # 运行统计
+        self.stats: Dict[str, int] = {
+            'runs_started': 0,     # 开始执行的账户任务次数
+            'runs_completed': 0,   # 正常完成的账户任务次数
+            'runs_skipped': 0,     # 因上一次执行未完成而跳过的次数
+            'runs_not_owned': 0,   # 账户由其他工作进程负责而跳过的次数
+            'runs_overrun': 0,     # 超出账户时间预算被取消的次数
+            'ticks_missed': 0,     # 错过执行时间（已合并）的次数
+            'ticks_overrun': 0,    # 手动全量执行超出整体时间预算的次数
+        }
+        self.scheduler.add_listener(self._on_job_skipped, EVENT_JOB_MAX_INSTANCES | EVENT_JOB_MISSED)
+        self.scheduler.add_listener(self._on_job_submitted, EVENT_JOB_SUBMITTED)
+        self._register_metrics()
+    
+    def _register_metrics(self) -> None:
+        """注册抓取时计算的仪表：流水线队列深度、进行中的账户任务与事件订阅者数量"""
+        def queue_depths() -> Dict[tuple, int]:
+            queues = self.pipeline.snapshot()['queues']
+            return {(name,): state['depth'] for name, state in queues.items()}
+        
+        registry.gauge('mailnotice_pipeline_queue_depth', '流水线各阶段队列中等待的数量', ['queue'], queue_depths)
+        registry.gauge('mailnotice_pipeline_active_runs', '流水线中进行中的账户任务数', [],
+                       lambda: {(): self.pipeline.snapshot()['active_runs']})
+        registry.gauge('mailnotice_running_accounts', '正在处理的邮箱账户数', [],
+                       lambda: {(): sum(1 for lock in self._account_locks.values() if lock.locked())})
+        registry.gauge('mailnotice_event_subscribers', '网页事件推送（SSE）连接数', [],
+                       lambda: {(): event_service.snapshot()['subscribers']})
+    
+    def _on_job_submitted(self, event) -> None:
+        """APScheduler提交任务时的回调：统计实际执行时间与计划时间的差（调度延迟）"""
+        if event.scheduled_run_times:
+            lag = (datetime.now(self.timezone) - max(event.scheduled_run_times)).total_seconds()
+            SCHEDULE_LAG_SECONDS.observe(max(lag, 0.0))
+    
+    def _on_job_skipped(self, event) -> None:
+        """APScheduler跳过任务时的回调：统计错过或因实例数限制被跳过的执行"""
+        if event.code == EVENT_JOB_MISSED:
+            self.stats['ticks_missed'] += 1
+            RUNS_SKIPPED.inc('missed')
+            logger.warning(f"定时任务错过执行时间，已合并到下一次执行: {event.job_id}")
+        else:
+            self.stats['runs_skipped'] += 1
+            RUNS_SKIPPED.inc('busy')
+            logger.warning(f"定时任务上一次执行尚未完成，跳过本次执行: {event.job_id}")
+    
+    def _is_account_running(self, account: str) -> bool:
+        """本进程是否正在处理该邮箱账户"""
+        lock = self._account_locks.get(account)
+        return lock is not None and lock.locked()
+    
+    def _get_account_lock(self, account: str) -> asyncio.Lock:
+        """获取邮箱账户的运行锁"""
+        lock = self._account_locks.get(account)
+        if lock is None:
+            lock = asyncio.Lock()
+            self._account_locks[account] = lock
+        return lock
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """获取运行统计"""
+        return {
+            **self.stats,
+            'running_accounts': [account for account, lock in self._account_locks.items() if lock.locked()],
+            'poll_intervals': self.adaptive_poll.snapshot(),
+            'lease': self.lease_service.snapshot(),
+            'pipeline': self.pipeline.snapshot(),
+            'backfill': self.backfill_service.snapshot(),
+            'config_cache': config_registry.snapshot(),
+            'catalogs': {
+                'mail_server': mail_server_catalog.snapshot(),
+                'notice_server': notice_server_catalog.snapshot(),
+            },
+            'events': event_service.snapshot(),
+            'manual_runs': self.manual_runs.snapshot(),
+        }
+    
+    async def run_account_guarded(self, email_config: EmailConfig, trigger: str = 'schedule') -> Dict[str, Any]:
+        """
+        在账户运行锁和时间预算保护下处理单个邮箱配置
+        同一账户已有执行在进行时直接跳过；超出时间预算的执行会被取消
+        实际执行（未跳过）的处理结束后保存一条处理历史
+        
+        Args:
+            email_config: 邮箱配置对象
+            trigger: schedule（定时）或 manual（手动），记录在处理历史中
+            
+        Returns:
+            处理结果字典
+        """
+        account = email_config.account
+        
+        # 多进程部署时只处理本进程持有租约的账户
+        if not self.lease_service.owns(account):
+            self.stats['runs_not_owned'] += 1
+            owner = self.lease_service.assigned_worker(account)
+            logger.debug(f"邮箱 {account} 由工作进程 {owner} 负责，跳过")
+            return {
+                'account': account,
+                'server_name': email_config.server_name,
+                'skipped': True,
+                'owner': owner,
+                'errors': []
+            }
+        
+        lock = self._get_account_lock(account)
+        if lock.locked():
+            self.stats['runs_skipped'] += 1
+            RUNS_SKIPPED.inc('busy')
+            logger.warning(f"邮箱 {account} 上一次执行尚未完成，跳过本次执行")
+            return {
+                'account': account,
+                'server_name': email_config.server_name,
+                'skipped': True,
+                'errors': ['上一次执行尚未完成，跳过本次执行']
+            }
+        
+        async with lock:
+            self.stats['runs_started'] += 1
+            timeout = self.config.SCHEDULE_ACCOUNT_TIMEOUT_SECONDS
+            started_at = datetime.now()
+            start = time.perf_counter()
+            try:
+                result = await asyncio.wait_for(self.process_email_config(email_config), timeout=timeout)
+                self.stats['runs_completed'] += 1
+                ACCOUNT_RUN_SECONDS.observe(time.perf_counter() - start, 'completed')
+            except asyncio.TimeoutError:
+                self.stats['runs_overrun'] += 1
+                RUNS_OVERRUN.inc()
+                ACCOUNT_RUN_SECONDS.observe(time.perf_counter() - start, 'timed_out')
+                error_msg = f"处理邮箱配置超时（超过 {timeout} 秒），已取消: {account}"
+                logger.error(error_msg)
+                result = {
+                    'account': account,
+                    'server_name': email_config.server_name,
+                    'timed_out': True,
+                    'errors': [error_msg]
+                }
+            run_history_service.record_run(result, trigger, started_at, time.perf_counter() - start)
+        
+        # 自适应轮询：根据本次结果调整下一次检查间隔（定时与手动执行都会计入）
+        if self.config.ADAPTIVE_POLL_ENABLED:
+            interval_seconds = self.adaptive_poll.next_interval(email_config, result.get('new_emails', 0))
+            self._reschedule_with_interval(email_config, interval_seconds)
+        
+        return result
     
     async def process_email_config(self, email_config: EmailConfig) -> Dict[str, Any]:
         """
         处理单个邮箱配置：收取邮件、保存到数据库、推送未发送通知的邮件
+        收取、解析、保存由邮件处理流水线分阶段完成，全部保存后执行通知与旧邮件清理（notify_and_prune）
         
         Args:
             email_config: 邮箱配置对象
@@ -43,106 +234,96 @@ class ScheduleService:
         Returns:
             处理结果字典
         """
-        result = {
-            'account': email_config.account,
-            'server_name': email_config.server_name,
-            'total_emails': 0,
-            'new_emails': 0,
-            'deleted_old_emails': 0,
-            'notifications_sent': 0,
-            'errors': []
-        }
-        
         try:
-            # 1. 收取邮件（获取正文，直接保存到数据库）
-            logger.info(f"开始收取邮件: {email_config.account}")
-            emails = self.email_service.fetch_emails(email_config, get_body=True)
-            result['total_emails'] = len(emails)
-            
-            if not emails:
-                logger.info(f"未收到邮件: {email_config.account}")
-                return result
+            return await self.pipeline.run(email_config)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            error_msg = f"处理邮箱配置失败: {email_config.account}, 错误: {str(e)}"
+            logger.error(error_msg)
+            return {
+                'account': email_config.account,
+                'server_name': email_config.server_name,
+                'total_emails': 0,
+                'new_emails': 0,
+                'deleted_old_emails': 0,
+                'notifications_sent': 0,
+                'errors': [error_msg]
+            }
+    
+    async def notify_and_prune(self, run: AccountRun) -> None:
+        """
+        流水线通知阶段：推送未发送通知的邮件，并删除超出保留数量的旧邮件
+        
+        Args:
+            run: 账户处理任务，结果写入run.result，通知与清理耗时写入run.timings
+        """
+        email_config = run.email_config
+        result = run.result
+        
+        if not result['total_emails'] and not result.get('unchanged'):
+            logger.info(f"未收到邮件: {email_config.account}")
+
+        # 3. 查找并发送未发送通知的邮件（确保只处理未发送的邮件）
+        # 收件箱无变化或未收到邮件时也要查询，之前发送失败的通知在下一次处理中重试
+        # 同时检查邮件是否在最近的处理周期内已经被处理过
+        unsent_emails = EmailContent.select().where(
+            (EmailContent.recipient == email_config.account) &
+            (EmailContent.sent == False)
+        ).order_by(EmailContent.reception_time.desc())
+        
+        notify_start = time.perf_counter()
+        if unsent_emails:
+            logger.info(f"发现 {len(unsent_emails)} 封未发送通知的邮件: {email_config.account}")
             
-            # 2. 保存所有邮件到数据库（sent字段默认为False）
-            new_emails = []
-            for email in emails:
-                # 检查是否已存在相同特征的邮件（更严格的去重条件）
-                existing = EmailContent.select().where(
-                    (EmailContent.recipient == email_config.account) &
-                    (EmailContent.sender == email.sender) &
-                    (EmailContent.subject == email.subject) &
-                    (EmailContent.reception_time.between(
-                        email.reception_time.replace(second=0, microsecond=0),
-                        email.reception_time.replace(second=59, microsecond=999999)
-                    ))
-                ).first()
-                
-                if not existing:
-                    # 新邮件，保存到数据库（sent=False）
-                    email.sent = False  # 确保sent字段为False
-                    email.save()
-                    new_emails.append(email)
-                    logger.info(f"保存新邮件到数据库: {email.sender} -> {email.recipient}, 主题: {email.subject}")
-                else:
-                    logger.info(f"跳过重复邮件: {email.sender} -> {email.recipient}, 主题: {email.subject}")
+            # 发送通知
+            sent_count = await self.send_notifications_and_update_status(email_config, list(unsent_emails))
+            result['notifications_sent'] = sent_count
             
-            result['new_emails'] = len(new_emails)
+            logger.info(f"成功发送 {sent_count} 封邮件的通知: {email_config.account}")
+        else:
+            logger.info(f"没有未发送通知的邮件: {email_config.account}")
+        run.timings['notify'] = time.perf_counter() - notify_start
+        
+        # 4. 检查并删除旧邮件（更严格的删除逻辑，防止重复推送）
+        retention_start = time.perf_counter()
+        # 回填导入的历史邮件不计入保留数量，也不会被删除
+        total_emails = EmailContent.select().where(
+            (EmailContent.recipient == email_config.account) &
+            (EmailContent.backfilled == False)
+        ).count()
+        
+        deleted_count = 0
+        if total_emails > 5:
+            # 计算需要删除的邮件数量
+            emails_to_delete = total_emails - 5
             
-            # 3. 查找并发送未发送通知的邮件（确保只处理未发送的邮件）
-            # 同时检查邮件是否在最近的处理周期内已经被处理过
-            unsent_emails = EmailContent.select().where(
+            # 获取最旧的已发送通知的邮件（按收件时间从旧到新）
+            oldest_sent_emails = EmailContent.select().where(
                 (EmailContent.recipient == email_config.account) &
-                (EmailContent.sent == False)
-            ).order_by(EmailContent.reception_time.desc())
-            
-            if unsent_emails:
-                logger.info(f"发现 {len(unsent_emails)} 封未发送通知的邮件: {email_config.account}")
-                
-                # 发送通知
-                sent_count = await self.send_notifications_and_update_status(email_config, list(unsent_emails))
-                result['notifications_sent'] = sent_count
-                
-                logger.info(f"成功发送 {sent_count} 封邮件的通知: {email_config.account}")
-            else:
-                logger.info(f"没有未发送通知的邮件: {email_config.account}")
-            
-            # 4. 检查并删除旧邮件（更严格的删除逻辑，防止重复推送）
-            total_emails = EmailContent.select().where(
-                EmailContent.recipient == email_config.account
-            ).count()
-            
-            deleted_count = 0
-            if total_emails > 5:
-                # 计算需要删除的邮件数量
-                emails_to_delete = total_emails - 5
-                
-                # 获取最旧的已发送通知的邮件（按收件时间从旧到新）
-                oldest_sent_emails = EmailContent.select().where(
-                    (EmailContent.recipient == email_config.account) &
-                    (EmailContent.sent == True)
-                ).order_by(EmailContent.reception_time.asc()).limit(emails_to_delete)
-                
-                # 删除旧邮件
-                for old_email in oldest_sent_emails:
-                    old_email.delete_instance()
-                    deleted_count += 1
-                
-                if deleted_count > 0:
-                    logger.info(f"邮箱 {email_config.account} 邮件总数 {total_emails} 超过5封，删除 {deleted_count} 封已发送通知的旧邮件")
-            else:
-                # 即使邮件总数不超过5封，也要确保已发送的邮件不会被重复处理
-                # 这里可以添加额外的清理逻辑，比如删除过期的已发送邮件
-                logger.debug(f"邮箱 {email_config.account} 邮件总数 {total_emails}，无需删除旧邮件")
+                (EmailContent.sent == True) &
+                (EmailContent.backfilled == False)
+            ).order_by(EmailContent.reception_time.asc()).limit(emails_to_delete)
             
-            result['deleted_old_emails'] = deleted_count
-            logger.info(f"处理完成: {email_config.account}, 新邮件: {result['new_emails']}, 发送通知: {result['notifications_sent']}, 删除旧邮件: {result['deleted_old_emails']}")
+            # 删除旧邮件
+            deleted_ids = []
+            for old_email in oldest_sent_emails:
+                AttachmentRepository.delete_for_email(old_email)
+                old_email.delete_instance()
+                deleted_ids.append(old_email.id)
+                deleted_count += 1
+            event_service.publish_deleted(deleted_ids)
             
-        except Exception as e:
-            error_msg = f"处理邮箱配置失败: {email_config.account}, 错误: {str(e)}"
-            logger.error(error_msg)
-            result['errors'].append(error_msg)
+            if deleted_count > 0:
+                logger.info(f"邮箱 {email_config.account} 邮件总数 {total_emails} 超过5封，删除 {deleted_count} 封已发送通知的旧邮件")
+        else:
+            # 即使邮件总数不超过5封，也要确保已发送的邮件不会被重复处理
+            # 这里可以添加额外的清理逻辑，比如删除过期的已发送邮件
+            logger.debug(f"邮箱 {email_config.account} 邮件总数 {total_emails}，无需删除旧邮件")
         
-        return result
+        result['deleted_old_emails'] = deleted_count
+        run.timings['retention'] = time.perf_counter() - retention_start
+        logger.info(f"处理完成: {email_config.account}, 新邮件: {result['new_emails']}, 发送通知: {result['notifications_sent']}, 删除旧邮件: {result['deleted_old_emails']}")
     
     async def send_notifications_and_update_status(self, email_config: EmailConfig, unsent_emails: List[EmailContent]) -> int:
         """
@@ -175,6 +356,9 @@ class ScheduleService:
             
             logger.info(f"开始处理 {len(unsent_emails)} 封未发送邮件: {email_config.account}")
             
+            # 一次查询取出全部邮件的附件元数据
+            attachments_by_email = AttachmentRepository.get_for_emails(unsent_emails)
+            
             for email in unsent_emails:
                 try:
                     # 构建通知内容
@@ -183,7 +367,9 @@ class ScheduleService:
                              f"收件人：{email.recipient}\n" \
                              f"收件时间：{email.reception_time}\n" \
                              f"主题：{content}\n" \
-                             f"正文：\n{email.body_text if email.body_text else '无正文内容'}\n"
+                             f"正文：\n{email.body_text if email.body_text else '无正文内容'}\n" \
+                             f"{'（正文过长，已截断）' if email.truncated else ''}" \
+                             f"{format_attachments(attachments_by_email.get(email.id))}"
                     
                     # 发送通知 - 只有成功才更新状态
                     result = await NotificationService.send(
@@ -199,6 +385,7 @@ class ScheduleService:
                         # 发送成功，更新sent字段为True
                         email.sent = True
                         email.save()
+                        event_service.publish_sent([email.id])
                         
                         sent_count += 1
                         logger.info(f"✅ 邮件通知发送成功并标记为已发送: {email.sender} -> {email.recipient}, 主题: {content[:20]}...")
@@ -209,7 +396,7 @@ class ScheduleService:
                         logger.warning(f"❌ 邮件通知发送失败: {email.sender} -> {email.recipient}, 错误: {error_msg}")
                     
                     # 添加短暂延迟，避免发送过快
-                    sleep(0.5)
+                    await asyncio.sleep(0.5)
                     
                 except Exception as e:
                     error_msg = str(e)
@@ -228,9 +415,14 @@ class ScheduleService:
         
         return sent_count
     
-    async def run_scheduled_task(self) -> List[Dict[str, Any]]:
+    async def run_scheduled_task(self, email_configs: List[EmailConfig] = None,
+                                 on_result: Callable[[str, Dict[str, Any]], None] = None) -> List[Dict[str, Any]]:
         """
-        执行定时任务
+        执行一次全量（手动）任务
+        
+        Args:
+            email_configs: 要处理的邮箱配置，为None时处理全部邮箱配置
+            on_result: 每个账户处理结束（包括被取消）时的回调，参数为账户与处理结果
         
         Returns:
             所有邮箱配置的处理结果列表
@@ -238,7 +430,8 @@ class ScheduleService:
         logger.info("=== 开始执行定时邮件收取任务 ===")
         
         # 获取所有邮箱配置
-        email_configs = EmailConfigRepository.get_all()
+        if email_configs is None:
+            email_configs = EmailConfigRepository.get_all()
         
         if not email_configs:
             logger.warning("未找到邮箱配置，跳过定时任务")
@@ -246,21 +439,44 @@ class ScheduleService:
         
         logger.info(f"找到 {len(email_configs)} 个邮箱配置")
         
-        # 并行处理所有邮箱配置
-        tasks = [self.process_email_config(config) for config in email_configs]
-        results = await asyncio.gather(*tasks, return_exceptions=True)
+        async def run_and_report(email_config: EmailConfig) -> Dict[str, Any]:
+            result = await self.run_account_guarded(email_config, trigger='manual')
+            if on_result:
+                on_result(email_config.account, result)
+            return result
+        
+        # 并行处理所有邮箱配置（每个账户受运行锁与账户时间预算保护，整体受本次执行的时间预算限制）
+        tasks = [asyncio.ensure_future(run_and_report(config)) for config in email_configs]
+        tick_timeout = self.config.SCHEDULE_TICK_TIMEOUT_SECONDS
+        done, pending = await asyncio.wait(tasks, timeout=tick_timeout)
+        if pending:
+            self.stats['ticks_overrun'] += 1
+            logger.error(f"定时任务超过整体时间预算 {tick_timeout} 秒，取消 {len(pending)} 个未完成的邮箱任务")
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
         
         # 处理结果
         valid_results = []
-        for i, result in enumerate(results):
-            if isinstance(result, Exception):
-                logger.error(f"处理邮箱配置失败: {email_configs[i].account}, 错误: {str(result)}")
-                valid_results.append({
-                    'account': email_configs[i].account,
-                    'errors': [str(result)]
-                })
+        for config, task in zip(email_configs, tasks):
+            if task.cancelled():
+                result = {
+                    'account': config.account,
+                    'timed_out': True,
+                    'errors': [f"超过整体时间预算 {tick_timeout} 秒，已取消"]
+                }
+            elif task.exception() is not None:
+                logger.error(f"处理邮箱配置失败: {config.account}, 错误: {str(task.exception())}")
+                result = {
+                    'account': config.account,
+                    'errors': [str(task.exception())]
+                }
             else:
-                valid_results.append(result)
+                valid_results.append(task.result())
+                continue
+            valid_results.append(result)
+            if on_result:
+                on_result(config.account, result)
         
         # 统计汇总
         total_new_emails = sum(r.get('new_emails', 0) for r in valid_results)
@@ -272,37 +488,238 @@ class ScheduleService:
         
         return valid_results
     
-    def start_scheduler(self, interval_minutes: int = 5) -> None:
+    async def run_account_task(self, account: str) -> Dict[str, Any]:
         """
-        启动定时调度器
+        执行单个邮箱账户的定时任务
         
         Args:
-            interval_minutes: 定时任务间隔（分钟）
+            account: 邮箱账户
+            
+        Returns:
+            处理结果字典
         """
-        if self.is_running:
-            logger.warning("定时调度器已在运行中")
+        email_config = EmailConfigRepository.get_by_account(account)
+        if not email_config:
+            logger.warning(f"邮箱配置已不存在，移除定时任务: {account}")
+            self.remove_account_job(account)
+            return {'account': account, 'errors': ['邮箱配置不存在']}
+        
+        return await self.run_account_guarded(email_config)
+    
+    def _build_trigger(self, email_config: EmailConfig, interval_seconds: float = None) -> IntervalTrigger:
+        """
+        构建邮箱账户的间隔触发器
+        未指定间隔时使用账户配置的间隔，首次执行时间在一个间隔内随机分布，避免所有账户同时登录IMAP服务器
+        """
+        jitter_seconds = email_config.jitter_seconds
+        if jitter_seconds is None:
+            jitter_seconds = self.config.SCHEDULE_JITTER_SECONDS
+        
+        if interval_seconds is None:
+            interval_minutes = max(1, int(email_config.interval_minutes or self.config.SCHEDULE_INTERVAL_MINUTES))
+            interval_seconds = interval_minutes * 60
+            phase_seconds = random.uniform(0, interval_seconds)
+        else:
+            phase_seconds = interval_seconds
+        
+        start_date = datetime.now(self.timezone) + timedelta(seconds=phase_seconds)
+        return IntervalTrigger(
+            seconds=int(interval_seconds),
+            start_date=start_date,
+            jitter=max(0, int(jitter_seconds)) or None,
+            timezone=self.timezone
+        )
+    
+    def _reschedule_with_interval(self, email_config: EmailConfig, interval_seconds: float) -> None:
+        """按自适应计算出的间隔重新调度邮箱账户的定时任务"""
+        job_id = ACCOUNT_JOB_PREFIX + email_config.account
+        if not self.is_running or not self.scheduler.get_job(job_id):
             return
         
-        # 添加定时任务
+        self.scheduler.reschedule_job(job_id, trigger=self._build_trigger(email_config, interval_seconds))
+        logger.info(f"邮箱 {email_config.account} 下一次检查间隔调整为 {int(interval_seconds)} 秒")
+    
+    def add_account_job(self, email_config: EmailConfig) -> None:
+        """
+        添加（或替换）邮箱账户的定时任务
+        
+        Args:
+            email_config: 邮箱配置对象
+        """
+        if not self.is_running:
+            return
+        
+        trigger = self._build_trigger(email_config)
+        account = email_config.account
+        self._job_settings[account] = (email_config.interval_minutes, email_config.jitter_seconds)
         self.scheduler.add_job(
-            func=lambda: asyncio.run(self.run_scheduled_task()),
-            trigger=IntervalTrigger(minutes=interval_minutes),
-            id='email_check_job',
-            name='邮件检查任务',
-            replace_existing=True
+            func=self.run_account_task,
+            args=[account],
+            trigger=trigger,
+            id=ACCOUNT_JOB_PREFIX + account,
+            name=f'邮件检查任务: {account}',
+            replace_existing=True,
+            # 同一账户最多一个实例运行，错过的多次执行合并为一次
+            max_instances=1,
+            coalesce=True,
+            misfire_grace_time=self.config.SCHEDULE_MISFIRE_GRACE_SECONDS
         )
+        logger.info(f"邮箱定时任务已添加: {account}，间隔 {email_config.interval_minutes} 分钟，"
+                    f"抖动 {email_config.jitter_seconds} 秒，首次执行 {trigger.start_date}")
+    
+    def reschedule_account_job(self, email_config: EmailConfig) -> None:
+        """
+        按最新配置重新调度邮箱账户的定时任务
+        
+        Args:
+            email_config: 邮箱配置对象
+        """
+        self.adaptive_poll.reset(email_config.account)
+        MailboxStateRepository.delete_account(email_config.account)
+        self.add_account_job(email_config)
+    
+    def remove_account_job(self, account: str) -> None:
+        """
+        移除邮箱账户的定时任务
+        
+        Args:
+            account: 邮箱账户
+        """
+        self.adaptive_poll.reset(account)
+        self.lease_service.release_account(account)
+        MailboxStateRepository.delete_account(account)
+        BackfillRepository.delete_account(account)
+        self._job_settings.pop(account, None)
+        if not self.is_running:
+            return
+        
+        job_id = ACCOUNT_JOB_PREFIX + account
+        if self.scheduler.get_job(job_id):
+            self.scheduler.remove_job(job_id)
+            logger.info(f"邮箱定时任务已移除: {account}")
+    
+    async def sync_account_jobs(self) -> None:
+        """
+        将邮箱定时任务与数据库中的邮箱配置同步
+        其他进程（如独立的API进程）新增、修改或删除配置后，由此添加、重新调度或移除对应任务
+        """
+        if not self.is_running:
+            return
+        
+        try:
+            email_configs = {config.account: config for config in EmailConfigRepository.get_all()}
+        except Exception as e:
+            logger.error(f"同步邮箱配置失败: {e}")
+            return
+        
+        for account in set(self._job_settings) - set(email_configs):
+            self.remove_account_job(account)
+        
+        for account, email_config in email_configs.items():
+            settings = (email_config.interval_minutes, email_config.jitter_seconds)
+            if account not in self._job_settings:
+                self.add_account_job(email_config)
+            elif self._job_settings[account] != settings:
+                self.reschedule_account_job(email_config)
+    
+    def poll_backfill_jobs(self) -> None:
+        """领取并执行本进程负责账户的回填任务"""
+        try:
+            submitted = self.backfill_service.poll(self.lease_service.owns)
+            if submitted:
+                logger.info(f"开始执行 {submitted} 个回填任务")
+        except Exception as e:
+            logger.error(f"领取回填任务失败: {e}")
+    
+    def prune_run_history(self) -> None:
+        """清理过期的处理历史"""
+        try:
+            run_history_service.prune()
+        except Exception as e:
+            logger.error(f"清理处理历史失败: {e}")
+    
+    def start_scheduler(self) -> None:
+        """
+        启动定时调度器，为每个邮箱账户注册独立的定时任务
+        需要在应用事件循环中调用（如lifespan），任务直接在该事件循环上执行
+        """
+        if self.is_running:
+            logger.warning("定时调度器已在运行中")
+            return
+        
+        # 启动邮件处理流水线与回填线程池
+        self.pipeline.start()
+        self.backfill_service.start()
         
         # 启动调度器
         self.scheduler.start()
         self.is_running = True
         
-        logger.info(f"APScheduler定时调度器已启动，每 {interval_minutes} 分钟执行一次，时区: Asia/Shanghai")
+        # 注册工作进程并分配邮箱账户租约，之后定期心跳
+        self.lease_service.heartbeat()
+        if self.lease_service.enabled:
+            self.scheduler.add_job(
+                func=self.lease_service.heartbeat,
+                trigger=IntervalTrigger(seconds=self.config.LEASE_HEARTBEAT_SECONDS, timezone=self.timezone),
+                id=LEASE_HEARTBEAT_JOB_ID,
+                name='租约心跳任务',
+                replace_existing=True,
+                max_instances=1,
+                coalesce=True
+            )
+        
+        # 为每个邮箱账户添加定时任务
+        email_configs = EmailConfigRepository.get_all()
+        for email_config in email_configs:
+            self.add_account_job(email_config)
+        
+        # 定期与数据库中的邮箱配置同步
+        self.scheduler.add_job(
+            func=self.sync_account_jobs,
+            trigger=IntervalTrigger(seconds=self.config.CONFIG_SYNC_SECONDS, timezone=self.timezone),
+            id=CONFIG_SYNC_JOB_ID,
+            name='邮箱配置同步任务',
+            replace_existing=True,
+            max_instances=1,
+            coalesce=True
+        )
+        
+        # 定期领取本进程负责账户的回填任务（包括上次退出时中断的任务）
+        self.scheduler.add_job(
+            func=self.poll_backfill_jobs,
+            trigger=IntervalTrigger(seconds=self.config.BACKFILL_POLL_SECONDS, timezone=self.timezone),
+            id=BACKFILL_POLL_JOB_ID,
+            name='回填任务领取任务',
+            next_run_time=datetime.now(self.timezone),
+            replace_existing=True,
+            max_instances=1,
+            coalesce=True
+        )
+        
+        # 定期清理过期的处理历史
+        if self.config.RUN_HISTORY_ENABLED:
+            self.scheduler.add_job(
+                func=self.prune_run_history,
+                trigger=IntervalTrigger(seconds=self.config.RUN_HISTORY_PRUNE_SECONDS, timezone=self.timezone),
+                id=RUN_HISTORY_PRUNE_JOB_ID,
+                name='处理历史清理任务',
+                next_run_time=datetime.now(self.timezone),
+                replace_existing=True,
+                max_instances=1,
+                coalesce=True
+            )
+        
+        logger.info(f"APScheduler定时调度器已启动，共 {len(email_configs)} 个邮箱定时任务，时区: Asia/Shanghai")
     
     def stop_scheduler(self) -> None:
         """停止定时调度器"""
         if self.scheduler.running:
             self.scheduler.shutdown()
             self.is_running = False
+            # 先取消进行中的处理，再释放租约
+            self.pipeline.stop()
+            self.backfill_service.stop()
+            self.lease_service.stop()
             logger.info("APScheduler定时调度器已停止")
         else:
             logger.warning("APScheduler定时调度器未运行")
@@ -312,14 +729,9 @@ class ScheduleService:
 schedule_service = ScheduleService()
 
 
-def start_schedule_service(interval_minutes: int = 5) -> None:
-    """
-    启动定时服务（供外部调用）
-    
-    Args:
-        interval_minutes: 定时任务间隔（分钟）
-    """
-    schedule_service.start_scheduler(interval_minutes)
+def start_schedule_service() -> None:
+    """启动定时服务（供外部调用）"""
+    schedule_service.start_scheduler()
 
 
 def stop_schedule_service() -> None:
@@ -330,6 +742,7 @@ def stop_schedule_service() -> None:
 async def run_once() -> List[Dict[str, Any]]:
     """
     手动执行一次定时任务（供测试或手动调用）
+    与定时任务运行在同一事件循环上，共享同一服务实例和资源
     
     Returns:
         处理结果列表
@@ -0,0 +1,96 @@
+"""
+独立的邮件收取工作进程
+只运行定时任务与收取流程，不提供API与静态页面，与API进程仅通过数据库通信
+
+用法（在server目录下执行）:
+    python -m app.worker
+API进程使用 APP_ROLE=api 或 python main.py --role api 启动，不再运行定时任务
+设置 WORKER_METRICS_PORT 后，在该端口以Prometheus文本格式输出本进程的运行指标（任意路径）
+"""
+
+import asyncio
+import logging
+import signal
+from typing import Optional
+
+from app.models.email_models import init_database
+from app.services.metrics_service import CONTENT_TYPE, registry
+from app.services.notification_service import NotificationService
+from app.services.schedule_service import start_schedule_service, stop_schedule_service
+from config import get_config
+
+# 配置日志
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(levelname)s - %(asctime)s - %(name)s - %(message)s',
+    datefmt='%Y-%m-%d %H:%M:%S'
+)
+logger = logging.getLogger(__name__)
+
+
+async def _serve_metrics(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+    """最小的HTTP响应：读取请求头后返回运行指标并关闭连接"""
+    try:
+        await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), timeout=5)
+        body = registry.render().encode()
+        writer.write(f"HTTP/1.1 200 OK\r\nContent-Type: {CONTENT_TYPE}\r\n"
+                     f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode() + body)
+        await writer.drain()
+    except (asyncio.TimeoutError, asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+        pass
+    finally:
+        writer.close()
+
+
+async def start_metrics_server() -> Optional[asyncio.AbstractServer]:
+    """按配置启动工作进程的指标端口"""
+    config = get_config()
+    if not config.METRICS_ENABLED or not config.WORKER_METRICS_PORT:
+        return None
+    server = await asyncio.start_server(_serve_metrics, "0.0.0.0", config.WORKER_METRICS_PORT)
+    logger.info(f"运行指标已在端口 {config.WORKER_METRICS_PORT} 输出")
+    return server
+
+
+async def run_worker() -> None:
+    """运行工作进程，直到收到退出信号"""
+    logger.info("邮件收取工作进程正在启动...")
+
+    # 初始化数据库
+    init_database()
+
+    # 创建长生命周期资源并启动定时任务服务
+    await NotificationService.startup()
+    start_schedule_service()
+    metrics_server = await start_metrics_server()
+    logger.info("邮件收取工作进程启动完成，定时任务服务已启动")
+
+    # 等待退出信号
+    stop_event = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop_event.set)
+        except NotImplementedError:
+            # Windows不支持add_signal_handler，依赖KeyboardInterrupt退出
+            pass
+
+    try:
+        await stop_event.wait()
+    finally:
+        if metrics_server is not None:
+            metrics_server.close()
+        stop_schedule_service()
+        await NotificationService.shutdown()
+        logger.info("邮件收取工作进程已停止")
+
+
+def main() -> None:
+    try:
+        asyncio.run(run_worker())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
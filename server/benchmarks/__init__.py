@@ -0,0 +1 @@
+"""性能基准测试工具（本地IMAP测试服务器、合成邮件语料与基准脚本）"""
@@ -0,0 +1,178 @@
+"""
+收取流程基准测试
+对 EmailService.fetch_emails 与 ScheduleService.process_email_config 在不同规模的
+合成邮箱上测量: 邮件/秒、传输字节数、IMAP往返次数、峰值RSS
+
+用法（在server目录下执行）:
+    python -m benchmarks.bench_fetch
+    python -m benchmarks.bench_fetch --sizes 10 1000 --repeat 5 --json result.json
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import multiprocessing
+import os
+import resource
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List
+
+from benchmarks.corpus import DEFAULT_MIX, SyntheticMailbox
+from benchmarks.imap_server import LocalImapServer
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SIZES = [10, 1000, 100000]
+TARGETS = ('fetch_emails', 'process_email_config')
+
+BENCH_ACCOUNT = 'bench@example.com'
+BENCH_SERVER_NAME = 'Bench'
+
+
+def _peak_rss_kb() -> int:
+    """当前进程的峰值RSS（KB）"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS返回字节，Linux返回KB
+    return peak // 1024 if sys.platform == 'darwin' else peak
+
+
+def _run_target(target: str, server_config: Dict[str, Any], repeat: int, get_body: bool,
+                db_path: str) -> Dict[str, Any]:
+    """
+    在独立子进程中执行被测函数，保证峰值RSS只反映客户端自身
+
+    Returns:
+        耗时、获取的邮件数、峰值RSS
+    """
+    logging.disable(logging.WARNING)
+
+    from app.models.email_models import db, init_database, EmailConfig
+    db.init(db_path)
+    init_database()
+
+    from app.services.email_service import EmailService
+    from app.services.schedule_service import ScheduleService
+
+    email_config = EmailConfig(
+        account=BENCH_ACCOUNT,
+        auth_code='bench',
+        server_name=BENCH_SERVER_NAME,
+        channel_id='0'
+    )
+
+    rss_before = _peak_rss_kb()
+    messages = 0
+    started = time.perf_counter()
+
+    if target == 'fetch_emails':
+        email_service = EmailService()
+        email_service.server_configs[BENCH_SERVER_NAME] = server_config
+        for _ in range(repeat):
+            messages += len(email_service.fetch_emails(email_config, get_body=get_body))
+    else:
+        schedule_service = ScheduleService()
+        schedule_service.email_service.server_configs[BENCH_SERVER_NAME] = server_config
+
+        async def run() -> int:
+            total = 0
+            for _ in range(repeat):
+                result = await schedule_service.process_email_config(email_config)
+                total += result.get('total_emails', 0)
+            return total
+
+        messages = asyncio.run(run())
+
+    elapsed = time.perf_counter() - started
+    return {
+        'elapsed': elapsed,
+        'messages': messages,
+        'peak_rss_kb': _peak_rss_kb(),
+        'rss_growth_kb': _peak_rss_kb() - rss_before,
+    }
+
+
+def run_benchmark(sizes: List[int], repeat: int = 3, get_body: bool = True, seed: int = 42,
+                  mix: Dict[str, float] = None, attachment_kb: int = 256) -> List[Dict[str, Any]]:
+    """
+    执行基准测试
+
+    Args:
+        sizes: 邮箱规模列表
+        repeat: 每个场景重复调用次数
+        get_body: fetch_emails是否获取正文
+        seed: 语料随机种子
+        mix: 邮件类型占比
+        attachment_kb: 附件大小（KB）
+
+    Returns:
+        每个场景的测量结果
+    """
+    results = []
+    context = multiprocessing.get_context('spawn')
+
+    for size in sizes:
+        mailbox = SyntheticMailbox(size, seed=seed, mix=mix, attachment_kb=attachment_kb)
+        with LocalImapServer({'INBOX': mailbox}) as imap_server, tempfile.TemporaryDirectory() as tmp_dir:
+            for target in TARGETS:
+                imap_server.stats.reset()
+                db_path = os.path.join(tmp_dir, f'{target}.db')
+                with context.Pool(1) as pool:
+                    measured = pool.apply(
+                        _run_target,
+                        (target, imap_server.server_config(BENCH_SERVER_NAME), repeat, get_body, db_path)
+                    )
+                stats = imap_server.stats.snapshot()
+                elapsed = measured['elapsed'] or 1e-9
+                result = {
+                    'target': target,
+                    'mailbox_size': size,
+                    'repeat': repeat,
+                    'messages': measured['messages'],
+                    'elapsed_s': round(elapsed, 4),
+                    'messages_per_s': round(measured['messages'] / elapsed, 2),
+                    'bytes_out': stats['bytes_out'],
+                    'bytes_in': stats['bytes_in'],
+                    'round_trips': stats['round_trips'],
+                    'round_trips_per_call': round(stats['round_trips'] / repeat, 1),
+                    'peak_rss_kb': measured['peak_rss_kb'],
+                    'rss_growth_kb': measured['rss_growth_kb'],
+                    'commands': stats['commands'],
+                }
+                results.append(result)
+                logger.info(
+                    f"{target:<22} size={size:<7} msgs/s={result['messages_per_s']:<10} "
+                    f"bytes={result['bytes_out']:<11} round_trips={result['round_trips']:<6} "
+                    f"peak_rss={result['peak_rss_kb']}KB"
+                )
+    return results
+
+
+def main() -> None:
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+
+    parser = argparse.ArgumentParser(description='邮件收取流程基准测试')
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES, help='邮箱规模')
+    parser.add_argument('--repeat', type=int, default=3, help='每个场景的调用次数')
+    parser.add_argument('--no-body', action='store_true', help='fetch_emails不获取正文')
+    parser.add_argument('--seed', type=int, default=42, help='语料随机种子')
+    parser.add_argument('--attachment-kb', type=int, default=256, help='附件大小（KB）')
+    parser.add_argument('--mix', type=str, default=None,
+                        help='邮件类型占比JSON，例如 \'{"plain": 0.5, "html": 0.5}\'')
+    parser.add_argument('--json', type=str, default=None, help='结果输出到JSON文件')
+    args = parser.parse_args()
+
+    mix = json.loads(args.mix) if args.mix else DEFAULT_MIX
+    results = run_benchmark(args.sizes, repeat=args.repeat, get_body=not args.no_body,
+                            seed=args.seed, mix=mix, attachment_kb=args.attachment_kb)
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        logger.info(f"结果已写入: {args.json}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,158 @@
+"""
+HTML转纯文本基准测试
+对比 app.services.html_to_text.html_to_text 与原先基于多次正则替换的实现（_legacy_html_to_text）:
+吞吐（MB/s）以及输出中残留的CSS/脚本内容
+
+语料默认由合成邮箱中的HTML营销邮件与若干典型邮件模板组成；
+也可通过 --dir 指定包含 .html / .eml 文件的目录，使用真实邮件作为语料
+
+用法（在server目录下执行）:
+    python -m benchmarks.bench_html
+    python -m benchmarks.bench_html --dir ~/mail-samples --repeat 20
+"""
+
+import argparse
+import email
+import logging
+import os
+import re
+import time
+from typing import Callable, Dict, List
+
+from benchmarks.corpus import SyntheticMailbox
+
+logger = logging.getLogger(__name__)
+
+# 典型邮件模板：Outlook条件注释、内联样式表格布局、大量实体、缺少</head>的不规范HTML
+_TEMPLATES = [
+    '<!DOCTYPE html><html><head><meta charset="utf-8"><style>td{padding:0}.x{color:#333}</style>'
+    '<!--[if mso]><style>.fallback{font-family:Arial}</style><![endif]--></head><body>'
+    '<table role="presentation" width="100%"><tr><td align="center">'
+    '<h1 style="font-size:24px">您的订单已发货</h1><p>订单号：<b>20250101-8848</b>&nbsp;|&nbsp;'
+    '物流单号：SF1234567890</p><p>预计送达 &mdash; 1月3日</p>'
+    '<a href="https://example.com/track?a=1&amp;b=2" class="btn">查看物流&raquo;</a>'
+    '</td></tr></table><script type="application/ld+json">{"@context":"https://schema.org"}</script>'
+    '</body></html>',
+    '<html><head><title>Security alert</title><body><div>We noticed a new sign-in to your account.'
+    '<br>Device: Chrome on Windows<br>Location: Shanghai, CN</div><div>If this was you, you can '
+    'ignore this email &#8212; otherwise <a href="#">secure your account</a>.</div>'
+    '<p style="color:#999">&copy; 2025 Example Inc. &lt;no-reply@example.com&gt;</p></body></html>',
+    '<div dir="ltr">Hi team,<div><br></div><div>Weekly report attached &amp; summary below:</div>'
+    '<ul><li>Revenue +12%</li><li>Churn &lt; 2%</li></ul><blockquote class="gmail_quote">'
+    'On Mon, someone wrote:<br>&gt; previous message</blockquote></div>',
+]
+
+
+def _legacy_html_to_text(html_content: str) -> str:
+    """原先 EmailService 中的实现：_remove_css_styles + 去标签 + 再次 _remove_css_styles"""
+    def remove_css_styles(content: str) -> str:
+        cleaned = re.sub(r'&nbsp;?', ' ', content, flags=re.IGNORECASE)
+        cleaned = re.sub(r'&amp;?', '&', cleaned)
+        cleaned = re.sub(r'&lt;?', '<', cleaned)
+        cleaned = re.sub(r'&gt;?', '>', cleaned)
+        cleaned = re.sub(r'&quot;?', '"', cleaned)
+        cleaned = re.sub(r'\s+', ' ', cleaned)
+        return cleaned.strip()
+
+    text = re.sub(r'<[^>]+>', ' ', remove_css_styles(html_content))
+    text = re.sub(r'\s+', ' ', text).strip()
+    return remove_css_styles(text)
+
+
+def _html_from_eml(raw: bytes) -> List[str]:
+    parts = []
+    message = email.message_from_bytes(raw)
+    for part in message.walk():
+        if part.get_content_type() == 'text/html':
+            payload = part.get_payload(decode=True)
+            if payload:
+                parts.append(payload.decode(part.get_content_charset() or 'utf-8', errors='replace'))
+    return parts
+
+
+def load_corpus(directory: str = None, synthetic: int = 50, seed: int = 42) -> List[str]:
+    """加载HTML语料：目录中的 .html/.eml 文件，或合成营销邮件加典型模板"""
+    documents: List[str] = []
+    if directory:
+        for root, _, files in os.walk(os.path.expanduser(directory)):
+            for name in sorted(files):
+                path = os.path.join(root, name)
+                if name.endswith(('.html', '.htm')):
+                    with open(path, 'r', encoding='utf-8', errors='replace') as f:
+                        documents.append(f.read())
+                elif name.endswith('.eml'):
+                    with open(path, 'rb') as f:
+                        documents.extend(_html_from_eml(f.read()))
+        return documents
+
+    mailbox = SyntheticMailbox(synthetic, seed=seed, mix={'html': 1.0}, cache_size=0)
+    for seq in range(1, synthetic + 1):
+        documents.extend(_html_from_eml(mailbox.message(seq)))
+    documents.extend(_TEMPLATES * max(1, synthetic // 5))
+    return documents
+
+
+def _css_leaks(text: str) -> int:
+    """统计输出中残留的CSS/脚本片段数量"""
+    return len(re.findall(r'\{[^{}]*:[^{}]*\}|@media|dataLayer|font-family', text))
+
+
+def run_benchmark(documents: List[str], repeat: int = 5) -> List[Dict[str, float]]:
+    """
+    执行基准测试
+
+    Args:
+        documents: HTML语料
+        repeat: 语料重复转换次数
+
+    Returns:
+        每个实现的测量结果
+    """
+    from app.services.html_to_text import html_to_text
+
+    implementations: Dict[str, Callable[[str], str]] = {
+        'legacy_regex': _legacy_html_to_text,
+        'html_to_text': html_to_text,
+    }
+    total_bytes = sum(len(doc.encode('utf-8')) for doc in documents) * repeat
+    results = []
+
+    for name, convert in implementations.items():
+        started = time.perf_counter()
+        for _ in range(repeat):
+            outputs = [convert(doc) for doc in documents]
+        elapsed = time.perf_counter() - started or 1e-9
+        result = {
+            'implementation': name,
+            'documents': len(documents),
+            'elapsed_s': round(elapsed, 4),
+            'mb_per_s': round(total_bytes / elapsed / 1024 / 1024, 2),
+            'docs_per_s': round(len(documents) * repeat / elapsed, 1),
+            'css_leaks': sum(_css_leaks(text) for text in outputs),
+            'output_chars': sum(len(text) for text in outputs),
+        }
+        results.append(result)
+        logger.info(f"{name:<14} MB/s={result['mb_per_s']:<8} docs/s={result['docs_per_s']:<9} "
+                    f"css_leaks={result['css_leaks']:<6} output_chars={result['output_chars']}")
+    return results
+
+
+def main() -> None:
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+
+    parser = argparse.ArgumentParser(description='HTML转纯文本基准测试')
+    parser.add_argument('--dir', type=str, default=None, help='真实邮件语料目录（.html/.eml）')
+    parser.add_argument('--synthetic', type=int, default=50, help='合成HTML邮件数量')
+    parser.add_argument('--repeat', type=int, default=5, help='语料重复转换次数')
+    parser.add_argument('--seed', type=int, default=42, help='语料随机种子')
+    args = parser.parse_args()
+
+    documents = load_corpus(args.dir, args.synthetic, args.seed)
+    if not documents:
+        logger.error("语料为空")
+        return
+    run_benchmark(documents, args.repeat)
+
+
+if __name__ == '__main__':
+    main()
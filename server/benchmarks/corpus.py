@@ -0,0 +1,167 @@
+"""
+合成邮件语料生成器
+按序号确定性地生成邮件，邮箱规模再大也不需要把全部邮件放进内存
+"""
+
+import random
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from email.header import Header
+from email.message import EmailMessage
+from email.utils import format_datetime
+from typing import Dict, List, Optional
+
+# 邮件类型: 纯文本、multipart/alternative、HTML营销邮件、带附件邮件
+MESSAGE_KINDS = ('plain', 'multipart', 'html', 'attachment')
+
+# 默认类型占比
+DEFAULT_MIX = {'plain': 0.25, 'multipart': 0.35, 'html': 0.25, 'attachment': 0.15}
+
+_WORDS_EN = (
+    'invoice order shipment account update weekly report meeting schedule '
+    'offer discount limited member security notice password receipt '
+    'delivery subscription newsletter product launch review feedback'
+).split()
+
+_WORDS_ZH = ['订单', '发货', '账单', '会员', '优惠', '通知', '安全', '验证码',
+             '周报', '会议', '活动', '物流', '退款', '积分', '提醒', '服务']
+
+
+class SyntheticMailbox:
+    """
+    合成邮箱
+
+    Args:
+        size: 邮件数量
+        seed: 随机种子，相同种子生成相同的邮箱
+        mix: 各邮件类型的占比，键为MESSAGE_KINDS中的值
+        attachment_kb: 附件邮件中单个附件的大小（KB）
+        html_kb: HTML营销邮件正文的大致大小（KB）
+        gbk_ratio: 使用GBK编码邮件头的比例，其余使用UTF-8
+        cache_size: 已生成邮件的缓存数量
+    """
+
+    def __init__(self, size: int, seed: int = 42, mix: Optional[Dict[str, float]] = None,
+                 attachment_kb: int = 256, html_kb: int = 48, gbk_ratio: float = 0.3,
+                 cache_size: int = 256):
+        self.size = size
+        self.seed = seed
+        self.mix = mix or DEFAULT_MIX
+        self.attachment_kb = attachment_kb
+        self.html_kb = html_kb
+        self.gbk_ratio = gbk_ratio
+        self.uidvalidity = 1000 + seed
+        self.base_time = datetime(2025, 1, 1, 8, 0, 0)
+        self._cache: "OrderedDict[int, bytes]" = OrderedDict()
+        self._cache_size = cache_size
+
+    def __len__(self) -> int:
+        return self.size
+
+    def uid(self, seq: int) -> int:
+        """序号（从1开始）对应的UID，UID与序号一致"""
+        return seq
+
+    def modseq(self, seq: int) -> int:
+        """序号对应邮件的MODSEQ（CONDSTORE），邮件到达后不再变化"""
+        return seq
+
+    @property
+    def highest_modseq(self) -> int:
+        """邮箱的HIGHESTMODSEQ"""
+        return max(self.size, 1)
+
+    def kind(self, seq: int) -> str:
+        """序号对应的邮件类型"""
+        rng = random.Random(self.seed * 1000003 + seq)
+        point = rng.random()
+        total = 0.0
+        for kind in MESSAGE_KINDS:
+            total += self.mix.get(kind, 0.0)
+            if point < total:
+                return kind
+        return 'plain'
+
+    def message(self, seq: int) -> bytes:
+        """获取序号对应的原始邮件内容"""
+        cached = self._cache.get(seq)
+        if cached is not None:
+            self._cache.move_to_end(seq)
+            return cached
+
+        raw = self._build(seq)
+        self._cache[seq] = raw
+        if len(self._cache) > self._cache_size:
+            self._cache.popitem(last=False)
+        return raw
+
+    def append(self, count: int = 1) -> None:
+        """模拟新邮件到达"""
+        self.size += count
+
+    def _build(self, seq: int) -> bytes:
+        rng = random.Random(self.seed * 7919 + seq)
+        kind = self.kind(seq)
+        charset = 'gbk' if rng.random() < self.gbk_ratio else 'utf-8'
+
+        msg = EmailMessage()
+        subject = f"{rng.choice(_WORDS_ZH)}{rng.choice(_WORDS_ZH)} #{seq} {rng.choice(_WORDS_EN)}"
+        msg['Subject'] = Header(subject, charset).encode()
+        sender_name = Header(f"{rng.choice(_WORDS_ZH)}服务", charset).encode()
+        msg['From'] = f"{sender_name} <sender{seq % 97}@example.com>"
+        msg['To'] = 'bench@example.com'
+        msg['Date'] = format_datetime(self.base_time + timedelta(minutes=seq))
+        msg['Message-ID'] = f"<bench-{self.seed}-{seq}@example.com>"
+
+        text = self._text_body(rng)
+        if kind == 'plain':
+            msg.set_content(text, charset=charset)
+        elif kind == 'multipart':
+            msg.set_content(text, charset=charset)
+            msg.add_alternative(self._html_body(rng, 4), subtype='html', charset=charset)
+        elif kind == 'html':
+            msg.set_content(self._html_body(rng, self.html_kb), subtype='html', charset=charset)
+        else:
+            msg.set_content(text, charset=charset)
+            msg.add_alternative(self._html_body(rng, 4), subtype='html', charset=charset)
+            for index in range(rng.randint(1, 3)):
+                payload = rng.randbytes(self.attachment_kb * 1024)
+                msg.add_attachment(payload, maintype='application', subtype='octet-stream',
+                                   filename=f"附件{seq}-{index}.bin")
+        return msg.as_bytes()
+
+    @staticmethod
+    def _text_body(rng: random.Random) -> str:
+        lines: List[str] = []
+        for _ in range(rng.randint(3, 12)):
+            words = [rng.choice(_WORDS_ZH) for _ in range(rng.randint(4, 10))]
+            words += [rng.choice(_WORDS_EN) for _ in range(rng.randint(2, 6))]
+            lines.append(' '.join(words))
+        return '\n'.join(lines) + '\n'
+
+    @staticmethod
+    def _html_body(rng: random.Random, target_kb: int) -> str:
+        """生成类似营销邮件的HTML：内联样式、表格布局、style/script块和大量实体"""
+        head = (
+            '<!DOCTYPE html><html><head><meta charset="utf-8"><title>Newsletter</title>'
+            '<style type="text/css">body{margin:0;padding:0;font-family:Arial,sans-serif}'
+            '.btn{background:#ff6600;color:#fff;border-radius:4px}'
+            '@media only screen and (max-width:600px){.col{width:100%!important}}</style>'
+            '<script>window.dataLayer=window.dataLayer||[];</script></head>'
+            '<body><table width="100%" cellpadding="0" cellspacing="0" border="0">'
+        )
+        rows: List[str] = []
+        size = len(head)
+        target = target_kb * 1024
+        while size < target:
+            words = ' '.join(rng.choice(_WORDS_ZH) for _ in range(rng.randint(5, 15)))
+            row = (
+                '<tr><td class="col" style="padding:12px 24px;color:#333333;font-size:14px;'
+                'line-height:20px">'
+                f'<p>{words}&nbsp;&amp;&nbsp;{rng.choice(_WORDS_EN)} &lt;{rng.randint(1, 99)}%&gt;</p>'
+                f'<a class="btn" href="https://example.com/track?id={rng.randint(1, 10 ** 9)}&amp;u=1">'
+                '立即查看&nbsp;&raquo;</a></td></tr>'
+            )
+            rows.append(row)
+            size += len(row)
+        return head + ''.join(rows) + '</table></body></html>'
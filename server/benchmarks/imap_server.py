@@ -0,0 +1,510 @@
+"""
+本地IMAP测试服务器
+在进程内启动一个明文IMAP服务，邮箱内容来自合成语料，用于在没有真实邮箱的情况下
+对收取流程进行基准测试。只实现了EmailService实际用到的命令子集。
+"""
+
+import logging
+import re
+import socket
+import socketserver
+import threading
+from email import policy
+from email.parser import BytesHeaderParser, BytesParser
+from email.utils import getaddresses
+from typing import Dict, List, Optional, Tuple, Union
+from urllib.parse import quote
+
+from benchmarks.corpus import SyntheticMailbox
+
+logger = logging.getLogger(__name__)
+
+Token = Union[str, bytes, list]
+
+CAPABILITIES = ['IMAP4rev1', 'ID', 'UIDPLUS', 'LITERAL+', 'CONDSTORE']
+
+_LITERAL_RE = re.compile(rb'\{(\d+)(\+?)\}\r\n$')
+_SAFE_QUOTED_RE = re.compile(r'^[\x20-\x7e]*$')
+
+
+class ServerStats:
+    """服务器统计：连接数、命令数（即往返次数）、收发字节数"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self.connections = 0
+            self.commands = 0
+            self.bytes_in = 0
+            self.bytes_out = 0
+            self.command_counts: Dict[str, int] = {}
+
+    def add(self, **values) -> None:
+        with self._lock:
+            for key, value in values.items():
+                setattr(self, key, getattr(self, key) + value)
+
+    def count_command(self, name: str) -> None:
+        with self._lock:
+            self.commands += 1
+            self.command_counts[name] = self.command_counts.get(name, 0) + 1
+
+    def snapshot(self) -> Dict[str, object]:
+        with self._lock:
+            return {
+                'connections': self.connections,
+                'round_trips': self.commands,
+                'bytes_in': self.bytes_in,
+                'bytes_out': self.bytes_out,
+                'commands': dict(self.command_counts),
+            }
+
+
+def _tokenize(parts: List[Tuple[bytes, Optional[bytes]]]) -> List[Token]:
+    """把命令行（文本片段+字面量）解析为嵌套的token列表"""
+    root: List[Token] = []
+    stack = [root]
+    for text, literal in parts:
+        data = text.decode('utf-8', errors='replace')
+        i = 0
+        while i < len(data):
+            ch = data[i]
+            if ch == ' ':
+                i += 1
+            elif ch == '(':
+                child: List[Token] = []
+                stack[-1].append(child)
+                stack.append(child)
+                i += 1
+            elif ch == ')':
+                if len(stack) > 1:
+                    stack.pop()
+                i += 1
+            elif ch == '"':
+                i += 1
+                buf = []
+                while i < len(data) and data[i] != '"':
+                    if data[i] == '\\' and i + 1 < len(data):
+                        i += 1
+                    buf.append(data[i])
+                    i += 1
+                stack[-1].append(''.join(buf))
+                i += 1
+            else:
+                start = i
+                depth = 0
+                while i < len(data):
+                    if data[i] == '[':
+                        depth += 1
+                    elif data[i] == ']':
+                        depth -= 1
+                    elif depth == 0 and data[i] in ' ()':
+                        break
+                    i += 1
+                stack[-1].append(data[start:i])
+        if literal is not None:
+            stack[-1].append(literal)
+    return root
+
+
+def _quote(value: Optional[str]) -> bytes:
+    """IMAP字符串：ASCII安全时使用引号串，否则使用字面量"""
+    if value is None:
+        return b'NIL'
+    if _SAFE_QUOTED_RE.match(value) and '"' not in value and '\\' not in value:
+        return b'"' + value.encode('ascii') + b'"'
+    raw = value.encode('utf-8')
+    return b'{%d}\r\n' % len(raw) + raw
+
+
+def _param_list(params: List[Tuple[str, str]]) -> bytes:
+    """参数列表 ("KEY" "value" ...)，没有参数时为NIL；RFC 2231编码的参数原样返回"""
+    if not params:
+        return b'NIL'
+    values = []
+    for key, value in params:
+        if isinstance(value, tuple):
+            # 解析器已解码的RFC 2231参数 (charset, language, value)，value为按latin-1解码的原始字节，按原编码形式返回
+            charset, language, text = value
+            encoded = quote(text.strip('"').encode('latin-1'), safe='')
+            key, value = key + '*', f"{charset or ''}'{language or ''}'{encoded}"
+        values += [_quote(key.upper()), _quote(value.strip('"'))]
+    return b'(' + b' '.join(values) + b')'
+
+
+def _bodystructure(part) -> bytes:
+    """根据解析后的邮件生成BODYSTRUCTURE（含扩展字段中的处置）"""
+    if part.is_multipart():
+        children = b''.join(_bodystructure(child) for child in part.get_payload())
+        return b'(' + children + b' ' + _quote(part.get_content_subtype().upper()) + b')'
+
+    body = _part_body(part)
+    params = [(key, value) for key, value in (part.get_params(unquote=False) or [])[1:]]
+    fields = [
+        _quote(part.get_content_maintype().upper()),
+        _quote(part.get_content_subtype().upper()),
+        _param_list(params),
+        b'NIL',
+        b'NIL',
+        _quote((part.get('Content-Transfer-Encoding') or '7bit').upper()),
+        b'%d' % len(body),
+    ]
+    if part.get_content_maintype() == 'text':
+        fields.append(b'%d' % body.count(b'\n'))
+    disposition = part.get_params(header='content-disposition', unquote=False)
+    if disposition:
+        fields += [b'NIL', b'(' + _quote(disposition[0][0].upper()) + b' ' + _param_list(disposition[1:]) + b')']
+    return b'(' + b' '.join(fields) + b')'
+
+
+def _part_body(part) -> bytes:
+    """段的原始内容（传输编码后的形式）"""
+    return part.get_payload().encode('utf-8', errors='surrogateescape')
+
+
+def _find_part(raw: bytes, number: str):
+    """按段号（如 2、1.2）查找邮件中的段，不存在时返回None"""
+    part = BytesParser(policy=policy.compat32).parsebytes(raw)
+    for index in number.split('.'):
+        if not part.is_multipart():
+            return part if index == '1' else None
+        children = part.get_payload()
+        if not 1 <= int(index) <= len(children):
+            return None
+        part = children[int(index) - 1]
+    return part
+
+
+def _address_list(value: Optional[str]) -> bytes:
+    if not value:
+        return b'NIL'
+    items = []
+    for name, address in getaddresses([value]):
+        mailbox, _, host = address.partition('@')
+        items.append(b'(' + b' '.join([_quote(name or None), b'NIL', _quote(mailbox), _quote(host)]) + b')')
+    return b'(' + b''.join(items) + b')'
+
+
+class _ImapHandler(socketserver.StreamRequestHandler):
+    """单个客户端连接的处理器"""
+
+    server: "_ThreadingImapServer"
+
+    def setup(self):
+        super().setup()
+        # 关闭Nagle算法，避免小包与延迟ACK叠加导致的人为延迟
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.selected: Optional[SyntheticMailbox] = None
+        self.owner = self.server.owner
+
+    def _write(self, data: bytes) -> None:
+        self.wfile.write(data)
+        self.owner.stats.add(bytes_out=len(data))
+
+    def _read_line(self) -> bytes:
+        line = self.rfile.readline()
+        self.owner.stats.add(bytes_in=len(line))
+        return line
+
+    def _read_command(self) -> Optional[List[Tuple[bytes, Optional[bytes]]]]:
+        parts: List[Tuple[bytes, Optional[bytes]]] = []
+        while True:
+            line = self._read_line()
+            if not line:
+                return None
+            match = _LITERAL_RE.search(line)
+            if not match:
+                parts.append((line.rstrip(b'\r\n'), None))
+                return parts
+            if not match.group(2):
+                self._write(b'+ Ready for literal\r\n')
+            literal = self.rfile.read(int(match.group(1)))
+            self.owner.stats.add(bytes_in=len(literal))
+            parts.append((line[:match.start()], literal))
+
+    def handle(self):
+        self.owner.stats.add(connections=1)
+        self._write(b'* OK [CAPABILITY ' + ' '.join(self.owner.capabilities).encode() + b'] MailNotice bench IMAP ready\r\n')
+        while True:
+            parts = self._read_command()
+            if parts is None:
+                return
+            tokens = _tokenize(parts)
+            if len(tokens) < 2:
+                continue
+            tag, command, args = str(tokens[0]), str(tokens[1]).upper(), tokens[2:]
+            use_uid = False
+            if command == 'UID' and args:
+                use_uid = True
+                command, args = str(args[0]).upper(), args[1:]
+            self.owner.stats.count_command(('UID ' if use_uid else '') + command)
+
+            try:
+                if not self._dispatch(tag, command, args, use_uid):
+                    return
+            except Exception as e:  # pragma: no cover - 调试用
+                logger.exception("测试服务器处理命令失败")
+                self._write(f'{tag} BAD {e}\r\n'.encode())
+
+    def _dispatch(self, tag: str, command: str, args: List[Token], use_uid: bool) -> bool:
+        if command == 'CAPABILITY':
+            self._write(b'* CAPABILITY ' + ' '.join(self.owner.capabilities).encode() + b'\r\n')
+        elif command == 'LOGIN':
+            pass
+        elif command == 'ID':
+            self._write(b'* ID ("name" "MailNotice-bench")\r\n')
+        elif command in ('SELECT', 'EXAMINE'):
+            mailbox = self.owner.mailboxes.get(str(args[0]))
+            if mailbox is None:
+                self._write(f'{tag} NO Mailbox does not exist\r\n'.encode())
+                return True
+            self.selected = mailbox
+            self._write(
+                b'* FLAGS (\\Seen \\Answered \\Flagged \\Deleted \\Draft)\r\n'
+                b'* %d EXISTS\r\n* 0 RECENT\r\n'
+                b'* OK [UIDVALIDITY %d] UIDs valid\r\n'
+                b'* OK [UIDNEXT %d] Predicted next UID\r\n'
+                % (len(mailbox), mailbox.uidvalidity, mailbox.uid(len(mailbox)) + 1)
+            )
+            if self.owner.condstore:
+                self._write(b'* OK [HIGHESTMODSEQ %d] Highest\r\n' % mailbox.highest_modseq)
+            access = 'READ-ONLY' if command == 'EXAMINE' else 'READ-WRITE'
+            self._write(f'{tag} OK [{access}] {command} completed\r\n'.encode())
+            return True
+        elif command == 'STATUS':
+            self._status(tag, args)
+            return True
+        elif command == 'SEARCH':
+            self._search(args, use_uid)
+        elif command == 'FETCH':
+            self._fetch(args, use_uid)
+        elif command in ('NOOP', 'CLOSE', 'UNSELECT'):
+            pass
+        elif command == 'LOGOUT':
+            self._write(b'* BYE Logging out\r\n')
+            self._write(f'{tag} OK LOGOUT completed\r\n'.encode())
+            return False
+        else:
+            self._write(f'{tag} BAD Unknown command {command}\r\n'.encode())
+            return True
+
+        self._write(f'{tag} OK {command} completed\r\n'.encode())
+        return True
+
+    def _status(self, tag: str, args: List[Token]) -> None:
+        name = str(args[0])
+        mailbox = self.owner.mailboxes.get(name)
+        if mailbox is None:
+            self._write(f'{tag} NO Mailbox does not exist\r\n'.encode())
+            return
+        items = args[1] if len(args) > 1 and isinstance(args[1], list) else []
+        values = {
+            'MESSAGES': len(mailbox),
+            'RECENT': 0,
+            'UIDNEXT': mailbox.uid(len(mailbox)) + 1,
+            'UIDVALIDITY': mailbox.uidvalidity,
+            'UNSEEN': 0,
+            'HIGHESTMODSEQ': mailbox.highest_modseq,
+        }
+        pairs = ' '.join(f'{str(item).upper()} {values.get(str(item).upper(), 0)}' for item in items)
+        self._write(b'* STATUS ' + _quote(name) + f' ({pairs})\r\n'.encode())
+        self._write(f'{tag} OK STATUS completed\r\n'.encode())
+
+    # ---------- 序号 / UID ----------
+
+    def _parse_set(self, value: str, use_uid: bool) -> List[int]:
+        """把序号集合或UID集合解析为序号列表"""
+        mailbox = self.selected
+        total = len(mailbox)
+        top = mailbox.uid(total) if use_uid else total
+        result = set()
+        for chunk in value.split(','):
+            if ':' in chunk:
+                low, high = chunk.split(':', 1)
+            else:
+                low = high = chunk
+            low_n = top if low == '*' else int(low)
+            high_n = top if high == '*' else int(high)
+            if low_n > high_n:
+                low_n, high_n = high_n, low_n
+            low_n, high_n = max(low_n, 1), min(high_n, top)
+            result.update(range(low_n, high_n + 1))
+        # UID与序号一一对应（语料中UID==序号）
+        return sorted(result)
+
+    def _search(self, args: List[Token], use_uid: bool) -> None:
+        mailbox = self.selected
+        criteria = [str(arg).upper() if not isinstance(arg, list) else arg for arg in args]
+        seqs: List[int] = list(range(1, len(mailbox) + 1))
+        i = 0
+        while i < len(criteria):
+            item = criteria[i]
+            if item == 'UID' and i + 1 < len(criteria):
+                allowed = set(self._parse_set(str(criteria[i + 1]), True))
+                seqs = [seq for seq in seqs if mailbox.uid(seq) in allowed]
+                i += 2
+                continue
+            if isinstance(item, str) and re.match(r'^[\d*:,]+$', item):
+                allowed = set(self._parse_set(item, False))
+                seqs = [seq for seq in seqs if seq in allowed]
+            i += 1
+        values = [mailbox.uid(seq) if use_uid else seq for seq in seqs]
+        self._write(b'* SEARCH' + b''.join(b' %d' % value for value in values) + b'\r\n')
+
+    # ---------- FETCH ----------
+
+    def _fetch(self, args: List[Token], use_uid: bool) -> None:
+        mailbox = self.selected
+        seqs = self._parse_set(str(args[0]), use_uid)
+        items = args[1] if isinstance(args[1], list) else [args[1]]
+        items = [str(item).upper() for item in items]
+        if 'ALL' in items:
+            items = ['FLAGS', 'INTERNALDATE', 'RFC822.SIZE', 'ENVELOPE']
+        if use_uid and 'UID' not in items:
+            items.insert(0, 'UID')
+
+        # CONDSTORE: (CHANGEDSINCE n) 只返回MODSEQ大于n的邮件，并附带MODSEQ
+        modifiers = args[2] if len(args) > 2 and isinstance(args[2], list) else []
+        if len(modifiers) >= 2 and str(modifiers[0]).upper() == 'CHANGEDSINCE':
+            changed_since = int(str(modifiers[1]))
+            seqs = [seq for seq in seqs if mailbox.modseq(seq) > changed_since]
+            if 'MODSEQ' not in items:
+                items.append('MODSEQ')
+
+        for seq in seqs:
+            raw = mailbox.message(seq)
+            chunks: List[bytes] = []
+            for item in items:
+                chunks.append(self._fetch_item(item, seq, raw))
+            self._write(b'* %d FETCH (' % seq + b' '.join(chunks) + b')\r\n')
+
+    def _fetch_item(self, item: str, seq: int, raw: bytes) -> bytes:
+        mailbox = self.selected
+        if item == 'UID':
+            return b'UID %d' % mailbox.uid(seq)
+        if item == 'FLAGS':
+            return b'FLAGS ()'
+        if item == 'MODSEQ':
+            return b'MODSEQ (%d)' % mailbox.modseq(seq)
+        if item == 'RFC822.SIZE':
+            return b'RFC822.SIZE %d' % len(raw)
+        if item == 'INTERNALDATE':
+            return b'INTERNALDATE "01-Jan-2025 08:00:00 +0800"'
+        if item == 'ENVELOPE':
+            return b'ENVELOPE ' + self._envelope(raw)
+        if item == 'BODYSTRUCTURE':
+            return b'BODYSTRUCTURE ' + _bodystructure(BytesParser(policy=policy.compat32).parsebytes(raw))
+        match = re.match(r'^(BODY(?:\.PEEK)?|RFC822)(\[[^\]]*\])?(?:<(\d+)(?:\.(\d+))?>)?$', item)
+        if match:
+            section = match.group(2) or '[]'
+            data = raw
+            if section.upper() == '[HEADER]':
+                data = raw.split(b'\r\n\r\n', 1)[0] + b'\r\n\r\n'
+            elif section.upper() == '[TEXT]':
+                data = raw.split(b'\r\n\r\n', 1)[-1]
+            elif re.match(r'^\[\d+(\.\d+)*\]$', section):
+                part = _find_part(raw, section[1:-1])
+                data = _part_body(part) if part is not None and not part.is_multipart() else b''
+            label = 'BODY' + section
+            if match.group(3) is not None:
+                offset = int(match.group(3))
+                length = int(match.group(4)) if match.group(4) else len(data)
+                data = data[offset:offset + length]
+                label += f'<{offset}>'
+            if match.group(1) == 'RFC822':
+                label = 'RFC822'
+            return label.encode() + b' {%d}\r\n' % len(data) + data
+        return item.encode() + b' NIL'
+
+    @staticmethod
+    def _envelope(raw: bytes) -> bytes:
+        headers = BytesHeaderParser().parsebytes(raw)
+        message_from = headers.get('From')
+        values = [
+            _quote(headers.get('Date')),
+            _quote(headers.get('Subject')),
+            _address_list(message_from),
+            _address_list(message_from),
+            _address_list(message_from),
+            _address_list(headers.get('To')),
+            _address_list(headers.get('Cc')),
+            b'NIL',
+            b'NIL',
+            _quote(headers.get('Message-ID')),
+        ]
+        return b'(' + b' '.join(values) + b')'
+
+
+class _ThreadingImapServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, address, owner: "LocalImapServer"):
+        self.owner = owner
+        super().__init__(address, _ImapHandler)
+
+
+class LocalImapServer:
+    """
+    进程内IMAP测试服务器
+
+    用法:
+        with LocalImapServer({'INBOX': SyntheticMailbox(1000)}) as server:
+            server_config = server.server_config()
+    """
+
+    def __init__(self, mailboxes: Dict[str, SyntheticMailbox], host: str = '127.0.0.1', port: int = 0,
+                 condstore: bool = True):
+        self.mailboxes = mailboxes
+        # condstore=False时模拟不支持CONDSTORE的服务器，用于测试按UID范围同步的回退路径
+        self.condstore = condstore
+        self.capabilities = [cap for cap in CAPABILITIES if condstore or cap != 'CONDSTORE']
+        self.stats = ServerStats()
+        self._server = _ThreadingImapServer((host, port), self)
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def address(self) -> Tuple[str, int]:
+        return self._server.server_address[:2]
+
+    def server_config(self, name: str = 'Bench') -> Dict[str, object]:
+        """生成可直接放入EmailService.server_configs的服务商配置"""
+        host, port = self.address
+        return {'name': name, 'imap': host, 'port': port, 'ssl': False}
+
+    def start(self) -> "LocalImapServer":
+        self._thread = threading.Thread(target=self._server.serve_forever, name='bench-imap', daemon=True)
+        self._thread.start()
+        logger.info(f"本地IMAP测试服务器已启动: {self.address}")
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+        if self._thread:
+            self._thread.join(timeout=5)
+
+    def __enter__(self) -> "LocalImapServer":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+
+if __name__ == '__main__':
+    import argparse
+    import time
+
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description='启动本地IMAP测试服务器')
+    parser.add_argument('--size', type=int, default=1000, help='邮件数量')
+    parser.add_argument('--port', type=int, default=1143, help='监听端口')
+    args = parser.parse_args()
+
+    with LocalImapServer({'INBOX': SyntheticMailbox(args.size)}, port=args.port) as imap_server:
+        logger.info(f"服务商配置: {imap_server.server_config()}")
+        while True:
+            time.sleep(3600)
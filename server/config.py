@@ -20,15 +20,109 @@ class Config:
     MAIL_SERVER_PATH = os.path.join(BASE_DIR, "app", "mail_server.json")
     NOTICE_SERVER_PATH = os.path.join(BASE_DIR, "app", "notice_server.json")
 
+    # 定时任务配置（每个邮箱账户的默认值，可在邮箱配置中单独设置）
+    SCHEDULE_INTERVAL_MINUTES = 5  # 默认检查间隔（分钟）
+    SCHEDULE_JITTER_SECONDS = 30   # 默认每次执行的随机抖动（秒）
+    IMAP_FETCH_WORKERS = 8         # IMAP收取线程池大小
+    IMAP_TIMEOUT_SECONDS = 30      # IMAP连接与读写超时（秒）
+    SCHEDULE_ACCOUNT_TIMEOUT_SECONDS = 120  # 单个邮箱账户一次执行的时间预算（秒）
+    SCHEDULE_TICK_TIMEOUT_SECONDS = 300     # 一次全量执行（手动执行）的时间预算（秒）
+    SCHEDULE_MISFIRE_GRACE_SECONDS = 60     # 错过执行时间后仍允许补执行的宽限（秒）
+    MANUAL_RUN_JOBS_KEEP = 20               # 内存中保留的最近手动执行任务数
+
+    # 邮件处理流水线配置：收取 → 解析 → 保存 → 通知，各阶段独立并发，阶段之间为有界队列（收取并发度即IMAP_FETCH_WORKERS）
+    PIPELINE_PARSE_WORKERS = 2         # 邮件解析并发数
+    PIPELINE_PARSE_PROCESSES = 0       # 解析进程数，0表示不使用进程池；CPU密集的大邮件较多时可设为CPU核数
+    PIPELINE_PROCESS_PARSE_MIN_BYTES = 64 * 1024  # 达到该大小的邮件才交给解析进程池，小邮件仍在本进程解析
+    PIPELINE_NOTIFY_WORKERS = 4        # 通知推送并发数（按账户）
+    PIPELINE_WRITE_BATCH_SIZE = 50     # 每个数据库事务最多保存的邮件数
+    PIPELINE_RAW_QUEUE_SIZE = 32       # 待解析原始邮件队列容量
+    PIPELINE_RECORD_QUEUE_SIZE = 128   # 待保存邮件记录队列容量
+    PIPELINE_NOTIFY_QUEUE_SIZE = 64    # 待通知账户队列容量
+
+    # 收取前先用STATUS比较各文件夹的状态快照，无变化时跳过SELECT与收取
+    MAILBOX_STATUS_CHECK_ENABLED = True
+    MAIL_SYNC_MAX_NEW_MESSAGES = 50    # 每个文件夹每次最多收取的新邮件数（历史邮件见回填任务）
+
+    # 邮件正文大小上限：超大邮件只收取前一部分，正文超过上限时截断并标记
+    MAIL_MAX_RAW_BYTES = 2 * 1024 * 1024   # 每封邮件最多收取的原始字节数，0表示不限制
+    MAIL_MAX_TEXT_BYTES = 64 * 1024        # 每封邮件最多保存的正文字节数（UTF-8），0表示不限制
+
+    # 附件索引：收取ENVELOPE时一并获取BODYSTRUCTURE，只记录附件元数据，下载时按段分块从IMAP收取
+    MAIL_ATTACHMENT_INDEX_ENABLED = True
+    ATTACHMENT_STREAM_CHUNK_BYTES = 256 * 1024  # 下载附件时每条FETCH命令收取的字节数
+
+    # 历史邮件回填配置：按UID从新到旧分块导入，每块保存一次断点
+    BACKFILL_WORKERS = 1                       # 同时执行的回填任务数
+    BACKFILL_CHUNK_SIZE = 200                  # 每块的UID数量（每块一个事务并保存断点）
+    BACKFILL_FETCH_BATCH_SIZE = 20             # 每条FETCH命令收取的邮件数
+    BACKFILL_MAX_MESSAGES_PER_SECOND = 20      # 每秒最多收取的邮件数，0表示不限制
+    BACKFILL_MAX_BYTES_PER_SECOND = 1024 * 1024  # 每秒最多收取的字节数，0表示不限制
+    BACKFILL_POLL_SECONDS = 30                 # 领取未结束回填任务的间隔（秒）
+
+    # 处理历史：每个账户每次处理记录一条（各阶段耗时、数量与错误），定期清理
+    RUN_HISTORY_ENABLED = True
+    RUN_HISTORY_RETENTION_DAYS = 14            # 历史记录保留天数
+    RUN_HISTORY_MAX_PER_ACCOUNT = 5000         # 每个账户最多保留的历史记录数
+    RUN_HISTORY_PRUNE_SECONDS = 3600           # 清理历史记录的间隔（秒）
+
+    # 邮件事件推送（SSE）配置
+    EVENTS_QUEUE_SIZE = 200                    # 每个订阅者最多积压的事件数，超过时断开该订阅者
+    EVENTS_HEARTBEAT_SECONDS = 15              # 没有事件时发送心跳的间隔（秒）
+    EVENTS_RETRY_MILLISECONDS = 3000           # 浏览器断开后的重连间隔（毫秒）
+
+    # 邮件记录导出/导入配置
+    EXPORT_BATCH_SIZE = 1000                   # 导出时每次查询的记录数
+    IMPORT_BATCH_SIZE = 1000                   # 导入时每个事务写入的记录数
+
+    # 自适应轮询配置：空闲邮箱按指数退避，收到新邮件后重置为账户配置的间隔
+    ADAPTIVE_POLL_ENABLED = True
+    ADAPTIVE_POLL_MIN_SECONDS = 60        # 最短检查间隔（秒）
+    ADAPTIVE_POLL_MAX_SECONDS = 3600      # 最长检查间隔（秒）
+    ADAPTIVE_POLL_BACKOFF_FACTOR = 2.0    # 无新邮件时的间隔倍增系数
+    ADAPTIVE_POLL_RATE_ALPHA = 0.3        # 到达率指数加权平均的平滑系数
+
+    # 多进程/多副本部署的账户租约配置
+    LEASE_ENABLED = True               # 是否启用租约（单进程部署时也无副作用）
+    LEASE_TTL_SECONDS = 45             # 租约与心跳的有效期（秒）
+    LEASE_HEARTBEAT_SECONDS = 15       # 心跳与重新分配的间隔（秒）
+    CONFIG_SYNC_SECONDS = 30           # 定时任务与数据库中邮箱配置的同步间隔（秒），用于感知其他进程的配置修改
+
     # 日志配置
     LOG_LEVEL = "INFO"
     
     # API配置
     API_RELOAD = False  # 默认关闭热重载
     API_DOCS = True    # 默认开启接口文档
+
+    # 邮箱配置与通知渠道缓存：本进程修改时立即失效，其他进程的修改按数据库版本号发现
+    CONFIG_CACHE_CHECK_SECONDS = 5            # 查询配置版本号的最小间隔（秒）
+
+    # 服务商目录（mail_server.json、notice_server.json）：常驻内存，文件修改后校验通过才替换
+    CATALOG_CHECK_SECONDS = 5                 # 检查目录文件是否修改的最小间隔（秒）
+
+    # 响应压缩：按Accept-Encoding协商brotli/gzip，只压缩文本类响应
+    COMPRESSION_ENABLED = True
+    COMPRESSION_MIN_BYTES = 1024              # 小于该大小的响应不压缩（字节）
+    COMPRESSION_GZIP_LEVEL = 6                # gzip压缩级别（1-9）
+    COMPRESSION_BROTLI_QUALITY = 4            # brotli压缩质量（0-11，越高越慢）
+
+    # 运行指标：API进程在 /metrics 输出，独立工作进程（python -m app.worker）在 WORKER_METRICS_PORT 端口输出
+    METRICS_ENABLED = True
+    WORKER_METRICS_PORT = 0                   # 工作进程的指标端口，0表示不开启
+
+    # 鉴权配置：密码缓存在内存中，按文件修改时间重新加载；登录后使用签名的会话令牌
+    AUTH_PASSWORD_CHECK_SECONDS = 5           # 检查密码文件修改时间的最小间隔（秒）
+    AUTH_TOKEN_TTL_SECONDS = 7 * 24 * 3600    # 会话令牌有效期（秒）
     
     # 静态文件配置
     STATIC_DIR = os.path.join(BASE_DIR, "dist")  # 静态文件目录
+    SPA_ASSET_MAX_AGE = 365 * 24 * 3600        # /assets/下带哈希的文件的缓存时间（秒）
+
+    @property
+    def APP_ROLE(self) -> str:
+        """进程角色: all（API+定时任务，默认）、api（仅API）、worker（仅定时任务，见 python -m app.worker）"""
+        return os.getenv("APP_ROLE", "all")
 
 
 class DevelopmentConfig(Config):
@@ -10,16 +10,23 @@ from fastapi import FastAPI, Request
 from fastapi.exceptions import RequestValidationError
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
-from fastapi.staticfiles import StaticFiles
 
 from app.api.auth_api import router as auth_router
+from app.api.backfill_api import router as backfill_router
 from app.api.email_configs_api import router as email_configs_router
 # 邮箱相关API
 from app.api.email_records_api import router as email_records_router
+from app.api.events_api import router as events_router
+from app.api.metrics_api import router as metrics_router
 from app.api.notification_channels_api import router as notification_channels_router
+from app.api.run_history_api import router as run_history_router
 from app.middleware.auth_middleware import AuthMiddleware
+from app.middleware.compression_middleware import CompressionMiddleware
+from app.middleware.spa_middleware import SpaMiddleware
 # 通知相关API
 from app.models.email_models import init_database
+from app.services.auth_service import auth_service
+from app.services.notification_service import NotificationService
 from app.services.schedule_service import start_schedule_service, stop_schedule_service
 
 # 配置日志
@@ -80,14 +87,27 @@ async def lifespan(app: FastAPI):
     # 应用启动时初始化数据库
     init_database()
     
-    # 启动定时任务服务（每5分钟检查一次邮件）
-    start_schedule_service(interval_minutes=5)
-    logger.info("邮件通知系统启动完成，定时任务服务已启动")
+    # 加载访问密码（首次启动时生成）
+    auth_service.load()
+    
+    # 创建长生命周期资源（共享HTTP客户端等），定时任务与API共用
+    await NotificationService.startup()
+    
+    # 启动定时任务服务（在当前事件循环上运行，每个邮箱账户按各自的间隔检查邮件）
+    # API模式下由独立的工作进程（python -m app.worker）负责定时任务
+    run_scheduler = get_config().APP_ROLE != "api"
+    if run_scheduler:
+        start_schedule_service()
+        logger.info("邮件通知系统启动完成，定时任务服务已启动")
+    else:
+        logger.info("邮件通知系统启动完成（API模式，定时任务由独立工作进程执行）")
     
     yield
     
     # 应用关闭时的清理工作
-    stop_schedule_service()
+    if run_scheduler:
+        stop_schedule_service()
+    await NotificationService.shutdown()
     logger.info("邮件通知系统关闭，定时任务服务已停止")
 
 # 为不支持lifespan协议的ASGI服务器提供备选方案
@@ -98,14 +118,21 @@ async def on_startup():
     # 应用启动时初始化数据库
     init_database()
     
-    # 启动定时任务服务（每5分钟检查一次邮件）
-    start_schedule_service(interval_minutes=5)
-    logger.info("邮件通知系统启动完成，定时任务服务已启动")
+    # 加载访问密码（首次启动时生成）
+    auth_service.load()
+    
+    # 创建长生命周期资源并启动定时任务服务（API模式下不启动）
+    await NotificationService.startup()
+    if get_config().APP_ROLE != "api":
+        start_schedule_service()
+    logger.info("邮件通知系统启动完成")
 
 async def on_shutdown():
     """应用关闭事件处理器"""
     # 应用关闭时的清理工作
-    stop_schedule_service()
+    if get_config().APP_ROLE != "api":
+        stop_schedule_service()
+    await NotificationService.shutdown()
     logger.info("邮件通知系统关闭，定时任务服务已停止")
 
 
@@ -143,6 +170,12 @@ def create_app(config):
         allow_headers=["*"],
     )
 
+    # 响应压缩（鉴权失败等响应同样按需压缩）
+    app.add_middleware(CompressionMiddleware)
+
+    # 前端静态文件与路由fallback（最外层，静态请求不经过上面的中间件）
+    app.add_middleware(SpaMiddleware)
+
     # 注册路由
     # 认证相关API
     app.include_router(auth_router)
@@ -150,33 +183,17 @@ def create_app(config):
     # 邮箱相关API
     app.include_router(email_configs_router)
     app.include_router(email_records_router)
+    app.include_router(backfill_router)
+    app.include_router(events_router)
+    app.include_router(run_history_router)
 
     # 通知相关API
     app.include_router(notification_channels_router)
 
-    # 挂载静态文件服务（处理静态资源）
-    app.mount("/assets", StaticFiles(directory=os.path.join(config.STATIC_DIR, "assets")), name="assets")
-    app.mount("/favicon.ico", StaticFiles(directory=config.STATIC_DIR), name="favicon")
-
-    # 前端路由fallback - 处理前端路由（必须在静态文件挂载之后）
-    from fastapi.responses import FileResponse
-    
-    @app.get("/{full_path:path}")
-    async def serve_spa(full_path: str):
-        """单页应用路由fallback - 返回index.html让前端路由处理"""
-        # 对于API路由，直接返回404
-        if full_path.startswith("api/"):
-            from fastapi import HTTPException
-            raise HTTPException(status_code=404, detail="Not Found")
-            
-        # 返回index.html让前端路由处理
-        index_path = os.path.join(config.STATIC_DIR, "index.html")
-        if os.path.exists(index_path):
-            return FileResponse(index_path)
-        else:
-            from fastapi import HTTPException
-            raise HTTPException(status_code=404, detail="Not Found")
-    
+    # 运行指标
+    if config.METRICS_ENABLED:
+        app.include_router(metrics_router)
+
     return app
 
 # 创建应用实例（使用默认配置）
@@ -211,17 +228,21 @@ if __name__ == "__main__":
     parser = argparse.ArgumentParser(description='邮件通知系统API服务器')
     parser.add_argument('--env', '-e', choices=['dev', 'prod'], default='prod',
                        help='运行环境: dev (开发环境) 或 prod (生产环境)')
+    parser.add_argument('--role', '-r', choices=['all', 'api'], default=None,
+                       help='进程角色: all (API+定时任务) 或 api (仅API，定时任务由 python -m app.worker 执行)')
     
     # 解析命令行参数
     args = parser.parse_args()
     
     # 设置环境变量，让get_config函数能够获取到正确的环境
     os.environ['APP_ENV'] = args.env
+    if args.role:
+        os.environ['APP_ROLE'] = args.role
     
     # 获取配置（基于命令行参数）
     config = get_config(args.env)
     
-    logger.info(f"启动邮件通知系统API服务器 - 环境: {args.env}")
+    logger.info(f"启动邮件通知系统API服务器 - 环境: {args.env}，角色: {config.APP_ROLE}")
     
     # 根据配置显示文档地址
     if config.API_DOCS:
@@ -27,10 +27,10 @@ const apiClient = axios.create({
 // 请求拦截器
 apiClient.interceptors.request.use(
     (config) => {
-        // 从本地存储获取密码并添加到请求头
-        const authPassword = localStorage.getItem('authPassword')
-        if (authPassword) {
-            config.headers['X-Password'] = authPassword
+        // 从本地存储获取登录时签发的会话令牌并添加到请求头
+        const authToken = localStorage.getItem('authToken')
+        if (authToken) {
+            config.headers['Authorization'] = `Bearer ${authToken}`
         }
         
         return config
@@ -45,7 +45,7 @@ apiClient.interceptors.response.use(
     (response) => {
         // 检查响应状态码，处理401等错误状态
         if (response.status === 401) {
-            localStorage.removeItem('authPassword')
+            localStorage.removeItem('authToken')
             const errorMessage = response.data.message || '未授权，请重新登录'
             ElMessage.error(errorMessage)
             // 延迟重定向，确保用户能看到错误消息
@@ -132,13 +132,16 @@ apiClient.deleteMailConfig = (account) => apiClient.post('/email-configs/delete'
 
 apiClient.testSingleMailConfig = (data) => apiClient.post('/email-configs/test', data)
 
-apiClient.runSchedule = () => apiClient.post('/email-configs/run_schedule')
+// 提交手动执行任务（不传账户时执行全部账户），立即返回任务，进度通过getRunJob轮询
+apiClient.runSchedule = (account) => apiClient.post('/email-configs/run_schedule', account ? { account } : {})
+
+apiClient.getRunJob = (jobId) => apiClient.post('/email-configs/run_job', { id: jobId })
 
 // 通知服务商API方法
-apiClient.getAllNotificationServers = () => apiClient.post('/notification-channels/get_servers')
+apiClient.getAllNotificationServers = () => apiClient.get('/notification-channels/get_servers')
 
 // 邮箱服务商API方法
-apiClient.getAllEmailServers = () => apiClient.post('/email-configs/get_servers')
+apiClient.getAllEmailServers = () => apiClient.get('/email-configs/get_servers')
 
 // 邮件记录API方法
 apiClient.getEmailRecords = (params) => apiClient.get('/email-records/', { params })
@@ -165,9 +168,17 @@ apiClient.getEmailsByRecipient = (recipient, limit) => apiClient.get(`/email-rec
 
 // 新增发送邮件方法
 apiClient.sendEmailManual = (emailId) => apiClient.post('/email-records/send-manual', { email_id: emailId })
+// 下载附件（不限制超时，大附件需要较长时间）
+apiClient.downloadAttachment = (emailId, part) => apiClient.get(`/email-records/${emailId}/attachments/${part}`, { responseType: 'blob', timeout: 0 })
 
 apiClient.sendEmailsBatch = (emailIds) => apiClient.post('/email-records/send-batch', { email_ids: emailIds })
 
+// 订阅邮件事件（SSE）：EventSource不能设置请求头，会话令牌放在查询参数中
+apiClient.subscribeEvents = () => {
+    const token = encodeURIComponent(localStorage.getItem('authToken') || '')
+    return new EventSource(`${API_BASE_URL.replace(/\/$/, '')}/events?token=${token}`)
+}
+
 // 用户API方法
 
 // 认证API方法